@@ -0,0 +1,109 @@
+# Benchmark for extracting JSON from LLM responses, using the repo's sample fixtures
+import json
+import os
+import sys
+import timeit
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.shared.json_extractor import extract_json, JSONStreamExtractor
+from benchmarks.results import save_results
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = ["sample_diet_requirements.json", "sample_food_recommendations.json"]
+
+def legacy_diet_parse(llm_response):
+    """Fence stripping previously used by the diet requirements handler"""
+    if llm_response.strip().startswith("```"):
+        json_str = llm_response.strip()
+        first_newline = json_str.find('\n')
+        if first_newline != -1:
+            json_str = json_str[first_newline:].strip()
+        if json_str.endswith("```"):
+            json_str = json_str[:-3].strip()
+        return json.loads(json_str)
+    return json.loads(llm_response)
+
+def legacy_food_parse(llm_response):
+    """Fence stripping previously used by the food recommendation handler"""
+    cleaned_response = llm_response
+    if "```" in cleaned_response:
+        if "```json" in cleaned_response:
+            cleaned_response = cleaned_response.split("```json", 1)[1]
+        else:
+            cleaned_response = cleaned_response.split("```", 1)[1]
+        if "```" in cleaned_response:
+            cleaned_response = cleaned_response.split("```", 1)[0]
+    return json.loads(cleaned_response.strip())
+
+def legacy_special_needs_parse(llm_response):
+    """Fence stripping previously used by the special needs handler"""
+    cleaned_response = llm_response
+    if "```" in cleaned_response:
+        start_index = cleaned_response.find("{")
+        if start_index != -1:
+            cleaned_response = cleaned_response[start_index:]
+    if "```" in cleaned_response:
+        end_index = cleaned_response.rfind("```")
+        if end_index != -1:
+            cleaned_response = cleaned_response[:end_index].strip()
+    return json.loads(cleaned_response)
+
+def stream_parse(llm_response, chunk_size=64):
+    """Feed the response in streamed chunks"""
+    extractor = JSONStreamExtractor()
+    for index in range(0, len(llm_response), chunk_size):
+        if extractor.feed(llm_response[index:index + chunk_size]):
+            break
+    return extractor.value()
+
+PARSERS = {
+    "legacy_diet": legacy_diet_parse,
+    "legacy_food": legacy_food_parse,
+    "legacy_special_needs": legacy_special_needs_parse,
+    "extract_json": extract_json,
+    "stream_64": stream_parse,
+}
+
+def build_variants(text):
+    """Shapes of response seen from the model"""
+    return {
+        "plain": text,
+        "fenced": f"```json\n{text}\n```",
+        "prose_and_fence": f"Here is your plan:\n```json\n{text}\n```\nEnjoy!",
+        "trailing_commas": text.replace("\n    }", ",\n    }"),
+        "truncated": text[: int(len(text) * 0.9)],
+    }
+
+def run(number=200):
+    """
+    Time each parser on each fixture variant
+
+    Returns:
+        list: One result dict per (fixture, variant, parser); failed parses have no timing
+    """
+    results = []
+    for fixture in FIXTURES:
+        with open(os.path.join(REPO_ROOT, fixture)) as file:
+            text = file.read()
+        for variant, response in build_variants(text).items():
+            for name, parser in PARSERS.items():
+                try:
+                    parser(response)
+                except Exception:
+                    results.append({"name": f"{fixture}.{variant}.{name}", "fixture": fixture, "variant": variant, "parser": name, "us_per_call": None})
+                    continue
+                seconds = timeit.timeit(lambda: parser(response), number=number)
+                results.append({
+                    "name": f"{fixture}.{variant}.{name}",
+                    "fixture": fixture,
+                    "variant": variant,
+                    "parser": name,
+                    "us_per_call": round(seconds / number * 1e6, 2),
+                })
+    return results
+
+if __name__ == "__main__":
+    results = run()
+    for result in results:
+        timing = f"{result['us_per_call']:>10.2f} us" if result["us_per_call"] is not None else "    failed"
+        print(f"{result['fixture']:<36} {result['variant']:<16} {result['parser']:<22} {timing}")
+    print(f"Results written to {save_results('json_extraction', results)}")
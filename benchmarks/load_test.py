@@ -0,0 +1,315 @@
+# Load test driving realistic user journeys against the running services
+#
+#   python -m benchmarks.load_test [--users 20] [--duration 60] [--base-url http://localhost:8080/api/v1]
+#
+# Each virtual user registers, logs in and creates a profile, then repeatedly picks an action
+# from the weighted mix (viewing the dashboard, generating diet requirements and meal plans,
+# giving feedback, updating the profile, logging in again), running any prerequisite first.
+# Service URLs default to the same environment variables as the frontend; --base-url points
+# every service at one host, such as the monolith. For offline runs start the services against
+# the mock LLM server and in-memory database (see README, Offline Load Testing).
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+import httpx
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.results import save_results, summarize
+
+USER_MANAGEMENT_URL = os.getenv("USER_MANAGEMENT_URL", "http://localhost:8000/api/v1")
+DIET_REQUIREMENTS_URL = os.getenv("DIET_REQUIREMENTS_URL", "http://localhost:8001/api/v1")
+FOOD_RECOMMENDATION_URL = os.getenv("FOOD_RECOMMENDATION_URL", "http://localhost:8002/api/v1")
+SPECIAL_NEEDS_URL = os.getenv("SPECIAL_NEEDS_URL", "http://localhost:8003/api/v1")
+
+PROFILE = {
+    "age": 34,
+    "gender": "female",
+    "height": 168.0,
+    "weight": 64.0,
+    "diet_type": "vegetarian",
+    "activity_level": "moderate",
+    "health_goal": "maintenance",
+    "allergies": ["peanuts"],
+    "dietary_restrictions": ["low sodium"],
+    "medical_conditions": ["hypertension"]
+}
+
+MEAL_PREFERENCES = {
+    "breakfast": ["oatmeal", "eggs", "yogurt"],
+    "lunch": ["salad", "sandwich", "soup"],
+    "dinner": ["fish", "chicken", "vegetarian"],
+    "snack": ["fruit", "nuts"]
+}
+
+# Relative frequency of each action once a user is set up
+DEFAULT_MIX = "dashboard=6,diet=2,food=2,feedback=2,profile=1,login=1"
+
+FEEDBACK = [
+    ("positive", "Loved the breakfasts, very filling"),
+    ("neutral", "The plan is fine but a bit repetitive"),
+    ("negative", "The yogurt made me feel bloated and I do not like salmon"),
+]
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for entry in mix.split(","):
+        action, _, weight = entry.partition("=")
+        weights[action.strip()] = float(weight or 1)
+    unknown = set(weights) - set(VirtualUser.ACTIONS)
+    if unknown:
+        raise ValueError(f"Unknown actions in mix: {', '.join(sorted(unknown))}")
+    return weights
+
+class Recorder:
+    """Latency and outcome of every request, keyed by endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, endpoint: str, latency: float, status: str, ok: bool):
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint][status] += 1
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": self.errors[endpoint],
+                "throughput_per_second": round(len(latencies) / elapsed, 3),
+                "latency_ms": summarize(latencies),
+                "statuses": dict(self.statuses[endpoint]),
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "throughput_per_second": round(total / elapsed, 3) if elapsed else 0,
+            "endpoints": endpoints,
+        }
+
+class VirtualUser:
+    """One simulated user working through the application"""
+    ACTIONS = ("dashboard", "diet", "food", "feedback", "profile", "login")
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, urls: Dict[str, str], rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.urls = urls
+        self.rng = rng
+        self.email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        self.password = "load-test-password"
+        self.headers: Dict[str, str] = {}
+        self.user: Optional[Dict[str, Any]] = None
+        self.diet_requirement_id: Optional[str] = None
+        self.food_recommendation_id: Optional[str] = None
+
+    async def request(self, endpoint: str, method: str, url: str, expected: int = 200, **kwargs) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(endpoint, time.perf_counter() - started, type(e).__name__, False)
+            return None
+        ok = response.status_code == expected
+        body = response.json() if ok else None
+        # Generation endpoints report LLM and validation failures in the body with a 201
+        if body and isinstance(body, dict) and body.get("status") == "failed":
+            ok = False
+        self.recorder.record(endpoint, time.perf_counter() - started, str(response.status_code), ok)
+        return body if ok else None
+
+    async def register(self) -> bool:
+        user = await self.request(
+            "POST /users/register", "POST", f"{self.urls['user_management']}/users/register",
+            expected=201, json={"email": self.email, "name": "Load Test", "password": self.password}
+        )
+        return user is not None
+
+    async def login(self) -> bool:
+        token = await self.request(
+            "POST /token", "POST", f"{self.urls['user_management']}/token",
+            data={"username": self.email, "password": self.password}
+        )
+        if token:
+            self.headers = {"Authorization": f"Bearer {token['access_token']}"}
+        return token is not None
+
+    async def profile(self) -> bool:
+        profile = dict(PROFILE, weight=round(self.rng.uniform(50, 95), 1), age=self.rng.randint(18, 80))
+        if self.user and self.user.get("profile"):
+            user = await self.request("PUT /users/profile", "PUT", f"{self.urls['user_management']}/users/profile", json=profile)
+        else:
+            user = await self.request("POST /users/profile", "POST", f"{self.urls['user_management']}/users/profile", json=profile)
+        if user:
+            self.user = user
+        return user is not None
+
+    async def dashboard(self) -> bool:
+        return await self.request("GET /users/me/dashboard", "GET", f"{self.urls['user_management']}/users/me/dashboard") is not None
+
+    async def diet(self) -> bool:
+        requirement = await self.request(
+            "POST /diet-requirements", "POST", f"{self.urls['diet_requirements']}/diet-requirements",
+            expected=201, json={"user_data": self.user}
+        )
+        if requirement:
+            self.diet_requirement_id = requirement["id"]
+        return requirement is not None
+
+    async def food(self) -> bool:
+        if not self.diet_requirement_id and not await self.diet():
+            return False
+        recommendation = await self.request(
+            "POST /food-recommendation", "POST", f"{self.urls['food_recommendation']}/food-recommendation",
+            expected=201, json={
+                "user_id": self.user["id"],
+                "diet_requirement_id": self.diet_requirement_id,
+                "meal_preferences": MEAL_PREFERENCES
+            }
+        )
+        if recommendation:
+            self.food_recommendation_id = recommendation["id"]
+        return recommendation is not None
+
+    async def feedback(self) -> bool:
+        if not self.food_recommendation_id and not await self.food():
+            return False
+        feedback_type, feedback_text = self.rng.choice(FEEDBACK)
+        return await self.request(
+            f"POST /feedback ({feedback_type})", "POST", f"{self.urls['special_needs']}/feedback",
+            json={
+                "user_id": self.user["id"],
+                "food_recommendation_id": self.food_recommendation_id,
+                "feedback_text": feedback_text,
+                "feedback_type": feedback_type
+            }
+        ) is not None
+
+    async def set_up(self) -> bool:
+        return await self.register() and await self.login() and await self.profile()
+
+    async def run(self, mix: Dict[str, float], deadline: float, think_time: float, iterations: Optional[int]):
+        if not await self.set_up():
+            return
+        actions, weights = zip(*mix.items())
+        completed = 0
+        while time.perf_counter() < deadline and (iterations is None or completed < iterations):
+            action = self.rng.choices(actions, weights)[0]
+            await getattr(self, action)()
+            completed += 1
+            if think_time:
+                await asyncio.sleep(self.rng.expovariate(1 / think_time))
+
+async def run_load_test(
+    users: int = 10,
+    duration: float = 60,
+    mix: str = DEFAULT_MIX,
+    ramp_up: float = 0,
+    think_time: float = 0,
+    iterations: Optional[int] = None,
+    urls: Optional[Dict[str, str]] = None,
+    seed: Optional[int] = None,
+    timeout: float = 300,
+    client: Optional[httpx.AsyncClient] = None
+) -> Dict[str, Any]:
+    """
+    Run virtual users concurrently and report throughput and latency per endpoint
+
+    Args:
+        users: Concurrent virtual users
+        duration: Seconds after which users stop starting new actions
+        mix: Weighted actions, e.g. "dashboard=6,diet=2,food=2,feedback=2,profile=1,login=1"
+        ramp_up: Seconds over which user start times are spread
+        think_time: Mean pause between a user's actions in seconds (exponentially distributed)
+        iterations: Stop each user after this many actions, even before the duration
+        urls: Base URL of each service; defaults to the environment
+        seed: Seed for repeatable action sequences
+        timeout: Per-request timeout in seconds
+        client: HTTP client to use instead of a new one
+    """
+    weights = parse_mix(mix)
+    urls = urls or {
+        "user_management": USER_MANAGEMENT_URL,
+        "diet_requirements": DIET_REQUIREMENTS_URL,
+        "food_recommendation": FOOD_RECOMMENDATION_URL,
+        "special_needs": SPECIAL_NEEDS_URL,
+    }
+    rng = random.Random(seed)
+    recorder = Recorder()
+    own_client = client is None
+    if own_client:
+        client = httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(max_connections=users * 2, max_keepalive_connections=users * 2))
+
+    deadline = time.perf_counter() + duration
+
+    async def start_user(index: int):
+        if ramp_up:
+            await asyncio.sleep(ramp_up * index / users)
+        user = VirtualUser(client, recorder, urls, random.Random(rng.random()))
+        await user.run(weights, deadline, think_time, iterations)
+
+    try:
+        await asyncio.gather(*(start_user(index) for index in range(users)))
+    finally:
+        recorder.finished = time.perf_counter()
+        if own_client:
+            await client.aclose()
+    return recorder.report()
+
+def print_report(report: Dict[str, Any]):
+    print(f"{'endpoint':<34} {'reqs':>6} {'errs':>5} {'req/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for endpoint, stats in report["endpoints"].items():
+        latency = stats["latency_ms"]
+        print(
+            f"{endpoint:<34} {stats['requests']:>6} {stats['errors']:>5} {stats['throughput_per_second']:>8.2f} "
+            f"{latency['p50']:>9.1f} {latency['p90']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f} {latency['max']:>9.1f}"
+        )
+    print(f"{report['requests']} requests, {report['errors']} errors in {report['elapsed_seconds']}s ({report['throughput_per_second']} req/s)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the services with concurrent virtual users")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to keep starting new actions")
+    parser.add_argument("--iterations", type=int, help="actions per user, after setup")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted actions (default {DEFAULT_MIX})")
+    parser.add_argument("--ramp-up", type=float, default=0, help="seconds over which users start")
+    parser.add_argument("--think-time", type=float, default=0, help="mean pause between a user's actions")
+    parser.add_argument("--base-url", help="one base URL for every service, e.g. the monolith")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", help="JSON file to write; defaults to benchmarks/results/")
+    args = parser.parse_args()
+
+    urls = None
+    if args.base_url:
+        urls = {service: args.base_url.rstrip("/") for service in ("user_management", "diet_requirements", "food_recommendation", "special_needs")}
+    settings = {key: value for key, value in vars(args).items() if key != "output"}
+
+    report = asyncio.run(run_load_test(
+        users=args.users,
+        duration=args.duration,
+        mix=args.mix,
+        ramp_up=args.ramp_up,
+        think_time=args.think_time,
+        iterations=args.iterations,
+        urls=urls,
+        seed=args.seed,
+        timeout=args.timeout
+    ))
+    print_report(report)
+    path = save_results("load_test", report, settings, args.output)
+    print(f"Results written to {path}")
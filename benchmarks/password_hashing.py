@@ -0,0 +1,66 @@
+# Benchmark login password verification under concurrency, inline vs offloaded to the hashing pool
+import asyncio
+import os
+import sys
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.user_management.auth import verify_password, verify_and_update_password, get_password_hash, BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS
+
+async def _ticker(interval, lags, stop):
+    """Measure how late the event loop wakes a periodic task; a proxy for latency of other requests"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+async def _inline_login(password, hashed):
+    return verify_password(password, hashed)
+
+async def _offloaded_login(password, hashed):
+    verified, _ = await verify_and_update_password(password, hashed)
+    return verified
+
+async def run_mode(login, concurrency, total, hashed):
+    """
+    Run `total` logins with at most `concurrency` in flight
+
+    Returns:
+        dict: throughput and event loop lag for the run
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    lags = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(0.01, lags, stop))
+
+    async def one():
+        async with semaphore:
+            assert await login("correct horse battery staple", hashed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    lags.sort()
+    return {
+        "logins_per_second": round(total / elapsed, 2),
+        "elapsed_seconds": round(elapsed, 3),
+        "loop_lag_p50_ms": round(lags[len(lags) // 2] * 1000, 2) if lags else None,
+        "loop_lag_max_ms": round(lags[-1] * 1000, 2) if lags else None,
+    }
+
+async def main(concurrency, total):
+    hashed = get_password_hash("correct horse battery staple")
+    print(f"bcrypt rounds={BCRYPT_ROUNDS} workers={PASSWORD_HASH_WORKERS} concurrency={concurrency} logins={total}")
+    for name, login in [("inline", _inline_login), ("offloaded", _offloaded_login)]:
+        result = await run_mode(login, concurrency, total, hashed)
+        print(f"{name:<10} {result}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark login password verification under concurrency")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--total", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.total))
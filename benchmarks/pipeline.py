@@ -0,0 +1,147 @@
+# Micro-benchmarks for the CPU-bound steps of the generation pipeline
+#
+#   python -m benchmarks.pipeline [--number 200] [--repeat 5] [--output results.json]
+#
+# Times prompt building, response parsing and validation, and Pydantic model construction
+# for each service, plus each generation end to end with an LLM that answers instantly,
+# so the numbers exclude network and model time entirely.
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+from services.shared.json_extractor import extract_json
+from services.shared.mock_llm_server import FixtureStore
+from services.diet_requirements_generator.handler import DietRequirementsHandler
+from services.diet_requirements_generator.models import DietRequirementLLMOutput, DietRequirementResponse
+from services.food_plate_recommendation.handler import FoodRecommendationHandler
+from services.food_plate_recommendation.models import FoodRecommendationLLMOutput, FoodRecommendationResponse
+from services.special_needs_accommodation.handler import SpecialNeedsHandler
+from services.special_needs_accommodation.models import FeedbackAnalysisLLMOutput
+from benchmarks.results import save_results
+from benchmarks.load_test import PROFILE, MEAL_PREFERENCES
+
+class ReplayLLM:
+    """Answers every request immediately with the recorded response for its task"""
+
+    def __init__(self):
+        self.fixtures = FixtureStore()
+
+    async def generate_response(self, system_prompt, user_prompt, task="default", **kwargs):
+        return self.fixtures.next_response(task)
+
+def _documents():
+    """Stored documents shaped as the services read them back"""
+    fixtures = FixtureStore()
+    diet_output = json.loads(fixtures.next_response("diet"))
+    meal_output = json.loads(fixtures.next_response("meal_plan"))
+    created_at = datetime.utcnow()
+    diet_requirement = {"id": "64b000000000000000000001", "user_id": "user", "created_at": created_at, "status": "completed", **diet_output}
+    food_recommendation = {
+        "id": "64b000000000000000000002",
+        "user_id": "user",
+        "diet_requirement_id": diet_requirement["id"],
+        "created_at": created_at,
+        "status": "completed",
+        **meal_output
+    }
+    return fixtures, diet_requirement, food_recommendation
+
+def benchmarks():
+    """
+    Name and zero-argument callable (plain or coroutine function) of every micro-benchmark
+    """
+    fixtures, diet_requirement, food_recommendation = _documents()
+    diet_response = fixtures.next_response("diet")
+    meal_response = fixtures.next_response("meal_plan")
+    analysis_response = fixtures.next_response("feedback_analysis")
+    diet_data = json.loads(diet_response)
+    meal_data = json.loads(meal_response)
+    feedback = {"feedback_text": "The yogurt made me feel bloated and I do not like salmon", "feedback_type": "negative"}
+
+    diet_handler = DietRequirementsHandler()
+    food_handler = FoodRecommendationHandler()
+    special_needs_handler = SpecialNeedsHandler()
+    for handler in (diet_handler, food_handler, special_needs_handler):
+        handler.llm_client = ReplayLLM()
+
+    async def parse_meal_plan():
+        data = extract_json(meal_response)
+        return await food_handler._salvage_meal_plans(data["meal_plans"], expected_days=list(diet_requirement["daily_requirements"]))
+
+    async def parse_feedback_analysis():
+        return await special_needs_handler._salvage_analysis_fields(extract_json(analysis_response))
+
+    return {
+        "prompt.diet": lambda: diet_handler._create_diet_prompt(PROFILE),
+        "prompt.meal_plan": lambda: food_handler._create_food_prompt(PROFILE, diet_requirement, None, MEAL_PREFERENCES),
+        "prompt.feedback_analysis": lambda: special_needs_handler._create_feedback_prompt(feedback, food_recommendation, PROFILE),
+        "parse.diet": lambda: diet_handler._process_llm_response(diet_response, "user"),
+        "parse.meal_plan": parse_meal_plan,
+        "parse.feedback_analysis": parse_feedback_analysis,
+        "model.diet_llm_output": lambda: DietRequirementLLMOutput(**diet_data),
+        "model.meal_plan_llm_output": lambda: FoodRecommendationLLMOutput(**meal_data),
+        "model.feedback_llm_output": lambda: FeedbackAnalysisLLMOutput(**json.loads(analysis_response)),
+        "model.diet_response": lambda: DietRequirementResponse(status_code=201, **diet_requirement).dict(),
+        "model.meal_plan_response": lambda: FoodRecommendationResponse(**food_recommendation).dict(),
+        "pipeline.diet": lambda: diet_handler.generate_diet_requirements_from_profile(PROFILE, "user"),
+        "pipeline.meal_plan": lambda: food_handler.generate_food_recommendation(
+            "user", {"id": "user", "profile": PROFILE}, diet_requirement, None, MEAL_PREFERENCES
+        ),
+    }
+
+async def _time_calls(function, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        result = function()
+        if asyncio.iscoroutine(result):
+            await result
+    return time.perf_counter() - started
+
+async def run_async(number: int = 200, repeat: int = 5, only: str = None):
+    results = []
+    for name, function in benchmarks().items():
+        if only and not name.startswith(only):
+            continue
+        # One warm-up call so lazy imports and schema building are not timed
+        await _time_calls(function, 1)
+        timings = sorted([await _time_calls(function, number) / number for _ in range(repeat)])
+        results.append({
+            "name": name,
+            "us_per_call_min": round(timings[0] * 1e6, 2),
+            "us_per_call_median": round(timings[len(timings) // 2] * 1e6, 2),
+            "calls_per_second": round(1 / timings[0], 1),
+        })
+    return results
+
+def run(number: int = 200, repeat: int = 5, only: str = None):
+    """
+    Time every micro-benchmark
+
+    Args:
+        number: Calls per timing
+        repeat: Timings per benchmark; the minimum is the least noisy estimate
+        only: Run only benchmarks whose name starts with this prefix (e.g. "parse.")
+
+    Returns:
+        list: One result dict per benchmark
+    """
+    return asyncio.run(run_async(number, repeat, only))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark prompt building, parsing and model construction")
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="run benchmarks whose name starts with this prefix")
+    parser.add_argument("--output", help="JSON file to write; defaults to benchmarks/results/")
+    args = parser.parse_args()
+
+    results = run(args.number, args.repeat, args.only)
+    for result in results:
+        print(f"{result['name']:<30} {result['us_per_call_min']:>12.2f} us  (median {result['us_per_call_median']:.2f} us)")
+    path = save_results("pipeline", results, {"number": args.number, "repeat": args.repeat, "only": args.only}, args.output)
+    print(f"Results written to {path}")
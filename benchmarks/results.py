@@ -0,0 +1,183 @@
+# Benchmark result summaries, JSON storage and regression comparison
+#
+#   python -m benchmarks.results BASELINE.json CURRENT.json [--threshold 0.1]
+#
+# Every benchmark saves its results with the commit and machine they were measured on,
+# so runs from before and after a change can be compared metric by metric.
+import os
+import sys
+import json
+import math
+import platform
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+# Metrics where a larger value is an improvement
+HIGHER_IS_BETTER = ("per_second", "throughput")
+# Latencies, timings and errors, where a smaller value is an improvement. Anything else (request
+# and status counts, elapsed time of a fixed-duration run) is reported but never a regression.
+LOWER_IS_BETTER = ("latency", "lag", "us_per_call", "errors")
+
+def direction(metric: str) -> Optional[str]:
+    """"higher" or "lower" for metrics with a better direction, None for informational ones"""
+    if any(marker in metric for marker in HIGHER_IS_BETTER):
+        return "higher"
+    if any(marker in metric for marker in LOWER_IS_BETTER):
+        return "lower"
+    return None
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: Iterable[float], unit_scale: float = 1000) -> Dict[str, Optional[float]]:
+    """
+    Latency distribution of a set of samples
+
+    Args:
+        latencies: Samples in seconds
+        unit_scale: Multiplier applied to the reported values (milliseconds by default)
+    """
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0}
+
+    def scaled(value):
+        return round(value * unit_scale, 3)
+
+    return {
+        "count": len(values),
+        "mean": scaled(sum(values) / len(values)),
+        "min": scaled(values[0]),
+        "p50": scaled(percentile(values, 0.50)),
+        "p90": scaled(percentile(values, 0.90)),
+        "p95": scaled(percentile(values, 0.95)),
+        "p99": scaled(percentile(values, 0.99)),
+        "max": scaled(values[-1]),
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def environment() -> Dict[str, Any]:
+    """Where and on what the benchmark ran"""
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+    }
+
+def save_results(benchmark: str, results: Any, settings: Optional[Dict[str, Any]] = None, output: Optional[str] = None) -> str:
+    """
+    Write benchmark results as JSON
+
+    Args:
+        benchmark: Benchmark name, used in the default file name
+        results: JSON-serialisable results
+        settings: Parameters the benchmark ran with
+        output: File to write; defaults to benchmarks/results/<benchmark>-<commit>-<time>.json
+
+    Returns:
+        str: Path of the written file
+    """
+    document = {"benchmark": benchmark, "environment": environment(), "settings": settings or {}, "results": results}
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{benchmark}-{document['environment']['commit'] or 'unknown'}-{stamp}.json")
+    with open(output, "w") as file:
+        json.dump(document, file, indent=2, default=str)
+    return output
+
+def flatten(value: Any, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of nested results keyed by dotted path"""
+    if isinstance(value, bool):
+        return {}
+    if isinstance(value, (int, float)):
+        return {prefix: value}
+    leaves = {}
+    if isinstance(value, dict):
+        for key, child in value.items():
+            leaves.update(flatten(child, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(value, list):
+        for index, child in enumerate(value):
+            # Entries with a name are keyed by it so reordering does not break comparisons
+            key = child.get("name", index) if isinstance(child, dict) else index
+            leaves.update(flatten(child, f"{prefix}.{key}" if prefix else str(key)))
+    return leaves
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Metric by metric change between two saved runs
+
+    Returns:
+        list: One entry per metric present in both runs, with the relative change (None
+        from a zero baseline), the metric's better direction (None if informational) and
+        whether it is a regression beyond the threshold
+    """
+    before = flatten(baseline["results"])
+    after = flatten(current["results"])
+    rows = []
+    for metric in sorted(before.keys() & after.keys()):
+        if metric.endswith(".count") or before[metric] == after[metric] == 0:
+            continue
+        better = direction(metric)
+        if before[metric] == 0:
+            # e.g. errors appearing where there were none
+            change = None
+            regression = better == "lower" and after[metric] > 0
+        else:
+            change = (after[metric] - before[metric]) / abs(before[metric])
+            worse = -change if better == "higher" else change
+            regression = better is not None and worse > threshold
+        rows.append({
+            "metric": metric,
+            "baseline": before[metric],
+            "current": after[metric],
+            "change": round(change, 4) if change is not None else None,
+            "direction": better,
+            "regression": regression,
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two saved benchmark runs")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+
+    rows = compare(baseline, current, args.threshold)
+    print(f"{baseline['environment'].get('commit')} -> {current['environment'].get('commit')}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else "" if row["direction"] else "  (informational)"
+        change = f"{row['change']:>+8.1%}" if row["change"] is not None else f"{'new':>8}"
+        print(f"{row['metric']:<70} {row['baseline']:>12} {row['current']:>12} {change}{flag}")
+
+    regressions = sum(row["regression"] for row in rows)
+    print(f"{len(rows)} metrics compared, {regressions} regression(s) beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
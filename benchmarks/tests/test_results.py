@@ -0,0 +1,28 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from benchmarks.results import compare
+
+def load_test_run(requests, p95, errors=0):
+    return {"results": {
+        "requests": requests,
+        "errors": errors,
+        "throughput_per_second": requests / 60,
+        "endpoints": {"dashboard": {
+            "requests": requests, "errors": errors,
+            "latency_ms": {"count": requests, "p95": p95},
+            "statuses": {"200": requests - errors, "500": errors},
+        }},
+    }}
+
+def test_more_requests_in_the_same_time_is_not_a_regression():
+    rows = {row["metric"]: row for row in compare(load_test_run(100, 50.0), load_test_run(150, 50.0))}
+    assert not any(row["regression"] for row in rows.values())
+    assert rows["requests"]["direction"] is None and rows["endpoints.dashboard.statuses.200"]["direction"] is None
+    assert rows["throughput_per_second"]["direction"] == "higher"
+
+def test_slower_latencies_and_new_errors_are_regressions():
+    rows = {row["metric"]: row for row in compare(load_test_run(100, 50.0), load_test_run(100, 60.0, errors=3))}
+    regressions = {metric for metric, row in rows.items() if row["regression"]}
+    assert regressions == {"errors", "endpoints.dashboard.errors", "endpoints.dashboard.latency_ms.p95"}
+    assert rows["errors"]["change"] is None
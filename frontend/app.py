@@ -5,6 +5,10 @@ from datetime import datetime
 import pandas as pd
 import time
 import os
+import sys
+from opentelemetry.trace import SpanKind
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.shared.tracing import configure_tracing, inject_headers, traced, tracer
 
 # Service URLs - Read from environment variables, with local defaults
 USER_MANAGEMENT_URL = os.getenv("USER_MANAGEMENT_URL", "http://user-management:8000/api/v1")
@@ -12,19 +16,71 @@ DIET_REQUIREMENTS_URL = os.getenv("DIET_REQUIREMENTS_URL", "http://diet-requirem
 FOOD_RECOMMENDATION_URL = os.getenv("FOOD_RECOMMENDATION_URL", "http://food-recommendation:8002/api/v1")
 SPECIAL_NEEDS_URL = os.getenv("SPECIAL_NEEDS_URL", "http://special-needs:8003/api/v1")
 
+# Seconds a user's dashboard data is reused across reruns
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "60"))
+
 # Initialize session state
 if "user" not in st.session_state:
     st.session_state.user = None
 if "token" not in st.session_state:
     st.session_state.token = None
+if "dashboard_version" not in st.session_state:
+    st.session_state.dashboard_version = 0
+if "server_timings" not in st.session_state:
+    st.session_state.server_timings = {}
+
+class TracingSession(requests.Session):
+    """Session that traces each call and propagates the trace context to the services"""
+    
+    def request(self, method, url, *args, **kwargs):
+        with tracer.start_as_current_span(f"HTTP {method}", kind=SpanKind.CLIENT, attributes={"http.method": method, "http.url": url}) as client_span:
+            kwargs["headers"] = inject_headers(kwargs.get("headers"))
+            response = super().request(method, url, *args, **kwargs)
+            client_span.set_attribute("http.status_code", response.status_code)
+            return response
+
+@st.cache_resource
+def get_http_session():
+    """
+    Shared HTTP session so connections to the services are pooled and kept alive
+    across calls and reruns
+    """
+    configure_tracing("frontend")
+    session = TracingSession()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 # Page title
 st.title("Virtual Dietician")
 
+def parse_server_timing(header):
+    """Stage durations in milliseconds from a Server-Timing header"""
+    timings = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, *params = [param.strip() for param in entry.split(";")]
+        for param in params:
+            if param.startswith("dur="):
+                timings[name] = float(param[4:])
+    return timings
+
+def record_server_timings(name, response):
+    """Keep the stage timings of a generation call for the debug panel"""
+    debug = response.json().get("debug") or {}
+    timings = debug.get("timings") or parse_server_timing(response.headers.get("Server-Timing", ""))
+    if timings:
+        st.session_state.server_timings[name] = {"recorded_at": datetime.now().strftime("%H:%M:%S"), "timings": timings}
+
+def debug_params():
+    """Ask the services for their stage timings while the debug panel is open"""
+    return {"debug": "true"} if st.session_state.get("show_debug_panel") else None
+
 # Authentication functions
+@traced("frontend.login")
 def login(email, password):
     try:
-        response = requests.post(
+        response = get_http_session().post(
             f"{USER_MANAGEMENT_URL}/token",
             data={"username": email, "password": password}
         )
@@ -41,7 +97,7 @@ def login(email, password):
 
 def register(email, name, password):
     try:
-        response = requests.post(
+        response = get_http_session().post(
             f"{USER_MANAGEMENT_URL}/users/register",
             json={"email": email, "name": name, "password": password}
         )
@@ -61,7 +117,7 @@ def get_user_profile():
     headers = {"Authorization": f"Bearer {st.session_state.token}"}
     
     try:
-        response = requests.get(
+        response = get_http_session().get(
             f"{USER_MANAGEMENT_URL}/users/me",
             headers=headers
         )
@@ -82,13 +138,14 @@ def create_profile(profile_data):
     headers = {"Authorization": f"Bearer {st.session_state.token}"}
     
     try:
-        response = requests.post(
+        response = get_http_session().post(
             f"{USER_MANAGEMENT_URL}/users/profile",
             json=profile_data,
             headers=headers
         )
         if response.status_code == 200:
             st.session_state.user = response.json()
+            invalidate_dashboard()
             return True
         else:
             st.error(f"Error: {response.json()['detail']}")
@@ -104,13 +161,14 @@ def update_profile(profile_data):
     headers = {"Authorization": f"Bearer {st.session_state.token}"}
     
     try:
-        response = requests.put(
+        response = get_http_session().put(
             f"{USER_MANAGEMENT_URL}/users/profile",
             json=profile_data,
             headers=headers
         )
         if response.status_code == 200:
             st.session_state.user = response.json()
+            invalidate_dashboard()
             return True
         else:
             st.error(f"Error: {response.json()['detail']}")
@@ -119,7 +177,41 @@ def update_profile(profile_data):
         st.error(f"Error: {str(e)}")
         return False
 
+# Dashboard data is cached per user across reruns and invalidated after any change
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, max_entries=1000, show_spinner=False)
+def fetch_dashboard(token, version):
+    # version is only part of the cache key; bumping it invalidates the user's entry
+    response = get_http_session().get(
+        f"{USER_MANAGEMENT_URL}/users/me/dashboard",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    # Raise instead of returning so failed responses are not cached
+    response.raise_for_status()
+    return response.json()
+
+@traced("frontend.get_dashboard")
+def get_dashboard():
+    """
+    Fetch the user, latest diet requirements, latest meal recommendation and recent
+    feedback in one request to the user management service
+    """
+    if not st.session_state.token:
+        return None
+    
+    try:
+        data = fetch_dashboard(st.session_state.token, st.session_state.dashboard_version)
+    except Exception:
+        return None
+    
+    st.session_state.user = data["user"]
+    return data
+
+def invalidate_dashboard():
+    """Drop the current user's cached dashboard after generating or submitting data"""
+    st.session_state.dashboard_version += 1
+
 # Diet Requirements functions
+@traced("frontend.generate_diet_requirements")
 def generate_diet_requirements():
     if not st.session_state.token:
         st.error("You must be logged in to generate diet requirements")
@@ -130,7 +222,7 @@ def generate_diet_requirements():
     try:
         with st.spinner("Generating diet requirements..."):
             # First, verify that the token is still valid by making a simple request
-            verify_response = requests.get(
+            verify_response = get_http_session().get(
                 f"{USER_MANAGEMENT_URL}/users/me",
                 headers=headers
             )
@@ -148,13 +240,16 @@ def generate_diet_requirements():
             user_data = st.session_state.user
             
             # Call the diet requirements service directly
-            response = requests.post(
+            response = get_http_session().post(
                 f"{DIET_REQUIREMENTS_URL}/diet-requirements",
                 json={"user_data": user_data},
-                headers=headers
+                headers=headers,
+                params=debug_params()
             )
             
             if response.status_code == 201:
+                invalidate_dashboard()
+                record_server_timings("Diet requirements", response)
                 return response.json()
             elif response.status_code == 401:
                 st.error("Authentication failed. Please log in again.")
@@ -176,45 +271,26 @@ def generate_diet_requirements():
         return None
 
 def get_latest_diet_requirements():
-    if not st.session_state.token:
-        return None
-    
-    headers = {"Authorization": f"Bearer {st.session_state.token}"}
-    
-    try:
-        # Get user_id from the user object
-        user_id = st.session_state.user["id"]
-        
-        # Call the diet requirements service directly
-        response = requests.get(
-            f"{DIET_REQUIREMENTS_URL}/diet-requirements/user/{user_id}/latest",
-            headers=headers
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-    except Exception:
-        return None
+    dashboard = get_dashboard()
+    return dashboard.get("diet_requirement") if dashboard else None
 
 # Food Recommendation functions
+@traced("frontend.generate_food_recommendation")
 def generate_food_recommendation(diet_requirement_id, food_availability=None, meal_preferences=None):
     if not st.session_state.token:
         return None
     
     headers = {"Authorization": f"Bearer {st.session_state.token}"}
     user_id = st.session_state.user["id"]
-    user_data = st.session_state.user
     
-    diet_requirements = get_latest_diet_requirements()
-    if not diet_requirements:
+    if not diet_requirement_id:
         st.error("Please generate diet requirements first")
         return None
     
-    # Prepare request data
+    # Send ids only; the service looks up the user and diet requirements itself
     request_data = {
-        "user_data": user_data,
-        "diet_requirement": diet_requirements,
+        "user_id": user_id,
+        "diet_requirement_id": diet_requirement_id,
         "food_availability": food_availability,
         "meal_preferences": meal_preferences
     }
@@ -222,12 +298,15 @@ def generate_food_recommendation(diet_requirement_id, food_availability=None, me
     try:
         with st.spinner("Generating meal recommendations..."):
             # Call the food recommendation service directly
-            response = requests.post(
+            response = get_http_session().post(
                 f"{FOOD_RECOMMENDATION_URL}/food-recommendation",
                 json=request_data,
-                headers=headers
+                headers=headers,
+                params=debug_params()
             )
             if response.status_code == 201:  # Changed from 200 to 201
+                invalidate_dashboard()
+                record_server_timings("Meal recommendations", response)
                 return response.json()
             else:
                 st.error(f"Error: {response.json().get('detail', 'Unknown error')}")
@@ -237,39 +316,19 @@ def generate_food_recommendation(diet_requirement_id, food_availability=None, me
         return None
 
 def get_latest_food_recommendation():
-    if not st.session_state.token:
-        return None
-    
-    headers = {"Authorization": f"Bearer {st.session_state.token}"}
-    user_id = st.session_state.user["id"]
-    
-    try:
-        # Call the food recommendation service directly
-        response = requests.get(
-            f"{FOOD_RECOMMENDATION_URL}/food-recommendation/user/{user_id}/latest",
-            headers=headers
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-    except Exception:
-        return None
+    dashboard = get_dashboard()
+    return dashboard.get("food_recommendation") if dashboard else None
 
 # Feedback functions
+@traced("frontend.submit_feedback")
 def submit_feedback(food_recommendation_id, feedback_text, feedback_type):
     if not st.session_state.token or not st.session_state.user:
         return None
     
-    user_data = st.session_state.user
-    
-    # Get the food recommendation to include in request
-    food_recommendation = get_latest_food_recommendation()
-    
+    # Send ids only; the service looks up the user and food recommendation itself
     data = {
-        "user_data": user_data,
+        "user_id": st.session_state.user["id"],
         "food_recommendation_id": food_recommendation_id,
-        "food_recommendation": food_recommendation,  # Include full recommendation data
         "feedback_text": feedback_text,
         "feedback_type": feedback_type
     }
@@ -277,11 +336,12 @@ def submit_feedback(food_recommendation_id, feedback_text, feedback_type):
     try:
         with st.spinner("Processing feedback..."):
             # Call the special needs service directly for feedback
-            response = requests.post(
-                f"{SPECIAL_NEEDS_URL}/api/v1/feedback",
+            response = get_http_session().post(
+                f"{SPECIAL_NEEDS_URL}/feedback",
                 json=data
             )
             if response.status_code == 200:
+                invalidate_dashboard()
                 return response.json()
             else:
                 st.error(f"Error: {response.json().get('detail', 'Unknown error')}")
@@ -291,22 +351,8 @@ def submit_feedback(food_recommendation_id, feedback_text, feedback_type):
         return None
 
 def get_user_feedbacks():
-    if not st.session_state.user:
-        return None
-    
-    user_id = st.session_state.user["id"]
-    
-    try:
-        # Call the special needs service directly for user feedbacks
-        response = requests.get(
-            f"{SPECIAL_NEEDS_URL}/feedback/user/{user_id}"
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-    except Exception:
-        return None
+    dashboard = get_dashboard()
+    return dashboard.get("feedbacks") if dashboard else None
 
 # Sidebar navigation
 def sidebar_navigation():
@@ -331,6 +377,9 @@ def sidebar_navigation():
         elif choice == "Feedback & Analysis":
             display_feedback_page()
         
+        if st.sidebar.checkbox("Show debug panel", key="show_debug_panel"):
+            display_debug_panel()
+        
         if st.sidebar.button("Logout"):
             st.session_state.user = None
             st.session_state.token = None
@@ -339,6 +388,15 @@ def sidebar_navigation():
         display_auth_page()
 
 # Page displays
+def display_debug_panel():
+    """Per-stage server timings of the latest generation calls"""
+    with st.sidebar.expander("Server timings", expanded=True):
+        if not st.session_state.server_timings:
+            st.write("Generate diet requirements or meal recommendations to see where the time goes.")
+        for name, entry in st.session_state.server_timings.items():
+            st.write(f"**{name}** at {entry['recorded_at']}")
+            st.table(pd.DataFrame({"ms": list(entry["timings"].values())}, index=list(entry["timings"])))
+
 def display_auth_page():
     tab1, tab2 = st.tabs(["Login", "Register"])
     
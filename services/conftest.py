@@ -0,0 +1,84 @@
+# Test helpers shared by the services' test packages
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+class InsertResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+class CountingCollection:
+    """
+    Minimal stand-in for a Motor collection that counts every round trip
+    """
+
+    def __init__(self):
+        self.documents = {}
+        self.round_trips = 0
+
+    def _matches(self, document, query):
+        for key, condition in query.items():
+            value = document.get(key)
+            if isinstance(condition, dict) and "$type" in condition:
+                if not isinstance(value, dict):
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    async def insert_one(self, document):
+        self.round_trips += 1
+        document.setdefault("_id", ObjectId())
+        self.documents[document["_id"]] = dict(document)
+        return InsertResult(document["_id"])
+
+    async def find_one(self, query, projection=None):
+        self.round_trips += 1
+        for document in self.documents.values():
+            if self._matches(document, query):
+                return {key: value for key, value in document.items() if key not in (projection or {})}
+        return None
+
+    async def update_one(self, query, update):
+        self.round_trips += 1
+        for document in self.documents.values():
+            if self._matches(document, query):
+                self._apply(document, update)
+                return
+
+    async def find_one_and_update(self, query, update, return_document=ReturnDocument.BEFORE):
+        self.round_trips += 1
+        for document in self.documents.values():
+            if self._matches(document, query):
+                self._apply(document, update)
+                return dict(document)
+        return None
+
+    def _apply(self, document, update):
+        for key, value in update.get("$set", {}).items():
+            if "." in key:
+                parent, child = key.split(".", 1)
+                document[parent][child] = value
+            else:
+                document[key] = value
+        for key, value in update.get("$inc", {}).items():
+            document[key] = document.get(key, 0) + value
+
+class FakeLLM:
+    def __init__(self, response):
+        self.response = response
+
+    async def generate_response(self, *args, **kwargs):
+        return self.response
+
+PROFILE = {
+    "age": 30,
+    "gender": "female",
+    "height": 165.0,
+    "weight": 60.0,
+    "diet_type": "vegetarian",
+    "activity_level": "moderate",
+    "health_goal": "maintenance",
+    "allergies": [],
+    "dietary_restrictions": [],
+    "medical_conditions": []
+}
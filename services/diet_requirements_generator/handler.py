@@ -1,18 +1,52 @@
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from services.shared.llm_client import LLMClient
+from services.shared.llm_client import LLMClient, get_llm_client
 from services.shared.database import get_diet_plan_collection
+from services.shared.llm_repair import repair_fragments
+from services.shared.json_extractor import extract_json
+from services.shared.metrics import record_parse_failure
+from services.shared.tracing import span, traced
+from services.shared.repository import DocumentRepository
+from services.shared.llm_responses import LLMResponseStore
+from services.shared.user_summary import UserSummary
 import json
+import asyncio
 from datetime import datetime
-from .models import DietRequirement, DietRequirementStatus, NutritionalValue
+from .models import DietRequirement, DietRequirementStatus, NutritionalValue, DietRequirementLLMOutput
 from bson import ObjectId
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+DAYS_OF_WEEK = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+NUTRITIONAL_VALUE_FORMAT = """
+{
+  "calories": float,       // REQUIRED - daily caloric intake
+  "protein": float,        // REQUIRED - in grams
+  "carbohydrates": float,  // REQUIRED - in grams
+  "fat": float,            // REQUIRED - in grams
+  "fiber": float,          // REQUIRED - in grams
+  "sugar": float,          // optional - in grams
+  "sodium": float          // optional - in milligrams
+}
+"""
 
 class DietRequirementsHandler:
     def __init__(self):
-        self.llm_client = LLMClient()
+        self._llm_client = None
+
+    @property
+    def llm_client(self) -> LLMClient:
+        # Looked up on first use, so importing the service opens no connections before a fork
+        if self._llm_client is None:
+            return get_llm_client()
+        return self._llm_client
+
+    @llm_client.setter
+    def llm_client(self, llm_client: LLMClient):
+        self._llm_client = llm_client
     
+    @traced("diet.prompt_build")
     async def _create_diet_prompt(self, profile: Dict[str, Any]) -> tuple:
         """
         Create system and user prompts for the LLM based on user profile
@@ -29,50 +63,13 @@ class DietRequirementsHandler:
         dietary_restrictions = profile.get("dietary_restrictions", [])
         medical_conditions = profile.get("medical_conditions", [])
         
-        # Create system prompt
-        system_prompt = f"""
+        # Create system prompt; the output format comes from DietRequirementLLMOutput
+        system_prompt = """
     You are a professional nutritionist who specializes in creating personalized diet plans.
     Your task is to generate weekly nutritional requirements for a person based on their profile.
-    Generate daily nutritional values for each day of the week and a weekly average.
-    The response should be structured as a JSON object with the following format:
-
-    {{
-    "daily_requirements": {{
-        "monday": {{
-        "calories": float,  // REQUIRED - daily caloric intake
-        "protein": float,   // REQUIRED - in grams
-        "carbohydrates": float,  // REQUIRED - in grams
-        "fat": float,       // REQUIRED - in grams
-        "fiber": float,     // REQUIRED - in grams
-        "sugar": float,     // optional - in grams
-        "sodium": float,    // optional - in milligrams
-        "vitamins": {{      // optional
-            "vitamin_a": float,
-            "vitamin_c": float,
-            ...
-        }}
-        }},
-        "tuesday": {{ ... }},
-        "wednesday": {{ ... }},
-        "thursday": {{ ... }},
-        "friday": {{ ... }},
-        "saturday": {{ ... }},
-        "sunday": {{ ... }}
-    }},
-    "weekly_average": {{
-        "calories": float,    // REQUIRED
-        "protein": float,     // REQUIRED - in grams
-        "carbohydrates": float,  // REQUIRED - in grams
-        "fat": float,         // REQUIRED - in grams
-        "fiber": float,       // REQUIRED - in grams
-        "sugar": float,       // optional - in grams
-        "sodium": float,      // optional - in milligrams
-        "vitamins": {{ ... }} // optional
-    }}
-    }}
-
-    IMPORTANT: Every daily entry and the weekly average MUST include ALL the REQUIRED fields (calories, protein, carbohydrates, fat, and fiber).
-    Optional fields can be omitted if not relevant.
+    Generate daily nutritional values for each day of the week (lowercase keys "monday" to "sunday") and a weekly average.
+    Every day and the weekly average MUST include calories, protein (g), carbohydrates (g), fat (g) and fiber (g).
+    Sugar (g), sodium (mg) and vitamins are optional.
     Consider the individual's specific needs and provide appropriate nutritional values.
     Only respond with the JSON object, no additional text.
         """
@@ -97,38 +94,84 @@ class DietRequirementsHandler:
         
         return system_prompt, user_prompt
     
+    @traced("diet.validate")
+    async def _salvage_daily_requirements(self, daily_requirements_data: Dict[str, Any]) -> tuple:
+        """
+        Convert parsed daily requirements to Pydantic models, keeping every valid day.
+        Invalid and missing days are sent to the LLM in a single targeted repair request.
+        
+        Returns:
+            tuple: (daily_requirements, unrepaired_days)
+        """
+        daily_requirements = {}
+        invalid_fragments = {}
+        for day, values in daily_requirements_data.items():
+            try:
+                daily_requirements[day] = NutritionalValue(**values)
+            except Exception as e:
+                invalid_fragments[f"daily_requirements.{day}"] = {"value": values, "error": str(e)}
+        
+        # Days the model skipped entirely also need to be requested
+        present_days = {day.lower() for day in daily_requirements} | {path.split(".", 1)[1].lower() for path in invalid_fragments}
+        for day in DAYS_OF_WEEK:
+            if day not in present_days:
+                invalid_fragments[f"daily_requirements.{day}"] = {"value": None, "error": "Missing day"}
+        
+        # Issue a single small repair request for just the invalid or missing days
+        unrepaired_days = []
+        if invalid_fragments:
+            repaired = await repair_fragments(
+                self.llm_client,
+                invalid_fragments,
+                NUTRITIONAL_VALUE_FORMAT,
+                context=f"Valid days from the same plan: {json.dumps({day: value.dict(exclude_none=True) for day, value in daily_requirements.items()})}",
+                task="diet"
+            )
+            for path in invalid_fragments:
+                day = path.split(".", 1)[1]
+                try:
+                    daily_requirements[day] = NutritionalValue(**repaired[path])
+                except Exception:
+                    unrepaired_days.append(day)
+            
+            record_parse_failure("diet", "unrepaired", len(unrepaired_days))
+            
+            # Keep repaired days in weekday order
+            daily_requirements = dict(sorted(
+                daily_requirements.items(),
+                key=lambda item: DAYS_OF_WEEK.index(item[0].lower()) if item[0].lower() in DAYS_OF_WEEK else len(DAYS_OF_WEEK)
+            ))
+        
+        return daily_requirements, unrepaired_days
+    
+    @traced("diet.process_response")
     async def _process_llm_response(self, llm_response: str, user_id: str) -> DietRequirement:
         """
         Process the LLM response and convert it to a DietRequirement object
         This is a private helper method used by other methods
         """
         try:
-             # Clean up the response if it contains markdown code blocks
-            if llm_response.strip().startswith("```"):
-                # Strip out the markdown code block syntax
-                json_str = llm_response.strip()
-                
-                # Remove opening code block marker (```json or just ```)
-                first_newline = json_str.find('\n')
-                if first_newline != -1:
-                    json_str = json_str[first_newline:].strip()
-                
-                # Remove closing code block marker if present
-                if json_str.endswith("```"):
-                    json_str = json_str[:-3].strip()
-                    
-                print(f"Cleaned LLM Response: {json_str}")  # Debugging line
-                diet_data = json.loads(json_str)
-            else:
-                diet_data = json.loads(llm_response)
+            # Extract the JSON value, tolerating code fences, prose and truncation
+            with span("diet.parse"):
+                diet_data = extract_json(llm_response)
             
-            print(f"Parsed LLM Response: {diet_data}")  # Debugging line
-            # Convert the data to Pydantic models
-            daily_requirements = {}
-            for day, values in diet_data["daily_requirements"].items():
-                daily_requirements[day] = NutritionalValue(**values)
+            # Convert the data to Pydantic models, keeping every valid day
+            daily_requirements, unrepaired_days = await self._salvage_daily_requirements(diet_data.get("daily_requirements") or {})
             
-            weekly_average = NutritionalValue(**diet_data["weekly_average"])
+            if not daily_requirements:
+                return DietRequirement(
+                    user_id=user_id,
+                    created_at=datetime.utcnow(),
+                    status=DietRequirementStatus.FAILED,
+                    error_message="No valid daily requirements found in LLM response",
+                    llm_response=llm_response
+                )
+            
+            # The weekly average can be derived locally if it is missing or invalid
+            try:
+                weekly_average = NutritionalValue(**diet_data["weekly_average"])
+            except Exception:
+                weekly_average = self._average_nutritional_values(list(daily_requirements.values()))
             
             # Create and return the diet requirement object
             return DietRequirement(
@@ -137,9 +180,11 @@ class DietRequirementsHandler:
                 status=DietRequirementStatus.COMPLETED,
                 daily_requirements=daily_requirements,
                 weekly_average=weekly_average,
-                llm_response=llm_response
+                llm_response=llm_response,
+                error_message=f"Could not repair requirements for: {', '.join(unrepaired_days)}" if unrepaired_days else None
             )
         except json.JSONDecodeError as e:
+            record_parse_failure("diet", "json")
             return DietRequirement(
                 user_id=user_id,
                 created_at=datetime.utcnow(),
@@ -156,6 +201,19 @@ class DietRequirementsHandler:
                 llm_response=llm_response
             )
     
+    def _average_nutritional_values(self, values: List[NutritionalValue]) -> NutritionalValue:
+        """
+        Compute the average of a list of nutritional values, ignoring fields that are not set
+        This is a private helper method used by other methods
+        """
+        average = {}
+        for field in ["calories", "protein", "carbohydrates", "fat", "fiber", "sugar", "sodium"]:
+            field_values = [getattr(value, field) for value in values if getattr(value, field) is not None]
+            if field_values:
+                average[field] = round(sum(field_values) / len(field_values), 2)
+        
+        return NutritionalValue(**average)
+    
     async def generate_diet_requirements_from_profile(self, user_profile: Dict[str, Any], user_id: str = None) -> DietRequirement:
         """
         Generate diet requirements based on user profile data
@@ -177,11 +235,11 @@ class DietRequirementsHandler:
             llm_response = await self.llm_client.generate_response(
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
-                temperature=0.3  # Lower temperature for more consistent results
+                temperature=0.3,  # Lower temperature for more consistent results
+                response_model=DietRequirementLLMOutput,
+                task="diet"
             )
             
-            print(f"LLM Response: {llm_response}")  # Debugging line
-
             if not llm_response:
                 return DietRequirement(
                     user_id=user_id,
@@ -201,6 +259,7 @@ class DietRequirementsHandler:
                 error_message=f"Error generating diet requirements: {str(e)}"
             )
     
+    @traced("diet.save")
     async def save_diet_requirements(self, diet_requirement: DietRequirement):
         """
         Save diet requirements to database
@@ -209,9 +268,18 @@ class DietRequirementsHandler:
         
         # Convert Pydantic model to dict
         diet_dict = diet_requirement.dict()
+        diet_dict["_id"] = ObjectId()
         
-        # Insert into database
-        result = await diet_plan_collection.insert_one(diet_dict)
+        # Insert into database, with the raw LLM response stored separately, and point the
+        # user's summary at it concurrently
+        result, _ = await asyncio.gather(
+            LLMResponseStore.insert(diet_plan_collection, diet_dict, "diet_plans"),
+            UserSummary.record("diet_requirement", diet_dict)
+        )
+        
+        # Keep the saved document for later stages running in the same process
+        diet_dict.pop("_id", None)
+        DocumentRepository.diet_requirements.set(str(result.inserted_id), {**diet_dict, "id": str(result.inserted_id)})
         
         # Return the ID of the inserted document
         return str(result.inserted_id)
@@ -230,18 +298,16 @@ class DietRequirementsHandler:
     
     async def get_latest_diet_requirement_for_user(self, user_id: str):
         """
-        Get the latest diet requirement for a user
+        Get the latest diet requirement for a user, by id from the user's summary
         """
         diet_plan_collection = await get_diet_plan_collection()
-        diet_requirements = await diet_plan_collection.find(
-            {"user_id": user_id}
-        ).sort("created_at", -1).limit(1).to_list(length=1)
+        diet_requirement = await UserSummary.find_latest(
+            "diet_requirement", user_id, diet_plan_collection, DocumentRepository.get_diet_requirement
+        )
         
-        if diet_requirements:
-            diet_requirement = diet_requirements[0]
-            diet_requirement["id"] = str(diet_requirement.pop("_id"))
-            diet_requirement["status_code"] = 200
-            return diet_requirement
+        if diet_requirement:
+            # The repository's copy is shared with its cache
+            return {**diet_requirement, "status_code": 200}
         
         return None
         
\ No newline at end of file
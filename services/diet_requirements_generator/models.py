@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -18,6 +18,10 @@ class NutritionalValue(BaseModel):
     sodium: Optional[float] = None  # in milligrams
     vitamins: Optional[Dict[str, float]] = None  # key-value pairs for different vitamins
 
+class DietRequirementLLMOutput(BaseModel):
+    daily_requirements: Dict[str, NutritionalValue]  # key is day of week
+    weekly_average: NutritionalValue
+
 class DietRequirement(BaseModel):
     user_id: str
     created_at: datetime
@@ -38,6 +42,7 @@ class DietRequirementResponse(BaseModel):
     status: DietRequirementStatus
     daily_requirements: Optional[Dict[str, NutritionalValue]] = None
     weekly_average: Optional[NutritionalValue] = None
+    debug: Optional[Dict[str, Any]] = None  # Stage timings, when requested with ?debug=true
 
     class Config:
         orm_mode = True
\ No newline at end of file
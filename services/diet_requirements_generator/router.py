@@ -4,6 +4,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from .models import DietRequirementCreate, DietRequirementResponse
 from .handler import DietRequirementsHandler
+from services.shared.server_timing import debug_timings
 from typing import List, Dict, Any
 from pydantic import BaseModel
 
@@ -15,9 +16,10 @@ router = APIRouter()
 handler = DietRequirementsHandler()
 
 @router.post("/diet-requirements", response_model=DietRequirementResponse, status_code=status.HTTP_201_CREATED)
-async def create_diet_requirements(request: UserDataRequest):
+async def create_diet_requirements(request: UserDataRequest, debug: bool = False):
     """
-    Generate diet requirements based on user profile data sent from frontend
+    Generate diet requirements based on user profile data sent from frontend.
+    With debug=true the response includes the time spent in each stage.
     """
     # Extract user profile and ID from the user_data
     user_data = request.user_data
@@ -59,7 +61,8 @@ async def create_diet_requirements(request: UserDataRequest):
         created_at=diet_requirement.created_at,
         status=diet_requirement.status,
         daily_requirements=diet_requirement.daily_requirements,
-        weekly_average=diet_requirement.weekly_average
+        weekly_average=diet_requirement.weekly_average,
+        debug=debug_timings() if debug else None
     )
     
     return response
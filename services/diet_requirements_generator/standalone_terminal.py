@@ -4,12 +4,13 @@ import os
 import json
 from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from services.shared.llm_client import LLMClient
+from services.shared.llm_client import get_llm_client, LLMClientRegistry
+from services.shared.json_extractor import extract_json
 from .models import DietRequirement, DietRequirementStatus, NutritionalValue
 
 class StandaloneDietRequirementsTerminal:
     def __init__(self):
-        self.llm_client = LLMClient()
+        self.llm_client = get_llm_client()
     
     async def collect_user_profile(self):
         """Collect user profile information directly from the terminal"""
@@ -156,7 +157,8 @@ Please provide daily nutritional values for each day of the week (Monday through
             llm_response = await self.llm_client.generate_response(
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
-                temperature=0.3
+                temperature=0.3,
+                task="diet"
             )
             
             if not llm_response:
@@ -164,7 +166,7 @@ Please provide daily nutritional values for each day of the week (Monday through
                 return None
             
             # Parse the JSON response
-            diet_data = json.loads(llm_response)
+            diet_data = extract_json(llm_response)
             
             # Add metadata
             result = {
@@ -278,7 +280,10 @@ Please provide daily nutritional values for each day of the week (Monday through
 
 async def main():
     terminal = StandaloneDietRequirementsTerminal()
-    await terminal.run()
+    try:
+        await terminal.run()
+    finally:
+        await LLMClientRegistry.close_clients()
 
 if __name__ == "__main__":
     asyncio.run(main())
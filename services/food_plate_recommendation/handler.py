@@ -1,20 +1,139 @@
 import sys
 import os
 import json
+import asyncio
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from services.shared.llm_client import LLMClient
-from services.shared.database import get_user_collection, get_diet_plan_collection, get_food_recommendation_collection
+from services.shared.llm_client import LLMClient, get_llm_client
+from services.shared.database import get_food_recommendation_collection
+from services.shared.llm_repair import repair_fragments
+from services.shared.json_extractor import extract_json
+from services.shared.metrics import record_parse_failure
+from services.shared.tracing import span, traced
+from services.shared.repository import DocumentRepository
+from services.shared.llm_responses import LLMResponseStore
+from services.shared.user_summary import UserSummary
 from bson import ObjectId
 from .models import (
     FoodRecommendation, RecommendationStatus, 
-    DailyMealPlan, Meal, FoodItem, MealType
+    DailyMealPlan, Meal, FoodItem, MealType, FoodRecommendationLLMOutput
 )
 
+MEAL_FRAGMENT_FORMAT = """
+Paths of the form "meal_plans.<day>.meals.<index>" are a single meal:
+{
+  "meal_type": "breakfast" | "lunch" | "dinner" | "snack",
+  "food_items": [
+    {
+      "name": string,
+      "quantity": string,
+      "calories": float,
+      "protein": float,
+      "carbohydrates": float,
+      "fat": float,
+      "fiber": float,
+      "preparation_notes": string (optional)
+    }
+  ],
+  "total_calories": float,
+  "total_protein": float,
+  "total_carbohydrates": float,
+  "total_fat": float,
+  "total_fiber": float,
+  "notes": string (optional)
+}
+
+Paths of the form "meal_plans.<day>" are a full day plan:
+{
+  "day": string,
+  "meals": [ <meal>, ... ],
+  "notes": string (optional)
+}
+"""
+
+NUTRIENT_FIELDS = ["calories", "protein", "carbohydrates", "fat", "fiber"]
+
 class FoodRecommendationHandler:
     def __init__(self):
-        self.llm_client = LLMClient()
+        self._llm_client = None
+
+    @property
+    def llm_client(self) -> LLMClient:
+        # Looked up on first use, so importing the service opens no connections before a fork
+        if self._llm_client is None:
+            return get_llm_client()
+        return self._llm_client
+
+    @llm_client.setter
+    def llm_client(self, llm_client: LLMClient):
+        self._llm_client = llm_client
+    
+    @traced("meal_plan.prompt_build")
+    def _create_food_prompt(
+        self,
+        profile: Dict[str, Any],
+        diet_requirement: Dict[str, Any],
+        food_availability: list = None,
+        meal_preferences: dict = None
+    ) -> tuple:
+        """
+        Create the system and user prompts for meal plan generation
+        """
+        # Extract profile data
+        diet_type = profile["diet_type"]
+        allergies = profile.get("allergies", [])
+        dietary_restrictions = profile.get("dietary_restrictions", [])
+        
+        # Create system prompt; the output format comes from FoodRecommendationLLMOutput
+        system_prompt = """
+You are a professional nutritionist who specializes in creating personalized meal plans.
+Your task is to generate daily meal plans for a person based on their nutritional requirements and dietary preferences.
+Generate meal plans for each day of the week (breakfast, lunch, dinner, and optional snacks), keyed by lowercase day name.
+Every food item must include name, quantity, calories, protein, carbohydrates, fat and fiber.
+Ensure the meal plans meet the nutritional requirements for each day.
+Make the meals realistic, varied, practical, and aligned with the person's dietary preferences.
+Provide specific quantities for each food item (e.g., "2 tbsp", "100g", "1 cup").
+Include preparation notes for complex items where helpful.
+Only respond with the JSON object, no additional text.
+"""
+        
+        # Create user prompt with nutritional requirements and preferences
+        user_prompt = f"""
+Generate meal plans for a person with the following profile:
+- Diet type: {diet_type}
+- Allergies: {', '.join(allergies) if allergies else 'None'}
+- Dietary restrictions: {', '.join(dietary_restrictions) if dietary_restrictions else 'None'}
+
+Daily nutritional requirements:
+"""
+        
+        # Add daily nutritional requirements to the prompt
+        for day, values in diet_requirement["daily_requirements"].items():
+            if "calories" in values:
+                user_prompt += f"- Calories: {values['calories']:.1f} kcal\n"
+            if "protein" in values:
+                user_prompt += f"- Protein: {values['protein']:.1f} g\n"
+            if "carbohydrates" in values:
+                user_prompt += f"- Carbohydrates: {values['carbohydrates']:.1f} g\n"
+            if "fat" in values:
+                user_prompt += f"- Fat: {values['fat']:.1f} g\n"
+            if "fiber" in values:
+                user_prompt += f"- Fiber: {values['fiber']:.1f} g\n"
+        
+        # Add food availability constraints if provided
+        if food_availability:
+            user_prompt += f"\nFood availability constraints (only use these foods):\n"
+            for food in food_availability:
+                user_prompt += f"- {food}\n"
+        
+        # Add meal preferences if provided
+        if meal_preferences:
+            user_prompt += f"\nMeal preferences:\n"
+            for meal_type, preferences in meal_preferences.items():
+                user_prompt += f"- {meal_type.capitalize()}: {', '.join(preferences)}\n"
+        
+        return system_prompt, user_prompt
     
     async def generate_food_recommendation(
         self, 
@@ -52,119 +171,16 @@ class FoodRecommendationHandler:
                     error_message="User profile not found"
                 )
             
-            # Extract profile data
-            diet_type = profile["diet_type"]
-            allergies = profile.get("allergies", [])
-            dietary_restrictions = profile.get("dietary_restrictions", [])
-            
-            # Create system prompt
-            system_prompt = f"""
-You are a professional nutritionist who specializes in creating personalized meal plans.
-Your task is to generate daily meal plans for a person based on their nutritional requirements and dietary preferences.
-Generate meal plans for each day of the week (breakfast, lunch, dinner, and optional snacks).
-The response should be structured as a JSON object with the following format:
-
-{{
-  "meal_plans": {{
-    "monday": {{
-      "day": "monday",
-      "meals": [
-        {{
-          "meal_type": "breakfast",
-          "food_items": [
-            {{
-              "name": string,
-              "quantity": string,
-              "calories": float,
-              "protein": float,
-              "carbohydrates": float,
-              "fat": float,
-              "fiber": float,
-              "preparation_notes": string (optional)
-            }},
-            ...
-          ],
-          "total_calories": float,
-          "total_protein": float,
-          "total_carbohydrates": float,
-          "total_fat": float,
-          "total_fiber": float,
-          "notes": string (optional)
-        }},
-        {{
-          "meal_type": "lunch",
-          ...
-        }},
-        {{
-          "meal_type": "dinner",
-          ...
-        }},
-        {{
-          "meal_type": "snack",
-          ...
-        }}
-      ],
-      "total_calories": float,
-      "total_protein": float,
-      "total_carbohydrates": float,
-      "total_fat": float,
-      "total_fiber": float,
-      "notes": string (optional)
-    }},
-    "tuesday": {{ ... }},
-    ...
-    "sunday": {{ ... }}
-  }},
-  "additional_notes": string (optional)
-}}
-
-Ensure the meal plans meet the nutritional requirements for each day.
-Make the meals realistic, varied, practical, and aligned with the person's dietary preferences.
-Provide specific quantities for each food item (e.g., "2 tbsp", "100g", "1 cup").
-Include preparation notes for complex items where helpful.
-Only respond with the JSON object, no additional text.
-"""
-            
-            # Create user prompt with nutritional requirements and preferences
-            user_prompt = f"""
-Generate meal plans for a person with the following profile:
-- Diet type: {diet_type}
-- Allergies: {', '.join(allergies) if allergies else 'None'}
-- Dietary restrictions: {', '.join(dietary_restrictions) if dietary_restrictions else 'None'}
-
-Daily nutritional requirements:
-"""
-            
-            # Add daily nutritional requirements to the prompt
-            for day, values in diet_requirement["daily_requirements"].items():
-                if "calories" in values:
-                    user_prompt += f"- Calories: {values['calories']:.1f} kcal\n"
-                if "protein" in values:
-                    user_prompt += f"- Protein: {values['protein']:.1f} g\n"
-                if "carbohydrates" in values:
-                    user_prompt += f"- Carbohydrates: {values['carbohydrates']:.1f} g\n"
-                if "fat" in values:
-                    user_prompt += f"- Fat: {values['fat']:.1f} g\n"
-                if "fiber" in values:
-                    user_prompt += f"- Fiber: {values['fiber']:.1f} g\n"
-            
-            # Add food availability constraints if provided
-            if food_availability:
-                user_prompt += f"\nFood availability constraints (only use these foods):\n"
-                for food in food_availability:
-                    user_prompt += f"- {food}\n"
-            
-            # Add meal preferences if provided
-            if meal_preferences:
-                user_prompt += f"\nMeal preferences:\n"
-                for meal_type, preferences in meal_preferences.items():
-                    user_prompt += f"- {meal_type.capitalize()}: {', '.join(preferences)}\n"
+            # Create prompts
+            system_prompt, user_prompt = self._create_food_prompt(profile, diet_requirement, food_availability, meal_preferences)
             
             # Call LLM API to generate meal recommendations
             llm_response = await self.llm_client.generate_response(
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
-                temperature=0.5
+                temperature=0.5,
+                response_model=FoodRecommendationLLMOutput,
+                task="meal_plan"
             )
             
             if not llm_response:
@@ -178,57 +194,24 @@ Daily nutritional requirements:
             
             # Parse the JSON response
             try:
-                # Clean up the LLM response if it contains Markdown code blocks
-                cleaned_response = llm_response
-    
-                # Check if the response contains any code block markers
-                if "```" in cleaned_response:
-                    # Split by the first occurrence of ``` with or without json marker
-                    if "```json" in cleaned_response:
-                        cleaned_response = cleaned_response.split("```json", 1)[1]
-                    else:
-                        cleaned_response = cleaned_response.split("```", 1)[1]
-                    
-                    # Remove the closing ``` if present
-                    if "```" in cleaned_response:
-                        cleaned_response = cleaned_response.split("```", 1)[0]
-                
-                # Trim any leading/trailing whitespace
-                cleaned_response = cleaned_response.strip()
-
-                recommendation_data = json.loads(cleaned_response)
+                # Extract the JSON value, tolerating code fences, prose and truncation
+                with span("meal_plan.parse"):
+                    recommendation_data = extract_json(llm_response)
 
-                # Convert the data to Pydantic models
-                meal_plans = {}
-                for day, plan_data in recommendation_data["meal_plans"].items():
-                    # Process meals
-                    meals = []
-                    for meal_data in plan_data["meals"]:
-                        # Process food items
-                        food_items = []
-                        for item_data in meal_data["food_items"]:
-                            food_items.append(FoodItem(**item_data))
-                        
-                        meals.append(Meal(
-                            meal_type=meal_data["meal_type"],
-                            food_items=food_items,
-                            total_calories=meal_data["total_calories"],
-                            total_protein=meal_data["total_protein"],
-                            total_carbohydrates=meal_data["total_carbohydrates"],
-                            total_fat=meal_data["total_fat"],
-                            total_fiber=meal_data["total_fiber"],
-                            notes=meal_data.get("notes")
-                        ))
-                    
-                    meal_plans[day] = DailyMealPlan(
-                        day=plan_data["day"],
-                        meals=meals,
-                        total_calories=plan_data["total_calories"],
-                        total_protein=plan_data["total_protein"],
-                        total_carbohydrates=plan_data["total_carbohydrates"],
-                        total_fat=plan_data["total_fat"],
-                        total_fiber=plan_data["total_fiber"],
-                        notes=plan_data.get("notes")
+                # Convert the data to Pydantic models, keeping every valid day and meal
+                meal_plans, unrepaired_paths = await self._salvage_meal_plans(
+                    recommendation_data.get("meal_plans") or {},
+                    expected_days=list(diet_requirement.get("daily_requirements", {}).keys())
+                )
+                
+                if not meal_plans:
+                    return FoodRecommendation(
+                        user_id=user_id,
+                        diet_requirement_id=diet_requirement_id,
+                        created_at=datetime.utcnow(),
+                        status=RecommendationStatus.FAILED,
+                        error_message="No valid meal plans found in LLM response",
+                        llm_response=llm_response
                     )
                 
                 # Create and return the food recommendation object
@@ -239,9 +222,11 @@ Daily nutritional requirements:
                     status=RecommendationStatus.COMPLETED,
                     meal_plans=meal_plans,
                     additional_notes=recommendation_data.get("additional_notes"),
-                    llm_response=llm_response
+                    llm_response=llm_response,
+                    error_message=f"Could not repair: {', '.join(unrepaired_paths)}" if unrepaired_paths else None
                 )
             except json.JSONDecodeError as e:
+                record_parse_failure("meal_plan", "json")
                 return FoodRecommendation(
                     user_id=user_id,
                     diet_requirement_id=diet_requirement_id,
@@ -269,6 +254,101 @@ Daily nutritional requirements:
                 error_message=f"Error generating food recommendations: {str(e)}"
             )
     
+    def _build_meal(self, meal_data: Dict[str, Any]) -> Meal:
+        """
+        Build a Meal from parsed LLM output, deriving missing totals from its food items
+        """
+        food_items = [FoodItem(**item_data) for item_data in meal_data["food_items"]]
+        totals = {}
+        for field in NUTRIENT_FIELDS:
+            value = meal_data.get(f"total_{field}")
+            totals[f"total_{field}"] = value if value is not None else sum(getattr(item, field) for item in food_items)
+        
+        return Meal(
+            meal_type=meal_data["meal_type"],
+            food_items=food_items,
+            notes=meal_data.get("notes"),
+            **totals
+        )
+    
+    def _build_daily_meal_plan(self, day: str, plan_data: Dict[str, Any], meals: list) -> DailyMealPlan:
+        """
+        Build a DailyMealPlan from already validated meals, deriving missing or invalid totals from the meals
+        """
+        derived_totals = {
+            f"total_{field}": sum(getattr(meal, f"total_{field}") for meal in meals)
+            for field in NUTRIENT_FIELDS
+        }
+        try:
+            totals = {key: plan_data.get(key) if plan_data.get(key) is not None else value for key, value in derived_totals.items()}
+            return DailyMealPlan(day=plan_data.get("day", day), meals=meals, notes=plan_data.get("notes"), **totals)
+        except Exception:
+            return DailyMealPlan(day=day, meals=meals, **derived_totals)
+    
+    @traced("meal_plan.validate")
+    async def _salvage_meal_plans(self, meal_plans_data: Dict[str, Any], expected_days: list = None) -> tuple:
+        """
+        Convert parsed meal plans to Pydantic models, keeping every valid meal.
+        Invalid meals, invalid days and missing days are sent to the LLM in a single
+        targeted repair request instead of failing the whole recommendation.
+        
+        Returns:
+            tuple: (meal_plans, unrepaired_paths)
+        """
+        day_data = {}
+        meals_by_day = {}
+        invalid_fragments = {}
+        
+        for day, plan_data in meal_plans_data.items():
+            if not isinstance(plan_data, dict) or not isinstance(plan_data.get("meals"), list):
+                invalid_fragments[f"meal_plans.{day}"] = {"value": plan_data, "error": "Day plan must be an object with a list of meals"}
+                continue
+            
+            day_data[day] = plan_data
+            meals_by_day[day] = {}
+            for index, meal_data in enumerate(plan_data["meals"]):
+                try:
+                    meals_by_day[day][index] = self._build_meal(meal_data)
+                except Exception as e:
+                    invalid_fragments[f"meal_plans.{day}.meals.{index}"] = {"value": meal_data, "error": str(e)}
+        
+        # Days present in the diet requirement but skipped by the model
+        present_days = {day.lower() for day in meal_plans_data}
+        for day in expected_days or []:
+            if day.lower() not in present_days:
+                invalid_fragments[f"meal_plans.{day}"] = {"value": None, "error": "Missing day plan"}
+        
+        unrepaired_paths = []
+        if invalid_fragments:
+            repaired = await repair_fragments(self.llm_client, invalid_fragments, MEAL_FRAGMENT_FORMAT, task="meal_plan")
+            for path in invalid_fragments:
+                parts = path.split(".")
+                day = parts[1]
+                try:
+                    if len(parts) == 4:
+                        meals_by_day[day][int(parts[3])] = self._build_meal(repaired[path])
+                    else:
+                        day_plan = repaired[path]
+                        meals_by_day[day] = {
+                            index: self._build_meal(meal_data)
+                            for index, meal_data in enumerate(day_plan["meals"])
+                        }
+                        day_data[day] = day_plan
+                except Exception:
+                    unrepaired_paths.append(path)
+            record_parse_failure("meal_plan", "unrepaired", len(unrepaired_paths))
+        
+        # Keep repaired days in the order of the diet requirement
+        day_order = [day.lower() for day in expected_days or []]
+        meal_plans = {}
+        for day, plan_data in sorted(day_data.items(), key=lambda item: day_order.index(item[0].lower()) if item[0].lower() in day_order else len(day_order)):
+            meals = [meals_by_day[day][index] for index in sorted(meals_by_day[day])]
+            if meals:
+                meal_plans[day] = self._build_daily_meal_plan(day, plan_data, meals)
+        
+        return meal_plans, unrepaired_paths
+    
+    @traced("meal_plan.save")
     async def save_food_recommendation(self, recommendation: FoodRecommendation):
         """
         Save food recommendation to database
@@ -277,9 +357,18 @@ Daily nutritional requirements:
         
         # Convert Pydantic model to dict
         recommendation_dict = recommendation.dict()
+        recommendation_dict["_id"] = ObjectId()
+        
+        # Insert into database, with the raw LLM response stored separately, and point the
+        # user's summary at it concurrently
+        result, _ = await asyncio.gather(
+            LLMResponseStore.insert(food_recommendation_collection, recommendation_dict, "food_recommendations"),
+            UserSummary.record("food_recommendation", recommendation_dict)
+        )
         
-        # Insert into database
-        result = await food_recommendation_collection.insert_one(recommendation_dict)
+        # Keep the saved document for later stages running in the same process
+        recommendation_dict.pop("_id", None)
+        DocumentRepository.food_recommendations.set(str(result.inserted_id), {**recommendation_dict, "id": str(result.inserted_id)})
         
         # Return the ID of the inserted document
         return str(result.inserted_id)
@@ -299,16 +388,15 @@ Daily nutritional requirements:
     
     async def get_latest_recommendation_for_user(self, user_id: str):
         """
-        Get the latest food recommendation for a user
+        Get the latest food recommendation for a user, by id from the user's summary
         """
         food_recommendation_collection = await get_food_recommendation_collection()
-        recommendations = await food_recommendation_collection.find(
-            {"user_id": user_id}
-        ).sort("created_at", -1).limit(1).to_list(length=1)
+        recommendation = await UserSummary.find_latest(
+            "food_recommendation", user_id, food_recommendation_collection, DocumentRepository.get_food_recommendation
+        )
         
-        if recommendations:
-            recommendation = recommendations[0]
-            recommendation["id"] = str(recommendation.pop("_id"))
-            return recommendation
+        if recommendation:
+            # The repository's copy is shared with its cache
+            return dict(recommendation)
         
         return None
\ No newline at end of file
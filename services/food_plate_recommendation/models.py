@@ -44,6 +44,10 @@ class DailyMealPlan(BaseModel):
     total_fiber: float
     notes: Optional[str] = None
 
+class FoodRecommendationLLMOutput(BaseModel):
+    meal_plans: Dict[str, DailyMealPlan]  # key is day of week
+    additional_notes: Optional[str] = None
+
 class FoodRecommendation(BaseModel):
     user_id: str
     diet_requirement_id: str
@@ -67,12 +71,16 @@ class FoodRecommendationResponse(BaseModel):
     status: RecommendationStatus
     meal_plans: Optional[Dict[str, DailyMealPlan]] = None
     additional_notes: Optional[str] = None
+    debug: Optional[Dict[str, Any]] = None  # Stage timings, when requested with ?debug=true
 
     class Config:
         orm_mode = True
 
 class UserDataRequest(BaseModel):
-    user_data: Dict[str, Any]
-    diet_requirement: Dict[str, Any]
+    # Either the full documents or their ids, which are then looked up by the service
+    user_data: Optional[Dict[str, Any]] = None
+    user_id: Optional[str] = None
+    diet_requirement: Optional[Dict[str, Any]] = None
+    diet_requirement_id: Optional[str] = None
     food_availability: Optional[List[str]] = None
     meal_preferences: Optional[Dict[str, List[str]]] = None
\ No newline at end of file
@@ -2,22 +2,33 @@ from fastapi import APIRouter, HTTPException, status
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from .models import FoodRecommendationCreate, FoodRecommendationResponse, UserDataRequest
+from .models import FoodRecommendationResponse, UserDataRequest
 from .handler import FoodRecommendationHandler
-from typing import List, Dict, Any
-from pydantic import BaseModel
+from services.shared.repository import DocumentRepository
+from services.shared.server_timing import debug_timings
+from services.shared.tracing import span
 
 router = APIRouter()
 handler = FoodRecommendationHandler()
 
 @router.post("/food-recommendation", response_model=FoodRecommendationResponse, status_code=status.HTTP_201_CREATED)
-async def create_food_recommendation(request: UserDataRequest):
+async def create_food_recommendation(request: UserDataRequest, debug: bool = False):
     """
-    Generate food recommendations based on diet requirements
+    Generate food recommendations based on diet requirements.
+    With debug=true the response includes the time spent in each stage.
     """
-    # Extract user ID from the user_data
+    # Use the inline documents when given, otherwise resolve them from their ids
     user_data = request.user_data
-    user_id = user_data.get("id")
+    if user_data is None and request.user_id:
+        with span("meal_plan.lookup"):
+            user_data = await DocumentRepository.get_user(request.user_id)
+        if not user_data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+    
+    user_id = (user_data or {}).get("id")
     
     if not user_id:
         raise HTTPException(
@@ -25,9 +36,17 @@ async def create_food_recommendation(request: UserDataRequest):
             detail="User ID not provided in user_data"
         )
     
-    # Extract diet requirement ID
     diet_requirement = request.diet_requirement
-    diet_requirement_id = diet_requirement.get("id")
+    if diet_requirement is None and request.diet_requirement_id:
+        with span("meal_plan.lookup"):
+            diet_requirement = await DocumentRepository.get_diet_requirement(request.diet_requirement_id)
+        if not diet_requirement:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Diet requirement not found"
+            )
+    
+    diet_requirement_id = (diet_requirement or {}).get("id")
     
     if not diet_requirement_id:
         raise HTTPException(
@@ -35,7 +54,6 @@ async def create_food_recommendation(request: UserDataRequest):
             detail="Diet requirement ID not found in diet_requirement"
         )
     
-    
     # Generate food recommendations
     food_recommendation = await handler.generate_food_recommendation(
         user_id=user_id,
@@ -48,10 +66,8 @@ async def create_food_recommendation(request: UserDataRequest):
     # Save to database
     recommendation_id = await handler.save_food_recommendation(food_recommendation)
     
-    # Get the saved recommendation
-    saved_recommendation = await handler.get_recommendation_by_id(recommendation_id)
-    
-    return saved_recommendation
+    # Build the response from the saved model instead of reading it back
+    return {**food_recommendation.dict(), "id": recommendation_id, "debug": debug_timings() if debug else None}
 
 @router.get("/food-recommendation/user/{user_id}/latest", response_model=FoodRecommendationResponse)
 async def get_latest_food_recommendation(user_id: str):
@@ -4,11 +4,12 @@ import os
 import json
 from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from services.shared.llm_client import LLMClient
+from services.shared.llm_client import get_llm_client, LLMClientRegistry
+from services.shared.json_extractor import extract_json
 
 class StandaloneFoodRecommendationTerminal:
     def __init__(self):
-        self.llm_client = LLMClient()
+        self.llm_client = get_llm_client()
     
     async def load_diet_requirements_from_file(self, file_path):
         """Load diet requirements from a JSON file"""
@@ -151,7 +152,8 @@ Weekly Average:
             llm_response = await self.llm_client.generate_response(
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
-                temperature=0.5
+                temperature=0.5,
+                task="meal_plan"
             )
             
             if not llm_response:
@@ -159,7 +161,7 @@ Weekly Average:
                 return None
             
             # Parse the JSON response
-            food_recommendation_data = json.loads(llm_response)
+            food_recommendation_data = extract_json(llm_response)
             
             # Add metadata
             result = {
@@ -274,7 +276,10 @@ Weekly Average:
 
 async def main():
     terminal = StandaloneFoodRecommendationTerminal()
-    await terminal.run()
+    try:
+        await terminal.run()
+    finally:
+        await LLMClientRegistry.close_clients()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,102 @@
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+import uvicorn
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from services.shared.database import Database
+from services.shared.metrics import setup_metrics
+from services.shared.tracing import setup_tracing
+from services.shared.loop_monitor import setup_loop_monitor
+from services.shared.profiling import setup_profiling
+from services.shared.server_timing import setup_server_timing
+from services.shared.llm_client import LLMClientRegistry
+from services.user_management.router import router as user_management_router
+from services.user_management.auth import shutdown_password_executor
+from services.user_management.dashboard import DashboardAggregator
+from services.diet_requirements_generator import router as diet_requirements
+from services.diet_requirements_generator.models import DietRequirementResponse
+from services.food_plate_recommendation import router as food_recommendation
+from services.food_plate_recommendation.models import FoodRecommendationResponse
+from services.special_needs_accommodation import router as special_needs
+from services.special_needs_accommodation.models import FeedbackResponse
+
+app = FastAPI(
+    title="Virtual Dietician",
+    description="All services in one process, sharing the MongoDB pool, LLM client and caches"
+)
+
+# CORS settings
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Prometheus metrics at /metrics
+setup_metrics(app)
+
+# OpenTelemetry tracing, exported according to OTEL_TRACES_EXPORTER
+setup_tracing(app, "monolith")
+
+# Event loop lag and stall detection, with stack traces when LOOP_STALL_DEBUG=true
+setup_loop_monitor(app)
+
+# Per-request profiling for requests carrying PROFILING_TOKEN
+setup_profiling(app)
+
+# Per-stage durations in a Server-Timing header on every response
+setup_server_timing(app)
+
+# Include routers; their paths do not overlap, so every service keeps its URLs under one host
+app.include_router(user_management_router, prefix="/api/v1")
+app.include_router(diet_requirements.router, prefix="/api/v1")
+app.include_router(food_recommendation.router, prefix="/api/v1")
+app.include_router(special_needs.router, prefix="/api/v1")
+
+# The dashboard calls the handlers directly instead of going back out over HTTP.
+# Documents are shaped by the same response models the HTTP endpoints use.
+async def latest_diet_requirement(user_id: str):
+    requirement = await diet_requirements.handler.get_latest_diet_requirement_for_user(user_id)
+    return DietRequirementResponse(**requirement).dict() if requirement else None
+
+async def latest_food_recommendation(user_id: str):
+    recommendation = await food_recommendation.handler.get_latest_recommendation_for_user(user_id)
+    return FoodRecommendationResponse(**recommendation).dict() if recommendation else None
+
+async def user_feedbacks(user_id: str):
+    feedbacks = await special_needs.handler.get_user_feedbacks(user_id)
+    return [FeedbackResponse(**feedback).dict() for feedback in feedbacks]
+
+DashboardAggregator.use_local_source("diet_requirement", latest_diet_requirement)
+DashboardAggregator.use_local_source("food_recommendation", latest_food_recommendation)
+DashboardAggregator.use_local_source("feedbacks", user_feedbacks)
+
+@app.on_event("startup")
+async def startup_db_client():
+    await Database.connect_db()
+
+@app.on_event("startup")
+async def startup_llm_client():
+    await LLMClientRegistry.warm_up()
+
+@app.on_event("shutdown")
+async def shutdown_db_client():
+    await Database.close_db_connection()
+
+@app.on_event("shutdown")
+async def shutdown_llm_client():
+    await LLMClientRegistry.close_clients()
+
+@app.on_event("shutdown")
+async def shutdown_password_hashing():
+    shutdown_password_executor()
+
+@app.on_event("shutdown")
+async def shutdown_dashboard_client():
+    await DashboardAggregator.close()
+
+if __name__ == "__main__":
+    uvicorn.run("main:app", host="0.0.0.0", port=8080, reload=True)
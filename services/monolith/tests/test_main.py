@@ -0,0 +1,51 @@
+import os
+import sys
+import asyncio
+from collections import Counter
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from services.monolith.main import app
+from services.user_management.dashboard import DashboardAggregator
+from services.diet_requirements_generator import router as diet_requirements
+from services.food_plate_recommendation import router as food_recommendation
+from services.special_needs_accommodation import router as special_needs
+
+def test_all_service_routes_are_mounted_once():
+    routes = Counter((route.path, method) for route in app.routes for method in getattr(route, "methods", ()))
+    for path, method in [
+        ("/api/v1/token", "POST"),
+        ("/api/v1/users/me/dashboard", "GET"),
+        ("/api/v1/diet-requirements", "POST"),
+        ("/api/v1/food-recommendation", "POST"),
+        ("/api/v1/feedback", "POST"),
+        ("/api/v1/special-needs-plan", "POST"),
+    ]:
+        assert routes[(path, method)] == 1
+    assert all(count == 1 for count in routes.values())
+
+def test_dashboard_calls_handlers_in_process(monkeypatch):
+    now = datetime.utcnow()
+
+    async def latest_diet_requirement(user_id):
+        return {"id": "requirement", "user_id": user_id, "status_code": 200, "created_at": now, "status": "completed", "llm_response": "raw"}
+
+    async def latest_food_recommendation(user_id):
+        return None
+
+    async def user_feedbacks(user_id):
+        return [{"id": "feedback", "user_id": user_id, "food_recommendation_id": "recommendation", "feedback_text": "Good", "feedback_type": "positive", "created_at": now}]
+
+    monkeypatch.setattr(diet_requirements.handler, "get_latest_diet_requirement_for_user", latest_diet_requirement)
+    monkeypatch.setattr(food_recommendation.handler, "get_latest_recommendation_for_user", latest_food_recommendation)
+    monkeypatch.setattr(special_needs.handler, "get_user_feedbacks", user_feedbacks)
+    # Any HTTP call would fail, since nothing listens on these hosts
+    monkeypatch.setattr(DashboardAggregator, "http_client", None)
+
+    dashboard = asyncio.run(DashboardAggregator.build({"id": "user"}))
+
+    assert dashboard["errors"] == {}
+    assert dashboard["diet_requirement"]["id"] == "requirement"
+    assert "llm_response" not in dashboard["diet_requirement"]
+    assert "food_recommendation" not in dashboard
+    assert [feedback["id"] for feedback in dashboard["feedbacks"]] == ["feedback"]
@@ -2,29 +2,46 @@
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from services.shared.metrics import MongoCommandListener
+from services.shared.logger import get_logger
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
+# "mongodb" (default) or "memory" for the in-process stand-in used in load tests
+MONGODB_BACKEND = os.getenv("MONGODB_BACKEND", "mongodb").lower()
+
 class Database:    
     client = None
     db = None
     
     @classmethod
     async def connect_db(cls):
-        """Connect to MongoDB database"""
+        """Connect to MongoDB database, reusing the existing connection pool if already connected"""
+        if cls.db is not None:
+            return cls.db
+        
         # First check if MongoDB URL is set in environment
         mongo_uri = os.getenv("MONGODB_URL", "mongodb://mongodb:27017")
         db_name = os.getenv("DATABASE_NAME", "virtual_dietician")
         
-        print(f"Connecting to MongoDB at: {mongo_uri}")
+        if MONGODB_BACKEND == "memory":
+            from services.shared.memory_db import MemoryClient
+            cls.client = MemoryClient()
+            cls.db = cls.client[db_name]
+            logger.info("Using in-memory database", extra={"database": db_name})
+            return cls.db
+        
+        logger.info("Connecting to MongoDB", extra={"mongo_uri": mongo_uri})
         
         try:
-            cls.client = AsyncIOMotorClient(mongo_uri)
+            cls.client = AsyncIOMotorClient(mongo_uri, event_listeners=[MongoCommandListener()])
             cls.db = cls.client[db_name]
-            print(f"Connected to MongoDB database: {db_name}")
+            logger.info("Connected to MongoDB", extra={"database": db_name})
             return cls.db
         except Exception as e:
-            print(f"Failed to connect to MongoDB: {str(e)}")
+            logger.error("Failed to connect to MongoDB", extra={"error": str(e)})
             raise
     
     @classmethod
@@ -32,7 +49,9 @@ class Database:
         """Close MongoDB connection"""
         if cls.client is not None:
             cls.client.close()
-            print("MongoDB connection closed")
+            cls.client = None
+            cls.db = None
+            logger.info("MongoDB connection closed")
 
 # Get specific collections
 async def get_user_collection():
@@ -53,4 +72,12 @@ async def get_feedback_collection():
 
 async def get_special_needs_collection():
     db = await Database.connect_db()
-    return db.special_needs
\ No newline at end of file
+    return db.special_needs
+
+async def get_llm_response_collection():
+    db = await Database.connect_db()
+    return db.llm_responses
+
+async def get_user_summary_collection():
+    db = await Database.connect_db()
+    return db.user_summaries
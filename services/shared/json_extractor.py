@@ -0,0 +1,196 @@
+# Utility for extracting JSON values from LLM responses
+import json
+import re
+from typing import Any, List, Optional
+
+# Characters that matter outside and inside of JSON strings
+_STRUCTURAL = re.compile(r'[{}\[\],"]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_VALUE_START = re.compile(r'[{\[]')
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+_decoder = json.JSONDecoder()
+
+class JSONStreamExtractor:
+    """
+    Incrementally locate the outermost JSON object or array in LLM output.
+
+    Text before the value (markdown fences, prose) and after it is ignored. Trailing
+    commas are dropped and a truncated tail is closed at the last complete member,
+    so a response cut off by a token limit still yields every complete value.
+
+    Chunks can be fed as they are streamed; each character is scanned only once.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._offset = 0  # global position of the start of the current chunk
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._safe = None  # position up to which the text is a valid prefix
+        self._safe_depth = 0  # number of open containers at that position
+        self._pending_comma: Optional[int] = None
+        self._dropped_commas: List[int] = []
+
+    @property
+    def complete(self) -> bool:
+        """Whether the outermost value has been closed"""
+        return self._end is not None
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Scan the next chunk of text
+
+        Args:
+            chunk: Next piece of the LLM response
+
+        Returns:
+            bool: True once the outermost value is complete
+        """
+        if not chunk or self._end is not None:
+            return self._end is not None
+
+        self._chunks.append(chunk)
+        offset = self._offset
+        self._offset += len(chunk)
+        pos = 0
+
+        if self._start is None:
+            match = _VALUE_START.search(chunk)
+            if not match:
+                return False
+            pos = match.start()
+            self._start = offset + pos
+
+        length = len(chunk)
+        while pos < length:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    pos += 1
+                    continue
+                match = _STRING_SPECIAL.search(chunk, pos)
+                if not match:
+                    break
+                pos = match.end()
+                if match.group() == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                continue
+
+            match = _STRUCTURAL.search(chunk, pos)
+            if not match:
+                if self._pending_comma is not None and chunk[pos:].strip():
+                    self._pending_comma = None
+                break
+
+            char = match.group()
+            index = match.start()
+            if self._pending_comma is not None and chunk[pos:index].strip():
+                self._pending_comma = None
+            pos = match.end()
+
+            if char == '"':
+                self._in_string = True
+                self._pending_comma = None
+            elif char == "{" or char == "[":
+                self._stack.append(_CLOSERS[char])
+                self._pending_comma = None
+                # Nested containers are only kept once complete; the outermost one is always kept
+                if len(self._stack) == 1:
+                    self._safe = offset + pos
+                    self._safe_depth = 1
+            elif char == ",":
+                self._pending_comma = offset + index
+                self._safe = offset + index
+                self._safe_depth = len(self._stack)
+            else:
+                if self._pending_comma is not None:
+                    self._dropped_commas.append(self._pending_comma)
+                    self._pending_comma = None
+                if self._stack:
+                    self._stack.pop()
+                self._safe = offset + pos
+                self._safe_depth = len(self._stack)
+                if not self._stack:
+                    self._end = offset + pos
+                    return True
+
+        return False
+
+    def text(self) -> str:
+        """
+        Return the JSON text of the outermost value, with trailing commas removed and a truncated tail closed
+        """
+        if self._start is None:
+            raise json.JSONDecodeError("No JSON value found in response", "".join(self._chunks), 0)
+
+        buffer = "".join(self._chunks) if len(self._chunks) > 1 else self._chunks[0]
+        end = self._end if self._end is not None else self._safe
+
+        pieces = []
+        cursor = self._start
+        for comma in self._dropped_commas:
+            if comma >= end:
+                break
+            pieces.append(buffer[cursor:comma])
+            cursor = comma + 1
+        pieces.append(buffer[cursor:end])
+
+        if self._end is None:
+            pieces.append("".join(reversed(self._stack[:self._safe_depth])))
+
+        return "".join(pieces)
+
+    def value(self) -> Any:
+        """
+        Parse and return the outermost value
+
+        Raises:
+            json.JSONDecodeError: If no JSON value can be recovered
+        """
+        return json.loads(self.text())
+
+def extract_json(llm_response: str) -> Any:
+    """
+    Extract the outermost JSON object or array from an LLM response
+
+    Well-formed output is decoded in place by the C parser with raw_decode from the
+    first bracket, so markdown code fences and surrounding prose cost no string copies.
+    Only if that fails (trailing commas, truncated tails) is the value scanned by the
+    tolerant JSONStreamExtractor.
+
+    Args:
+        llm_response: Raw text returned by the model
+
+    Returns:
+        The decoded JSON value
+
+    Raises:
+        json.JSONDecodeError: If no JSON value can be recovered
+    """
+    if not llm_response:
+        raise json.JSONDecodeError("Empty response", llm_response or "", 0)
+
+    # Skip any prose before a code fence so braces in the prose are not mistaken for the value
+    fence = llm_response.find("```")
+    match = _VALUE_START.search(llm_response, fence if fence != -1 else 0)
+    if match is None and fence != -1:
+        match = _VALUE_START.search(llm_response)
+    if match is None:
+        raise json.JSONDecodeError("No JSON value found in response", llm_response, 0)
+
+    try:
+        return _decoder.raw_decode(llm_response, match.start())[0]
+    except json.JSONDecodeError:
+        pass
+
+    # Malformed: fall back to the tolerant scan from the start of the value
+    extractor = JSONStreamExtractor()
+    extractor.feed(llm_response[match.start():])
+    return extractor.value()
@@ -0,0 +1,131 @@
+# Record and replay LLM responses for deterministic performance tests
+#
+# LLM_CASSETTE_MODE selects what LLMClient does with the cassette at LLM_CASSETTE_PATH:
+#   off      call the provider (default)
+#   record   call the provider and append every response to the cassette
+#   replay   answer from the cassette only; a request that was never recorded fails
+#   auto     replay when recorded, otherwise call the provider and record
+#
+# Entries are keyed by a hash of the prompts and generation settings and keep the response,
+# the model that produced it, its latency and token counts. Replayed calls wait for the
+# recorded latency multiplied by LLM_CASSETTE_TIME_SCALE (0 answers immediately).
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Type
+from pydantic import BaseModel
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "llm_cassette.jsonl")
+CASSETTE_TIME_SCALE = float(os.getenv("LLM_CASSETTE_TIME_SCALE", "1.0"))
+
+MODES = ("off", "record", "replay", "auto")
+
+class CassetteMissError(LookupError):
+    """A replayed request has no recording in the cassette"""
+
+class LLMCassette:
+    """
+    Recorded LLM calls stored as JSON lines, one entry per call.
+
+    A prompt recorded several times is replayed in the recorded order, cycling back to the
+    first recording once all have been used.
+    """
+    instances: Dict[str, "LLMCassette"] = {}
+
+    def __init__(self, path: str, mode: str = "replay", time_scale: float = 1.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode}, expected one of: {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMCassette"]:
+        """The process-wide cassette configured by the environment, or None when off"""
+        if CASSETTE_MODE == "off":
+            return None
+        if CASSETTE_PATH not in cls.instances:
+            cls.instances[CASSETTE_PATH] = cls(CASSETTE_PATH, CASSETTE_MODE, CASSETTE_TIME_SCALE)
+        return cls.instances[CASSETTE_PATH]
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode in ("replay", "auto")
+
+    @property
+    def recording(self) -> bool:
+        return self.mode in ("record", "auto")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries.setdefault(entry["key"], []).append(entry)
+
+    @staticmethod
+    def key(
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        response_model: Optional[Type[BaseModel]] = None,
+        json_mode: bool = False,
+        task: str = "default"
+    ) -> str:
+        """Hash identifying a request by everything that shapes its response"""
+        request = {
+            "system_prompt": system_prompt,
+            "user_prompt": user_prompt,
+            "temperature": temperature,
+            "response_model": response_model.__name__ if response_model is not None else None,
+            "json_mode": json_mode,
+            "task": task,
+        }
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+    def next_entry(self, key: str) -> Dict[str, Any]:
+        """
+        The next recording for a request
+
+        Raises:
+            CassetteMissError: If the request was never recorded
+        """
+        with self._lock:
+            recordings = self.entries.get(key)
+            if not recordings:
+                raise CassetteMissError(f"No recorded LLM response for request {key[:12]} in {self.path}")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            return recordings[position % len(recordings)]
+
+    def has(self, key: str) -> bool:
+        return bool(self.entries.get(key))
+
+    def record(self, key: str, task: str, model: Optional[str], response: Optional[str], latency: float, usage: Any = None):
+        """Append one call; a None response records that every model failed"""
+        entry = {
+            "key": key,
+            "task": task,
+            "model": model,
+            "response": response,
+            "latency": round(latency, 4),
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+            "recorded_at": datetime.utcnow().isoformat(),
+        }
+        with self._lock:
+            self.entries.setdefault(key, []).append(entry)
+            with open(self.path, "a") as file:
+                file.write(json.dumps(entry) + "\n")
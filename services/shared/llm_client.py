@@ -1,37 +1,282 @@
 # LLM utility for Groq API interactions
 import os
+import json
+import time
+import asyncio
 import groq
+import httpx
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Optional, Type, Dict
+from pydantic import BaseModel
 from dotenv import load_dotenv
+from services.shared.llm_router import ModelRouter, DEFAULT_MODEL
+from services.shared.metrics import LLM_REQUESTS_IN_FLIGHT, record_llm_call
+from services.shared.tracing import span
+from services.shared.server_timing import record as record_timing
+from services.shared.llm_cassette import LLMCassette
+from services.shared.logger import get_logger
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
+@lru_cache(maxsize=None)
+def _json_schema(response_model: Type[BaseModel]) -> dict:
+    """
+    JSON schema of a response model, generated once per class. The result is shared and
+    must not be modified.
+    """
+    return response_model.model_json_schema()
+
+@lru_cache(maxsize=None)
+def _schema_instructions(response_model: Type[BaseModel]) -> str:
+    """
+    Describe the expected output in the prompt when the provider cannot enforce the schema
+    """
+    return (
+        "\nThe response must be a JSON object that validates against this JSON schema:\n"
+        f"{json.dumps(_json_schema(response_model), separators=(',', ':'))}\n"
+    )
+
 class LLMClient:
-    def __init__(self):
-        self.client = groq.AsyncClient(api_key=os.getenv("GROQ_API_KEY"))
-        self.model = "meta-llama/llama-4-scout-17b-16e-instruct"  # Default Llama model from Groq
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None, cassette: Optional[LLMCassette] = None):
+        # Keep SDK retries low; the router falls back to the next model instead
+        self.client = groq.AsyncClient(
+            api_key=os.getenv("GROQ_API_KEY"),
+            http_client=http_client,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "1"))
+        )
+        self.model = DEFAULT_MODEL
+        self.router = ModelRouter()
+        self.structured_output = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+        self._unsupported_formats = set()  # (model, response_format type) pairs rejected by the provider
+        # Recorded responses to replay or record into (see llm_cassette), None to always call the provider
+        self.cassette = cassette if cassette is not None else LLMCassette.from_env()
+
+    def _response_formats(self, model: str, response_model: Optional[Type[BaseModel]], json_mode: bool) -> list:
+        """
+        Response formats to try, from most to least constrained
+        """
+        formats = []
+        if self.structured_output:
+            if response_model is not None:
+                formats.append({
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": response_model.__name__,
+                        "schema": _json_schema(response_model)
+                    }
+                })
+            if response_model is not None or json_mode:
+                formats.append({"type": "json_object"})
+        formats = [f for f in formats if (model, f["type"]) not in self._unsupported_formats]
+        formats.append(None)
+        return formats
+
+    @staticmethod
+    def _error_code(error: Exception) -> Optional[str]:
+        """
+        Extract the provider error code from an API error, if any
+        """
+        body = getattr(error, "body", None)
+        if isinstance(body, dict):
+            body = body.get("error", body)
+            if isinstance(body, dict):
+                return body.get("code")
+        return None
+
+    async def _generate_with_model(self, model, system_prompt, user_prompt, temperature, response_model, json_mode, timeout):
+        """
+        Generate a response from one model, falling back through the response formats it supports
+
+        Returns:
+            tuple: (content, token usage)
+        """
+        for response_format in self._response_formats(model, response_model, json_mode):
+            prompt = system_prompt
+            if response_model is not None and (response_format is None or response_format["type"] != "json_schema"):
+                prompt += _schema_instructions(response_model)
+
+            request = {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                "temperature": temperature,
+                "timeout": timeout
+            }
+            if response_format is not None:
+                request["response_format"] = response_format
+
+            try:
+                response = await self.client.chat.completions.create(**request)
+                return response.choices[0].message.content, getattr(response, "usage", None)
+            except groq.BadRequestError as e:
+                if response_format is None:
+                    raise
+                # The model produced output that failed validation; retry this call less
+                # constrained but keep using the format for future calls
+                if self._error_code(e) != "json_validate_failed":
+                    self._unsupported_formats.add((model, response_format["type"]))
+                logger.warning("Response format failed, falling back", extra={"model": model, "response_format": response_format["type"], "error": str(e)})
 
-    async def generate_response(self, system_prompt, user_prompt, temperature=0.7):
+    async def generate_response(
+        self,
+        system_prompt,
+        user_prompt,
+        temperature=0.7,
+        response_model: Optional[Type[BaseModel]] = None,
+        json_mode: bool = False,
+        task: str = "default"
+    ):
         """
         Generate a response from the LLM model
-        
+
         Args:
             system_prompt: Instructions for the model
             user_prompt: User's query or input
             temperature: Controls randomness (0-1)
-            
+            response_model: Pydantic model the response must match. The provider's JSON schema
+                mode is used when available, falling back to JSON mode and then to plain
+                generation with the schema described in the system prompt.
+            json_mode: Request a JSON object response without a specific schema
+            task: Task type used to pick the model chain and timeout (see llm_router.DEFAULT_ROUTES)
+
         Returns:
             str: Generated response
+
+        Raises:
+            CassetteMissError: In cassette replay mode, if the request was never recorded
+        """
+        cassette_key = None
+        if self.cassette is not None:
+            cassette_key = self.cassette.key(system_prompt, user_prompt, temperature, response_model, json_mode, task)
+            if self.cassette.mode == "replay" or (self.cassette.replaying and self.cassette.has(cassette_key)):
+                return await self._replay(cassette_key, task)
+
+        timeout = self.router.timeout(task)
+        generate_started = time.perf_counter()
+        with span("llm.generate", **{"llm.task": task}):
+            for model in self.router.models_for(task):
+                started = time.perf_counter()
+                LLM_REQUESTS_IN_FLIGHT.labels(task).inc()
+                with span("llm.call", **{"llm.task": task, "llm.model": model}) as call_span:
+                    try:
+                        content, usage = await self._generate_with_model(
+                            model, system_prompt, user_prompt, temperature, response_model, json_mode, timeout
+                        )
+                        latency = time.perf_counter() - started
+                        self.router.record_success(task, model, latency)
+                        record_llm_call(task, model, latency, "success", usage)
+                        self._record_timing(latency, usage)
+                        logger.debug("LLM response", extra={"task": task, "model": model, "latency": round(latency, 3), "response": content})
+                        if usage is not None:
+                            call_span.set_attribute("llm.tokens_in", getattr(usage, "prompt_tokens", None) or 0)
+                            call_span.set_attribute("llm.tokens_out", getattr(usage, "completion_tokens", None) or 0)
+                        if cassette_key is not None and self.cassette.recording:
+                            self.cassette.record(cassette_key, task, model, content, time.perf_counter() - generate_started, usage)
+                        return content
+                    except Exception as e:
+                        self.router.record_failure(task, model)
+                        record_llm_call(task, model, time.perf_counter() - started, "error")
+                        call_span.record_exception(e)
+                        logger.error("Error generating LLM response", extra={"task": task, "model": model, "error": str(e)})
+                    finally:
+                        LLM_REQUESTS_IN_FLIGHT.labels(task).dec()
+
+        if cassette_key is not None and self.cassette.recording:
+            self.cassette.record(cassette_key, task, None, None, time.perf_counter() - generate_started)
+        return None
+
+    @staticmethod
+    def _record_timing(latency: float, usage):
         """
+        Add the provider's queue time and the time to first token to the request's Server-Timing.
+        Responses are not streamed, so the time to first token is the latency less the time the
+        provider reports spending on generation.
+        """
+        record_timing("llm_queue", getattr(usage, "queue_time", None))
+        completion_time = getattr(usage, "completion_time", None)
+        if completion_time is not None:
+            record_timing("llm_ttft", max(0.0, latency - completion_time))
+
+    async def _replay(self, cassette_key: str, task: str) -> Optional[str]:
+        """
+        Answer from the cassette, taking the recorded latency scaled by the cassette's time scale
+        """
+        entry = self.cassette.next_entry(cassette_key)
+        model = entry["model"] or "none"
+        latency = entry["latency"] * self.cassette.time_scale
+        with span("llm.generate", **{"llm.task": task, "llm.cassette": "replay"}):
+            with span("llm.call", **{"llm.task": task, "llm.model": model, "llm.cassette": "replay"}):
+                LLM_REQUESTS_IN_FLIGHT.labels(task).inc()
+                try:
+                    await asyncio.sleep(latency)
+                finally:
+                    LLM_REQUESTS_IN_FLIGHT.labels(task).dec()
+        usage = SimpleNamespace(prompt_tokens=entry.get("prompt_tokens"), completion_tokens=entry.get("completion_tokens"))
+        record_llm_call(task, model, latency, "success" if entry["response"] is not None else "error", usage)
+        return entry["response"]
+
+class LLMClientRegistry:
+    """
+    Process-wide LLM clients sharing one pooled HTTP connection
+    """
+    clients: Dict[str, LLMClient] = {}
+    http_client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def _create_http_client(cls) -> httpx.AsyncClient:
+        """Create the shared HTTP client with keep-alive tuned for long LLM calls"""
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=temperature
-            )
-            return response.choices[0].message.content
+            import h2  # noqa: F401 - HTTP/2 support is optional
+            http2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+        except ImportError:
+            http2 = False
+
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")),
+                keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "300"))
+            ),
+            timeout=httpx.Timeout(float(os.getenv("LLM_TIMEOUT", "120")), connect=10.0)
+        )
+
+    @classmethod
+    def get_client(cls, name: str = "default") -> LLMClient:
+        """Get the shared LLM client, creating it on first use"""
+        if name not in cls.clients:
+            if cls.http_client is None or cls.http_client.is_closed:
+                cls.http_client = cls._create_http_client()
+            cls.clients[name] = LLMClient(http_client=cls.http_client)
+        return cls.clients[name]
+
+    @classmethod
+    async def warm_up(cls):
+        """Open the TLS connection ahead of the first request"""
+        if os.getenv("LLM_PREWARM", "true").lower() != "true":
+            return
+        try:
+            await cls.get_client().client.models.list()
+            logger.info("LLM client connection warmed up")
         except Exception as e:
-            print(f"Error generating LLM response: {str(e)}")
-            return None
\ No newline at end of file
+            logger.warning("Failed to warm up LLM client", extra={"error": str(e)})
+
+    @classmethod
+    async def close_clients(cls):
+        """Close all shared LLM clients and their HTTP connection pool"""
+        for client in cls.clients.values():
+            await client.client.close()
+        cls.clients = {}
+        if cls.http_client is not None:
+            await cls.http_client.aclose()
+            cls.http_client = None
+            logger.info("LLM client connections closed")
+
+def get_llm_client(name: str = "default") -> LLMClient:
+    """Get the process-wide shared LLM client"""
+    return LLMClientRegistry.get_client(name)
@@ -0,0 +1,73 @@
+# Utility for targeted repair of invalid fragments in LLM responses
+import json
+from typing import Dict, Any
+from services.shared.json_extractor import extract_json
+from services.shared.metrics import record_parse_failure
+from services.shared.logger import get_logger
+
+logger = get_logger(__name__)
+
+REPAIR_SYSTEM_PROMPT = """
+You are a JSON repair assistant.
+You will receive a JSON object whose keys are paths into a larger document and whose values describe
+a fragment of that document that is missing or failed validation, together with the validation error.
+Your task is to return a corrected value for each fragment so that it satisfies the expected format.
+
+The response should be structured as a JSON object with the same keys as the input, where each value
+is the corrected fragment (not the description). Do not include fragments that were not requested.
+Only respond with the JSON object, no additional text.
+"""
+
+async def repair_fragments(
+    llm_client,
+    fragments: Dict[str, Dict[str, Any]],
+    format_description: str,
+    context: str = "",
+    task: str = "default"
+) -> Dict[str, Any]:
+    """
+    Ask the LLM to repair only the invalid or missing fragments of a larger response
+
+    Args:
+        llm_client: LLMClient used to issue the repair request
+        fragments: Mapping of fragment path (e.g. "daily_requirements.sunday") to a dict with
+            the original "value" (None when missing) and the validation "error"
+        format_description: Description of the expected format of each fragment
+        context: Optional extra context to help the model produce sensible values
+        task: Task that produced the fragments, used to label parse failure metrics
+
+    Returns:
+        dict: Mapping of fragment path to the repaired value, for the fragments the model returned.
+        Empty if the repair request fails or cannot be parsed.
+    """
+    if not fragments:
+        return {}
+    record_parse_failure(task, "fragment", len(fragments))
+
+    user_prompt = f"""
+Repair the following fragments. Each fragment must match this format:
+{format_description}
+"""
+    if context:
+        user_prompt += f"\nContext:\n{context}\n"
+    user_prompt += f"\nFragments to repair:\n{json.dumps(fragments, default=str)}\n"
+
+    try:
+        llm_response = await llm_client.generate_response(
+            system_prompt=REPAIR_SYSTEM_PROMPT,
+            user_prompt=user_prompt,
+            temperature=0.0,
+            json_mode=True,
+            task="repair"
+        )
+        if not llm_response:
+            return {}
+
+        repaired = extract_json(llm_response)
+        if not isinstance(repaired, dict):
+            return {}
+
+        return {path: value for path, value in repaired.items() if path in fragments}
+    except Exception as e:
+        logger.warning("Error repairing LLM response fragments", extra={"error": str(e), "task": task})
+        return {}
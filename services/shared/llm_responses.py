@@ -0,0 +1,161 @@
+# Compressed storage of raw LLM responses, outside the documents generated from them
+#
+# Generated documents (diet_plans, food_recommendations, feedback analyses, special_needs) used
+# to embed the full llm_response string, roughly doubling their size. The raw response now goes
+# to the llm_responses collection instead, compressed, under the same _id as the document it
+# produced; the document keeps only llm_response_id. Hot documents stay small, so more of the
+# working set fits in MongoDB's cache, and the raw responses are only read when debugging.
+#
+#   LLM_RESPONSE_COMPRESSION      zlib (default), zstd or none. zstd compresses faster and
+#                                 somewhat smaller but needs the optional zstandard package;
+#                                 without it, zlib is used instead
+#   LLM_RESPONSE_RETENTION_DAYS   raw responses are deleted by a TTL index this many days after
+#                                 they were generated (default 30); 0 keeps them forever
+#
+# Existing documents are moved with: python -m services.shared.migrate_llm_responses
+import os
+import zlib
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from bson import Binary, ObjectId
+from bson.errors import InvalidId
+from dotenv import load_dotenv
+from services.shared.database import get_llm_response_collection
+from services.shared.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+LLM_RESPONSE_COMPRESSION = os.getenv("LLM_RESPONSE_COMPRESSION", "zlib").lower()
+LLM_RESPONSE_RETENTION_DAYS = float(os.getenv("LLM_RESPONSE_RETENTION_DAYS", "30"))
+
+try:
+    import zstandard  # noqa: F401 - zstd compression is optional
+except ImportError:
+    zstandard = None
+
+def _codec(requested: str = LLM_RESPONSE_COMPRESSION) -> str:
+    if requested == "zstd" and zstandard is None:
+        logger.warning("LLM_RESPONSE_COMPRESSION=zstd needs the zstandard package; using zlib")
+        return "zlib"
+    if requested not in ("zstd", "zlib", "none"):
+        raise ValueError(f"Unknown LLM_RESPONSE_COMPRESSION {requested}, expected zstd, zlib or none")
+    return requested
+
+def compress(text: str, codec: Optional[str] = None) -> Tuple[str, bytes]:
+    """
+    Compress a response
+
+    Returns:
+        tuple: (codec used, compressed bytes)
+    """
+    codec = _codec(codec or LLM_RESPONSE_COMPRESSION)
+    data = text.encode("utf-8")
+    if codec == "zstd":
+        return codec, zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == "zlib":
+        return codec, zlib.compress(data, 6)
+    return codec, data
+
+def decompress(codec: str, data: bytes) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This response is zstd compressed; install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    return bytes(data).decode("utf-8")
+
+class LLMResponseStore:
+    """
+    Raw LLM responses, compressed and keyed by the _id of the document generated from them
+    """
+    _indexes_ready = False
+
+    @staticmethod
+    def build(document_id: ObjectId, source: str, llm_response: str, user_id: Optional[str] = None, created_at: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        The llm_responses document for one response
+
+        Args:
+            document_id: _id of the generated document, reused as this document's _id
+            source: Collection the generated document is in
+            llm_response: The raw response
+            user_id: Owner of the generated document
+            created_at: When the response was generated; defaults to now
+        """
+        created_at = created_at or datetime.utcnow()
+        codec, data = compress(llm_response)
+        stored = {
+            "_id": document_id,
+            "source": source,
+            "user_id": user_id,
+            "codec": codec,
+            "data": Binary(data),
+            "size": len(llm_response.encode("utf-8")),
+            "created_at": created_at,
+        }
+        if LLM_RESPONSE_RETENTION_DAYS > 0:
+            stored["expires_at"] = created_at + timedelta(days=LLM_RESPONSE_RETENTION_DAYS)
+        return stored
+
+    @classmethod
+    async def ensure_indexes(cls):
+        """Create the TTL index enforcing the retention policy, once per process"""
+        if cls._indexes_ready:
+            return
+        collection = await get_llm_response_collection()
+        await collection.create_index("expires_at", expireAfterSeconds=0, name="expires_at_ttl")
+        cls._indexes_ready = True
+
+    @classmethod
+    async def insert(cls, collection, document: Dict[str, Any], source: str):
+        """
+        Insert a generated document, storing its llm_response in llm_responses instead of
+        inline. Both writes go out concurrently, so saving takes a single round trip.
+        Failing to store the raw response is logged but does not fail the save.
+
+        Returns:
+            InsertOneResult: The result of inserting the generated document
+        """
+        llm_response = document.pop("llm_response", None)
+        if not llm_response:
+            return await collection.insert_one(document)
+
+        document.setdefault("_id", ObjectId())
+        document["llm_response_id"] = str(document["_id"])
+        stored = cls.build(document["_id"], source, llm_response, document.get("user_id"), document.get("created_at"))
+
+        result, stored_result = await asyncio.gather(
+            collection.insert_one(document),
+            cls._insert_stored(stored),
+            return_exceptions=True
+        )
+        if isinstance(result, BaseException):
+            raise result
+        if isinstance(stored_result, BaseException):
+            logger.warning("Failed to store raw LLM response", extra={"source": source, "document_id": str(document["_id"]), "error": str(stored_result)})
+        return result
+
+    @classmethod
+    async def _insert_stored(cls, stored: Dict[str, Any]):
+        await cls.ensure_indexes()
+        responses = await get_llm_response_collection()
+        return await responses.insert_one(stored)
+
+    @classmethod
+    async def get(cls, response_id: str) -> Optional[str]:
+        """
+        The raw response stored under an id, or None if there is none or it has expired
+        """
+        try:
+            object_id = ObjectId(response_id)
+        except (InvalidId, TypeError):
+            return None
+        responses = await get_llm_response_collection()
+        stored = await responses.find_one({"_id": object_id})
+        if stored is None:
+            return None
+        return decompress(stored["codec"], stored["data"])
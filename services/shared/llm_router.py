@@ -0,0 +1,126 @@
+# Model routing for LLM tasks based on capacity needs and observed latency
+import os
+import json
+import time
+from typing import Dict, Any, List
+from dotenv import load_dotenv
+from services.shared.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+DEFAULT_MODEL = os.getenv("LLM_DEFAULT_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
+
+# Each task maps to a fallback chain of models that are capable enough for it, and a per-call timeout.
+# Override or extend with the LLM_ROUTES environment variable (JSON, or a path to a JSON file).
+DEFAULT_ROUTES = {
+    "default": {"models": [DEFAULT_MODEL], "timeout": 120},
+    "diet": {"models": [DEFAULT_MODEL, "llama-3.3-70b-versatile"], "timeout": 60},
+    "meal_plan": {"models": [DEFAULT_MODEL, "llama-3.3-70b-versatile"], "timeout": 120},
+    "feedback_analysis": {"models": ["llama-3.1-8b-instant", DEFAULT_MODEL], "timeout": 20},
+    "accommodation": {"models": [DEFAULT_MODEL, "llama-3.3-70b-versatile"], "timeout": 90},
+    "repair": {"models": ["llama-3.1-8b-instant", DEFAULT_MODEL], "timeout": 30},
+}
+
+def load_routes() -> Dict[str, Dict[str, Any]]:
+    """
+    Load the routing table, applying overrides from LLM_ROUTES
+    """
+    routes = {task: dict(route) for task, route in DEFAULT_ROUTES.items()}
+    overrides = os.getenv("LLM_ROUTES")
+    if not overrides:
+        return routes
+
+    try:
+        if os.path.isfile(overrides):
+            with open(overrides) as file:
+                overrides = file.read()
+        for task, route in json.loads(overrides).items():
+            routes.setdefault(task, dict(routes["default"])).update(route)
+    except Exception as e:
+        logger.error("Failed to load LLM_ROUTES, using default routes", extra={"error": str(e)})
+
+    return routes
+
+class ModelRouter:
+    """
+    Pick the model for a task from its fallback chain.
+
+    The chain is in the configured order of preference (capacity, then cost), and a fresh
+    router always starts with its first model. Latency is tracked per task and model as an
+    exponentially weighted moving average; models with a recent measurement are reordered
+    fastest first among the positions they hold, while unmeasured models keep their
+    configured position. A fallback is therefore only tried, and measured, once the models
+    before it fail, and measurements older than LLM_LATENCY_TTL seconds are forgotten so
+    the configured order comes back. A model that fails repeatedly is skipped for a
+    cooldown period unless no healthy model is left.
+    """
+
+    def __init__(self, routes: Dict[str, Dict[str, Any]] = None):
+        self.routes = routes or load_routes()
+        self.smoothing = float(os.getenv("LLM_LATENCY_SMOOTHING", "0.3"))
+        self.failure_threshold = int(os.getenv("LLM_FAILURE_THRESHOLD", "3"))
+        self.cooldown = float(os.getenv("LLM_FAILURE_COOLDOWN", "60"))
+        self.latency_ttl = float(os.getenv("LLM_LATENCY_TTL", "300"))
+        self.stats: Dict[tuple, Dict[str, Any]] = {}
+
+    def _route(self, task: str) -> Dict[str, Any]:
+        return self.routes.get(task) or self.routes["default"]
+
+    def _stats(self, task: str, model: str) -> Dict[str, Any]:
+        return self.stats.setdefault((task, model), {"latency": None, "measured_at": 0.0, "failures": 0, "last_failure": 0.0})
+
+    def is_healthy(self, task: str, model: str) -> bool:
+        """Whether the model has not failed repeatedly within the cooldown period"""
+        stats = self._stats(task, model)
+        if stats["failures"] < self.failure_threshold:
+            return True
+        return time.monotonic() - stats["last_failure"] > self.cooldown
+
+    def timeout(self, task: str) -> float:
+        """Per-call timeout in seconds for the task"""
+        return float(self._route(task).get("timeout", self.routes["default"]["timeout"]))
+
+    def models_for(self, task: str) -> List[str]:
+        """
+        Models to try for a task, in order
+        """
+        chain = self._route(task)["models"]
+        healthy = [model for model in chain if self.is_healthy(task, model)]
+        unhealthy = [model for model in chain if model not in healthy]
+
+        now = time.monotonic()
+        latencies = {}
+        for model in healthy:
+            stats = self._stats(task, model)
+            if stats["latency"] is not None and now - stats["measured_at"] <= self.latency_ttl:
+                latencies[model] = stats["latency"]
+
+        # Measured models swap among the positions they hold; unmeasured ones stay put
+        fastest = iter(sorted(latencies, key=lambda model: (latencies[model], chain.index(model))))
+        return [next(fastest) if model in latencies else model for model in healthy] + unhealthy
+
+    def record_success(self, task: str, model: str, latency: float):
+        """Record a successful call and its latency in seconds"""
+        stats = self._stats(task, model)
+        now = time.monotonic()
+        if stats["latency"] is None or now - stats["measured_at"] > self.latency_ttl:
+            stats["latency"] = latency
+        else:
+            stats["latency"] = self.smoothing * latency + (1 - self.smoothing) * stats["latency"]
+        stats["measured_at"] = now
+        stats["failures"] = 0
+
+    def record_failure(self, task: str, model: str):
+        """Record a failed or timed out call"""
+        stats = self._stats(task, model)
+        stats["failures"] += 1
+        stats["last_failure"] = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Current latency and health per task and model"""
+        return {
+            f"{task}:{model}": {**stats, "healthy": self.is_healthy(task, model)}
+            for (task, model), stats in self.stats.items()
+        }
@@ -0,0 +1,297 @@
+# Structured logging that stays off the request path
+#
+#   from services.shared.logger import get_logger
+#   logger = get_logger(__name__)
+#   logger.info("Generated diet requirements", extra={"user_id": user_id, "status": status})
+#
+# Records go onto a bounded in-memory queue and a background thread writes them to stdout,
+# one JSON object per line (the format Cloud Run and most log collectors parse), so a request
+# never waits on a log write. If the writer falls behind, new records are dropped rather than
+# blocking and the number dropped is logged once it catches up.
+#
+#   LOG_LEVEL             minimum level (default INFO)
+#   LOG_FORMAT            json (default) or text for reading locally
+#   LOG_SAMPLE_RATES      fraction of records kept per level, e.g. "debug=0.01,info=0.5";
+#                         levels not listed are always kept
+#   LOG_MAX_FIELD_LENGTH  longer strings in the message and fields are truncated (default 2000)
+#   LOG_QUEUE_SIZE        records held for the writer before new ones are dropped (default 10000)
+#
+# Fields named like credentials (password, token, authorization, ...) and bearer tokens or
+# JWTs inside strings are redacted. uvicorn's server and access logs go through the same queue.
+import os
+import re
+import sys
+import json
+import copy
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, TextIO
+from dotenv import load_dotenv
+from opentelemetry import trace
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_MAX_FIELD_LENGTH = int(os.getenv("LOG_MAX_FIELD_LENGTH", "2000"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+REDACTED = "[REDACTED]"
+# Fields named like these (password, hashed_password, access_token, ...) are redacted
+SENSITIVE_KEY = re.compile(r"(?i)(^|_)(password|token|secret|secret_key|authorization|api_?key|cookie)$")
+SENSITIVE_PATTERNS = [
+    re.compile(r"(?i)\bbearer\s+[\w.~+/=-]+"),
+    re.compile(r"\beyJ[\w-]+\.[\w-]+\.[\w-]+"),  # JWT
+    re.compile(r"(?<=://)[^/\s@]+(?=@)"),  # user:password@ in URIs such as MONGODB_URL
+]
+
+# Attributes every LogRecord has (and uvicorn's terminal colouring); anything else was passed
+# in `extra` and becomes a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "trace_id", "span_id", "color_message"}
+
+def parse_sample_rates(spec: str) -> Dict[int, float]:
+    """
+    Parse "level=rate,..." into {logging level: fraction of records kept}
+    """
+    rates = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        level, rate = entry.split("=", 1)
+        rates[logging.getLevelName(level.strip().upper())] = float(rate)
+    return rates
+
+def truncate(value: str, limit: int = LOG_MAX_FIELD_LENGTH) -> str:
+    if len(value) <= limit:
+        return value
+    return f"{value[:limit]}... [{len(value) - limit} more chars]"
+
+def scrub(value: Any, limit: int = LOG_MAX_FIELD_LENGTH, depth: int = 0) -> Any:
+    """
+    Redact credentials in a field value and truncate long strings, recursing into containers
+    """
+    if isinstance(value, str):
+        for pattern in SENSITIVE_PATTERNS:
+            value = pattern.sub(REDACTED, value)
+        return truncate(value, limit)
+    if depth >= 5:
+        return truncate(repr(value), limit)
+    if isinstance(value, dict):
+        return {
+            str(key): REDACTED if SENSITIVE_KEY.search(str(key)) else scrub(item, limit, depth + 1)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple, set)):
+        return [scrub(item, limit, depth + 1) for item in value]
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return truncate(str(value), limit)
+
+def record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    """The fields passed to a log call through `extra`"""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format a record as one line of JSON with its fields, trace context and exception
+    """
+
+    def __init__(self, service: Optional[str] = None, max_field_length: int = LOG_MAX_FIELD_LENGTH):
+        super().__init__()
+        self.service = service
+        self.max_field_length = max_field_length
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": scrub(record.getMessage(), self.max_field_length),
+        }
+        if self.service:
+            entry["service"] = self.service
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+            entry["span_id"] = record.span_id
+        for key, value in scrub(record_fields(record), self.max_field_length).items():
+            entry.setdefault(key, value)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """
+    Human readable lines with the fields appended as key=value, for local development
+    """
+
+    def __init__(self, max_field_length: int = LOG_MAX_FIELD_LENGTH):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        self.max_field_length = max_field_length
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = scrub(record_fields(record), self.max_field_length)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of the records at each level"""
+
+    def __init__(self, rates: Dict[int, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hand records to the writer thread, dropping them when its queue is full
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the cheap work happens on the caller's thread: merging the arguments, capturing
+        # the trace context and rendering a traceback whose frames may change once we return.
+        # Scrubbing and serialisation happen on the writer thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        span_context = trace.get_current_span().get_span_context()
+        if span_context.is_valid:
+            record.trace_id = format(span_context.trace_id, "032x")
+            record.span_id = format(span_context.span_id, "016x")
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if record.stack_info:
+            record.exc_text = (record.exc_text + "\n" if record.exc_text else "") + record.stack_info
+            record.stack_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LogWriter(logging.handlers.QueueListener):
+    """
+    Background thread writing queued records, reporting records dropped while it was behind
+    """
+
+    def __init__(self, log_queue: queue.Queue, handler: logging.Handler, queue_handler: NonBlockingQueueHandler):
+        super().__init__(log_queue, handler)
+        self.queue_handler = queue_handler
+        self.reported_dropped = 0
+
+    def handle(self, record: logging.LogRecord):
+        dropped = self.queue_handler.dropped
+        if dropped > self.reported_dropped:
+            warning = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                "Dropped %d log records while the log queue was full", (dropped - self.reported_dropped,), None
+            )
+            self.reported_dropped = dropped
+            super().handle(warning)
+        super().handle(record)
+
+    def enqueue_sentinel(self):
+        # Wait for room: the writer must see the sentinel even when the queue is full
+        self.queue.put(self._sentinel)
+
+_writer: Optional[LogWriter] = None
+_configure_lock = threading.Lock()
+
+def configure_logging(
+    service: Optional[str] = None,
+    stream: Optional[TextIO] = None,
+    level: str = LOG_LEVEL,
+    log_format: str = LOG_FORMAT,
+    sample_rates: Optional[Dict[int, float]] = None,
+    queue_size: int = LOG_QUEUE_SIZE,
+    max_field_length: int = LOG_MAX_FIELD_LENGTH
+):
+    """
+    Route every logger in the process through the queue and its writer thread, once.
+    Calling it again replaces the configuration.
+
+    Args:
+        service: Added to every JSON record; defaults to OTEL_SERVICE_NAME
+        stream: Where records are written; defaults to stdout
+        level: Minimum level for the root logger
+        log_format: json or text
+        sample_rates: Fraction of records kept per level; defaults to LOG_SAMPLE_RATES
+        queue_size: Records the queue holds before new ones are dropped
+        max_field_length: Longer strings are truncated
+    """
+    global _writer
+    with _configure_lock:
+        if _writer is not None:
+            _shutdown_writer()
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        if log_format == "text":
+            output.setFormatter(TextFormatter(max_field_length))
+        else:
+            output.setFormatter(JSONFormatter(service or os.getenv("OTEL_SERVICE_NAME"), max_field_length))
+
+        log_queue = queue.Queue(maxsize=queue_size)
+        queue_handler = NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES) if sample_rates is None else sample_rates))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, NonBlockingQueueHandler):
+                root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        # uvicorn's loggers write synchronously through their own handlers unless sent to the root
+        for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+            uvicorn_logger = logging.getLogger(name)
+            uvicorn_logger.handlers = []
+            uvicorn_logger.propagate = True
+
+        _writer = LogWriter(log_queue, output, queue_handler)
+        _writer.start()
+
+def _shutdown_writer():
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+def _restart_writer_after_fork():
+    # Threads do not survive fork: workers forked from a preloaded app need their own writer,
+    # on a fresh queue in case the fork happened while the parent held the old queue's lock
+    if _writer is not None:
+        log_queue = queue.Queue(maxsize=_writer.queue.maxsize)
+        _writer.queue = _writer.queue_handler.queue = log_queue
+        _writer._thread = None
+        _writer.start()
+
+def flush_logs():
+    """Wait until the writer has written every queued record"""
+    if _writer is not None:
+        _writer.queue.join()
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a logger, configuring the logging pipeline on first use
+    """
+    if _writer is None:
+        configure_logging()
+    return logging.getLogger(name)
+
+atexit.register(_shutdown_writer)
+os.register_at_fork(after_in_child=_restart_writer_after_fork)
@@ -0,0 +1,118 @@
+# Event loop lag monitoring and blocking call detection
+#
+# A timer task measures how late the loop wakes it (event_loop_lag_seconds). A watchdog thread
+# notices when the loop has not run for LOOP_STALL_THRESHOLD seconds (event_loop_stalls_total)
+# and, with LOOP_STALL_DEBUG=true, logs the stack of the code holding the loop: the synchronous
+# call (bcrypt, a large json.dumps, a print of a whole LLM response) that stalls every request.
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from typing import Any, Optional
+from dotenv import load_dotenv
+from services.shared.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+from services.shared.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# The loop is sampled this often; a stall is reported once it has not run for interval + threshold
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.05"))
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", "0.1"))
+LOOP_STALL_DEBUG = os.getenv("LOOP_STALL_DEBUG", "false").lower() == "true"
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+
+class LoopMonitor:
+    """
+    Measure the lag of the running event loop and detect callbacks that block it
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, stall_threshold: float = LOOP_STALL_THRESHOLD, debug: bool = LOOP_STALL_DEBUG):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.debug = debug
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+
+    async def _measure_lag(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(0.0, now - started - self.interval)
+            EVENT_LOOP_LAG.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self):
+        stalled_since = None
+        while not self._stopped.wait(self.stall_threshold / 4):
+            silent = time.monotonic() - self._heartbeat
+            if silent < self.interval + self.stall_threshold:
+                stalled_since = None
+                continue
+            if stalled_since == self._heartbeat:
+                continue
+
+            # Report each stall once, with the stack of whatever is holding the loop right now
+            stalled_since = self._heartbeat
+            self.stalls += 1
+            EVENT_LOOP_STALLS.inc()
+            if self.debug:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = [line.rstrip() for line in traceback.format_stack(frame)] if frame is not None else ["(stack unavailable)"]
+                logger.warning(
+                    "Event loop blocked for over %.0f ms", self.stall_threshold * 1000,
+                    extra={"stack": stack}
+                )
+
+    def start(self):
+        """Start monitoring the running event loop"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure_lag())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        """Stop the lag task and the watchdog thread"""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+def setup_loop_monitor(app: Any) -> Optional[LoopMonitor]:
+    """
+    Monitor the service's event loop from startup to shutdown
+    """
+    if not LOOP_MONITOR_ENABLED:
+        return None
+    monitor = LoopMonitor()
+
+    @app.on_event("startup")
+    async def start_loop_monitor():
+        monitor.start()
+
+    @app.on_event("shutdown")
+    async def stop_loop_monitor():
+        await monitor.stop()
+
+    return monitor
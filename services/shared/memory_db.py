@@ -0,0 +1,533 @@
+# In-memory stand-in for the Motor client, used when MONGODB_BACKEND=memory
+#
+# Implements the subset of the Motor collection API the services use (inserts, finds with
+# sort/skip/limit, updates with $set/$inc/$unset/$push, replaces, deletes, bulk writes, counts, collStats) over plain dicts, so
+# the services can run and be load tested without a MongoDB server. Data lives in the process:
+# run the monolith with a single worker so every service sees the same collections.
+import os
+import re
+import copy
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from bson import BSON, ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Simulated round trip per operation in seconds, to approximate a networked database
+MEMORY_DB_LATENCY = float(os.getenv("MEMORY_DB_LATENCY", "0"))
+
+_MISSING = object()
+
+_TYPE_NAMES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "bool": bool,
+    "int": int,
+    "long": int,
+    "double": float,
+    "date": datetime,
+    "objectId": ObjectId,
+    "null": type(None),
+}
+
+def _get_path(document: Any, path: str) -> Any:
+    """Value at a dotted path, or _MISSING"""
+    value = document
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+    return value
+
+def _set_path(document: Dict[str, Any], path: str, value: Any):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+def _unset_path(document: Dict[str, Any], path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(parts[-1], None)
+
+def _comparable(a: Any, b: Any) -> bool:
+    return a is not _MISSING and b is not None and a is not None and (
+        type(a) == type(b) or (isinstance(a, (int, float)) and isinstance(b, (int, float)))
+    )
+
+def _equals(value: Any, expected: Any) -> bool:
+    if value is _MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+def _matches_operators(value: Any, operators: Dict[str, Any]) -> bool:
+    for operator, operand in operators.items():
+        if operator == "$eq":
+            matched = _equals(value, operand)
+        elif operator == "$ne":
+            matched = not _equals(value, operand)
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            if not _comparable(value, operand):
+                return False
+            matched = {
+                "$gt": value > operand,
+                "$gte": value >= operand,
+                "$lt": value < operand,
+                "$lte": value <= operand,
+            }[operator]
+        elif operator == "$in":
+            matched = any(_equals(value, candidate) for candidate in operand)
+        elif operator == "$nin":
+            matched = not any(_equals(value, candidate) for candidate in operand)
+        elif operator == "$exists":
+            matched = (value is not _MISSING) == bool(operand)
+        elif operator == "$type":
+            expected = _TYPE_NAMES.get(operand)
+            if expected is None:
+                raise NotImplementedError(f"Unsupported $type {operand} in memory backend")
+            matched = value is not _MISSING and isinstance(value, expected) and not (
+                expected is int and isinstance(value, bool)
+            )
+        elif operator == "$regex":
+            matched = isinstance(value, str) and re.search(operand, value) is not None
+        else:
+            raise NotImplementedError(f"Unsupported query operator {operator} in memory backend")
+        if not matched:
+            return False
+    return True
+
+def matches(document: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Whether a document matches a MongoDB query filter"""
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not _matches_operators(_get_path(document, key), condition):
+                return False
+        elif not _equals(_get_path(document, key), condition):
+            return False
+    return True
+
+def _apply_update(document: Dict[str, Any], update: Dict[str, Any]):
+    if not any(key.startswith("$") for key in update):
+        raise ValueError("update only works with $ operators")
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            if operator == "$set":
+                _set_path(document, path, copy.deepcopy(value))
+            elif operator == "$setOnInsert":
+                continue
+            elif operator == "$unset":
+                _unset_path(document, path)
+            elif operator == "$inc":
+                current = _get_path(document, path)
+                _set_path(document, path, (0 if current is _MISSING else current) + value)
+            elif operator == "$push":
+                current = _get_path(document, path)
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                _set_path(document, path, ([] if current is _MISSING else list(current)) + copy.deepcopy(items))
+            elif operator == "$max":
+                current = _get_path(document, path)
+                if current is _MISSING or value > current:
+                    _set_path(document, path, value)
+            else:
+                raise NotImplementedError(f"Unsupported update operator {operator} in memory backend")
+
+def _project(document: Dict[str, Any], projection: Optional[Any]) -> Dict[str, Any]:
+    document = copy.deepcopy(document)
+    if not projection:
+        return document
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+
+    include_id = bool(projection.get("_id", 1))
+    fields = {field: flag for field, flag in projection.items() if field != "_id"}
+    if fields and all(fields.values()):
+        projected = {}
+        for path in fields:
+            value = _get_path(document, path)
+            if value is not _MISSING:
+                _set_path(projected, path, value)
+        if include_id and "_id" in document:
+            projected["_id"] = document["_id"]
+        return projected
+
+    for path, flag in fields.items():
+        if not flag:
+            _unset_path(document, path)
+    if not include_id:
+        document.pop("_id", None)
+    return document
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    # Missing and null sort first, as in MongoDB
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, ObjectId):
+        return (3, value.binary)
+    if isinstance(value, datetime):
+        return (4, value)
+    return (5, str(value))
+
+def _normalise_sort(key_or_list: Any, direction: int = 1) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+def _sorted(documents: List[Dict[str, Any]], sort: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    # Stable sorts applied from the least to the most significant key
+    for path, direction in reversed(sort):
+        documents = sorted(documents, key=lambda document: _sort_key(_get_path(document, path)), reverse=direction < 0)
+    return documents
+
+async def _round_trip():
+    # Yield to the event loop like a real network call would
+    await asyncio.sleep(MEMORY_DB_LATENCY)
+
+class MemoryCursor:
+    """Cursor returned by MemoryCollection.find, supporting sort, skip, limit and to_list"""
+
+    def __init__(self, collection: "MemoryCollection", query: Optional[Dict[str, Any]], projection: Optional[Any]):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[Dict[str, Any]]] = None
+
+    def sort(self, key_or_list: Any, direction: int = 1) -> "MemoryCursor":
+        self._sort = _normalise_sort(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def _evaluate(self) -> List[Dict[str, Any]]:
+        documents = [document for document in self.collection.documents.values() if matches(document, self.query)]
+        if self._sort:
+            documents = _sorted(documents, self._sort)
+        documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        return [_project(document, self.projection) for document in documents]
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        await _round_trip()
+        documents = self._evaluate()
+        return documents[:length] if length else documents
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        if self._results is None:
+            await _round_trip()
+            self._results = self._evaluate()
+        if not self._results:
+            raise StopAsyncIteration
+        return self._results.pop(0)
+
+class MemoryCollection:
+    """Motor-compatible collection holding its documents in a dict keyed by _id"""
+
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.documents: Dict[Any, Dict[str, Any]] = {}
+        self.indexes: Dict[str, Dict[str, Any]] = {"_id_": {"key": [("_id", 1)]}}
+
+    def _find_matching(self, query: Optional[Dict[str, Any]], sort: Any = None) -> List[Dict[str, Any]]:
+        documents = [document for document in self.documents.values() if matches(document, query)]
+        if sort:
+            documents = _sorted(documents, _normalise_sort(sort))
+        return documents
+
+    def _check_unique(self, document: Dict[str, Any], ignore_id: Any = _MISSING):
+        for name, index in self.indexes.items():
+            if not index.get("unique"):
+                continue
+            key = tuple(_get_path(document, path) for path, _ in index["key"])
+            for other in self.documents.values():
+                if other["_id"] != ignore_id and tuple(_get_path(other, path) for path, _ in index["key"]) == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}")
+
+    def _insert(self, document: Dict[str, Any]) -> Any:
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self.documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+        self._check_unique(document)
+        self.documents[document["_id"]] = copy.deepcopy(document)
+        return document["_id"]
+
+    async def insert_one(self, document: Dict[str, Any], **kwargs) -> InsertOneResult:
+        await _round_trip()
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: Iterable[Dict[str, Any]], **kwargs) -> InsertManyResult:
+        await _round_trip()
+        return InsertManyResult([self._insert(document) for document in documents], True)
+
+    async def find_one(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Any] = None, sort: Any = None, **kwargs) -> Optional[Dict[str, Any]]:
+        await _round_trip()
+        documents = self._find_matching(filter, sort)
+        return _project(documents[0], projection) if documents else None
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Any] = None, **kwargs) -> MemoryCursor:
+        cursor = MemoryCursor(self, filter, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    def _update(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool, many: bool, sort: Any = None) -> Tuple[int, int, Any]:
+        targets = self._find_matching(filter, sort)
+        if not many:
+            targets = targets[:1]
+        for document in targets:
+            updated = copy.deepcopy(document)
+            _apply_update(updated, update)
+            self._check_unique(updated, ignore_id=document["_id"])
+            self.documents[document["_id"]] = updated
+        if targets or not upsert:
+            return len(targets), len(targets), None
+
+        # Upserts start from the equality fields of the filter
+        document = {key: copy.deepcopy(value) for key, value in filter.items() if not key.startswith("$") and not isinstance(value, dict)}
+        _apply_update(document, update)
+        for path, value in update.get("$setOnInsert", {}).items():
+            _set_path(document, path, copy.deepcopy(value))
+        return 0, 0, self._insert(document)
+
+    async def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs) -> UpdateResult:
+        await _round_trip()
+        matched, modified, upserted_id = self._update(filter, update, upsert, many=False)
+        result = {"n": matched or int(upserted_id is not None), "nModified": modified, "ok": 1.0}
+        if upserted_id is not None:
+            result["upserted"] = upserted_id
+        return UpdateResult(result, True)
+
+    async def update_many(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs) -> UpdateResult:
+        await _round_trip()
+        matched, modified, upserted_id = self._update(filter, update, upsert, many=True)
+        result = {"n": matched or int(upserted_id is not None), "nModified": modified, "ok": 1.0}
+        if upserted_id is not None:
+            result["upserted"] = upserted_id
+        return UpdateResult(result, True)
+
+    def _replace(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool) -> Tuple[int, Any]:
+        targets = self._find_matching(filter)[:1]
+        for document in targets:
+            replaced = {**copy.deepcopy(replacement), "_id": document["_id"]}
+            self._check_unique(replaced, ignore_id=document["_id"])
+            self.documents[document["_id"]] = replaced
+        if targets or not upsert:
+            return len(targets), None
+        document = copy.deepcopy(replacement)
+        if "_id" in filter and not isinstance(filter["_id"], dict):
+            document.setdefault("_id", filter["_id"])
+        return 0, self._insert(document)
+
+    async def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False, **kwargs) -> UpdateResult:
+        await _round_trip()
+        matched, upserted_id = self._replace(filter, replacement, upsert)
+        result = {"n": matched or int(upserted_id is not None), "nModified": matched, "ok": 1.0}
+        if upserted_id is not None:
+            result["upserted"] = upserted_id
+        return UpdateResult(result, True)
+
+    async def bulk_write(self, requests: Iterable[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        """Apply pymongo write operations in one simulated round trip"""
+        await _round_trip()
+        result = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [], "writeErrors": []}
+        for index, request in enumerate(requests):
+            upserted_id = None
+            if isinstance(request, InsertOne):
+                self._insert(request._doc)
+                result["nInserted"] += 1
+            elif isinstance(request, (UpdateOne, UpdateMany)):
+                matched, modified, upserted_id = self._update(request._filter, request._doc, request._upsert, many=isinstance(request, UpdateMany))
+                result["nMatched"] += matched
+                result["nModified"] += modified
+            elif isinstance(request, ReplaceOne):
+                matched, upserted_id = self._replace(request._filter, request._doc, request._upsert)
+                result["nMatched"] += matched
+                result["nModified"] += matched
+            elif isinstance(request, (DeleteOne, DeleteMany)):
+                targets = self._find_matching(request._filter)
+                if isinstance(request, DeleteOne):
+                    targets = targets[:1]
+                for document in targets:
+                    del self.documents[document["_id"]]
+                result["nRemoved"] += len(targets)
+            else:
+                raise NotImplementedError(f"Unsupported bulk operation {type(request).__name__} in memory backend")
+            if upserted_id is not None:
+                result["nUpserted"] += 1
+                result["upserted"].append({"index": index, "_id": upserted_id})
+        return BulkWriteResult(result, True)
+
+    async def find_one_and_update(
+        self,
+        filter: Dict[str, Any],
+        update: Dict[str, Any],
+        projection: Optional[Any] = None,
+        sort: Any = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+        **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        await _round_trip()
+        existing = self._find_matching(filter, sort)
+        before = copy.deepcopy(existing[0]) if existing else None
+        _, _, upserted_id = self._update(filter, update, upsert, many=False, sort=sort)
+
+        if return_document == ReturnDocument.BEFORE:
+            return _project(before, projection) if before else None
+        document_id = before["_id"] if before else upserted_id
+        if document_id is None:
+            return None
+        return _project(self.documents[document_id], projection)
+
+    async def delete_one(self, filter: Dict[str, Any], **kwargs) -> DeleteResult:
+        await _round_trip()
+        targets = self._find_matching(filter)[:1]
+        for document in targets:
+            del self.documents[document["_id"]]
+        return DeleteResult({"n": len(targets), "ok": 1.0}, True)
+
+    async def delete_many(self, filter: Dict[str, Any], **kwargs) -> DeleteResult:
+        await _round_trip()
+        targets = self._find_matching(filter)
+        for document in targets:
+            del self.documents[document["_id"]]
+        return DeleteResult({"n": len(targets), "ok": 1.0}, True)
+
+    async def count_documents(self, filter: Dict[str, Any], **kwargs) -> int:
+        await _round_trip()
+        return len(self._find_matching(filter))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self.documents)
+
+    async def create_index(self, keys: Any, **kwargs) -> str:
+        """Record the index; only unique constraints are enforced"""
+        key = _normalise_sort(keys)
+        name = kwargs.get("name") or "_".join(f"{path}_{direction}" for path, direction in key)
+        self.indexes[name] = {"key": key, **{option: value for option, value in kwargs.items() if option != "name"}}
+        return name
+
+    async def drop_index(self, index_or_name: Any, **kwargs):
+        name = index_or_name if isinstance(index_or_name, str) else "_".join(f"{path}_{direction}" for path, direction in _normalise_sort(index_or_name))
+        self.indexes.pop(name, None)
+
+    async def index_information(self) -> Dict[str, Dict[str, Any]]:
+        return copy.deepcopy(self.indexes)
+
+    def stats(self) -> Dict[str, Any]:
+        """collStats fields, with sizes measured as the BSON size of the documents"""
+        size = sum(len(BSON.encode(document)) for document in self.documents.values())
+        return {
+            "ns": f"{self.database.name}.{self.name}",
+            "count": len(self.documents),
+            "size": size,
+            "storageSize": size,
+            "nindexes": len(self.indexes),
+            "totalIndexSize": 0,
+            "ok": 1.0,
+        }
+
+    async def drop(self):
+        self.database.drop_collection_sync(self.name)
+
+class MemoryDatabase:
+    """Motor-compatible database; collections are created on first access"""
+
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self.collections: Dict[str, MemoryCollection] = {}
+
+    def get_collection(self, name: str) -> MemoryCollection:
+        if name not in self.collections:
+            self.collections[name] = MemoryCollection(self, name)
+        return self.collections[name]
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return self.get_collection(name)
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    def drop_collection_sync(self, name: str):
+        self.collections.pop(name, None)
+
+    async def drop_collection(self, name: str):
+        self.drop_collection_sync(name)
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self.collections)
+
+    async def command(self, command: Any, **kwargs) -> Dict[str, Any]:
+        if command in ("ping", {"ping": 1}):
+            return {"ok": 1.0}
+        if isinstance(command, dict) and "collStats" in command:
+            return self.get_collection(command["collStats"]).stats()
+        if isinstance(command, dict) and "collMod" in command and "index" in command:
+            options = dict(command["index"])
+            index = self.get_collection(command["collMod"]).indexes[options.pop("name")]
+            index.update(options)
+            return {"ok": 1.0}
+        raise NotImplementedError(f"Unsupported command {command} in memory backend")
+
+class MemoryClient:
+    """Motor-compatible client; databases are created on first access"""
+
+    def __init__(self):
+        self.databases: Dict[str, MemoryDatabase] = {}
+
+    def get_database(self, name: str) -> MemoryDatabase:
+        if name not in self.databases:
+            self.databases[name] = MemoryDatabase(self, name)
+        return self.databases[name]
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        return self.get_database(name)
+
+    def close(self):
+        self.databases = {}
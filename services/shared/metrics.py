@@ -0,0 +1,178 @@
+# Prometheus metrics for HTTP routes, LLM calls and MongoDB operations
+#
+# When several worker processes serve one service, set PROMETHEUS_MULTIPROC_DIR to an
+# empty directory shared by the workers so /metrics aggregates all of them.
+import os
+import time
+from typing import Any, Dict, Optional
+from fastapi import FastAPI, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+from pymongo import monitoring
+
+# LLM calls take seconds to minutes, so their buckets extend much further than the request defaults
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 90, 120, 180)
+MONGO_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served",
+    ["method"], multiprocess_mode="livesum"
+)
+
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds", "LLM call latency per task and model",
+    ["task", "model", "outcome"], buckets=LLM_LATENCY_BUCKETS
+)
+LLM_REQUESTS_IN_FLIGHT = Gauge(
+    "llm_requests_in_flight", "LLM calls currently waiting for a response",
+    ["task"], multiprocess_mode="livesum"
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens sent to and generated by the LLM",
+    ["task", "model", "direction"]
+)
+LLM_COMPLETION_TOKENS = Histogram(
+    "llm_completion_tokens", "Tokens generated per LLM call",
+    ["task", "model"], buckets=TOKEN_BUCKETS
+)
+LLM_PARSE_FAILURES = Counter(
+    "llm_parse_failures_total",
+    "LLM output that could not be used as is: json (no JSON recovered), fragment (failed validation "
+    "and sent for repair) or unrepaired (still invalid after repair)",
+    ["task", "kind"]
+)
+
+MONGO_OPERATION_DURATION = Histogram(
+    "mongo_operation_duration_seconds", "MongoDB command latency per collection and command",
+    ["collection", "command", "outcome"], buckets=MONGO_LATENCY_BUCKETS
+)
+MONGO_OPERATIONS_IN_FLIGHT = Gauge(
+    "mongo_operations_in_flight", "MongoDB commands awaiting a reply",
+    multiprocess_mode="livesum"
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a periodic timer; every request waits this long too",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+EVENT_LOOP_STALLS = Counter(
+    "event_loop_stalls_total", "Times a single callback held the event loop longer than the stall threshold"
+)
+
+def record_llm_call(task: str, model: str, duration: float, outcome: str, usage: Any = None):
+    """
+    Record one LLM call
+
+    Args:
+        task: Task type of the call
+        model: Model that served it
+        duration: Latency in seconds
+        outcome: "success" or "error"
+        usage: Token usage returned by the provider, if any
+    """
+    LLM_REQUEST_DURATION.labels(task, model, outcome).observe(duration)
+    if usage is None:
+        return
+
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+    LLM_TOKENS.labels(task, model, "in").inc(prompt_tokens)
+    LLM_TOKENS.labels(task, model, "out").inc(completion_tokens)
+    LLM_COMPLETION_TOKENS.labels(task, model).observe(completion_tokens)
+
+def record_parse_failure(task: str, kind: str, count: int = 1):
+    """Count LLM output that failed to parse or validate"""
+    if count:
+        LLM_PARSE_FAILURES.labels(task, kind).inc(count)
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Time every MongoDB command; register with the client through event_listeners
+    """
+
+    def __init__(self):
+        self._pending: Dict[tuple, str] = {}
+
+    def _finish(self, event, outcome: str):
+        collection = self._pending.pop((event.connection_id, event.request_id), "unknown")
+        MONGO_OPERATIONS_IN_FLIGHT.dec()
+        MONGO_OPERATION_DURATION.labels(collection, event.command_name, outcome).observe(event.duration_micros / 1e6)
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = "none"
+        self._pending[(event.connection_id, event.request_id)] = collection
+        MONGO_OPERATIONS_IN_FLIGHT.inc()
+
+    def succeeded(self, event):
+        self._finish(event, "success")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+class PrometheusMiddleware:
+    """
+    Record latency and in-flight requests for every HTTP request.
+
+    Requests are labelled with the route template (e.g. /api/v1/feedback/{feedback_id})
+    rather than the raw path, so ids do not create new time series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(method, route_path, str(status_code)).observe(time.perf_counter() - started)
+
+def metrics_registry() -> CollectorRegistry:
+    """Registry to expose, aggregating all worker processes in multiprocess mode"""
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+def setup_metrics(app: FastAPI, path: str = "/metrics"):
+    """
+    Add request metrics and the scrape endpoint to a service
+    """
+    app.add_middleware(PrometheusMiddleware)
+
+    @app.get(path, include_in_schema=False)
+    async def metrics():
+        return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
+
+def mark_process_dead(pid: Optional[int] = None):
+    """Drop the live gauges of an exited worker in multiprocess mode"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
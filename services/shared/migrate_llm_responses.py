@@ -0,0 +1,112 @@
+# Move raw LLM responses embedded in existing documents to the llm_responses collection
+#
+#   python -m services.shared.migrate_llm_responses [--dry-run] [--batch-size 500] [--compact]
+#
+# Documents saved before llm_responses existed carry their llm_response inline. Each batch is
+# copied, compressed, into llm_responses first and only then removed from the documents, so an
+# interrupted run loses nothing and can simply be run again. Responses already older than
+# LLM_RESPONSE_RETENTION_DAYS are dropped instead of copied. MongoDB only returns the freed
+# space to the operating system after a compact, which --compact runs on each collection.
+import sys
+import os
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List
+from pymongo import ReplaceOne, UpdateOne
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from services.shared.database import Database
+from services.shared.llm_responses import LLMResponseStore
+
+SOURCES = ("diet_plans", "food_recommendations", "feedback", "special_needs")
+
+def _created_at(document: Dict[str, Any]) -> datetime:
+    created_at = document.get("created_at")
+    if isinstance(created_at, datetime):
+        return created_at
+    return document["_id"].generation_time.replace(tzinfo=None)
+
+async def _write_batch(db, source: str, batch: List[Dict[str, Any]], stats: Dict[str, int], dry_run: bool):
+    now = datetime.utcnow()
+    stored_writes, document_writes = [], []
+    for document in batch:
+        stored = LLMResponseStore.build(document["_id"], source, document["llm_response"], document.get("user_id"), _created_at(document))
+        stats["documents"] += 1
+        stats["raw_bytes"] += stored["size"]
+        if "expires_at" in stored and stored["expires_at"] <= now:
+            stats["expired"] += 1
+            document_writes.append(UpdateOne({"_id": document["_id"]}, {"$unset": {"llm_response": ""}}))
+            continue
+        stats["moved"] += 1
+        stats["stored_bytes"] += len(stored["data"])
+        stored_writes.append(ReplaceOne({"_id": document["_id"]}, stored, upsert=True))
+        document_writes.append(UpdateOne(
+            {"_id": document["_id"]},
+            {"$set": {"llm_response_id": str(document["_id"])}, "$unset": {"llm_response": ""}}
+        ))
+
+    if dry_run:
+        return
+    # Copy before removing, so the responses exist in one place or the other at every point
+    if stored_writes:
+        await db.llm_responses.bulk_write(stored_writes, ordered=False)
+    if document_writes:
+        await db[source].bulk_write(document_writes, ordered=False)
+
+async def migrate_collection(db, source: str, batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Move the inline responses of one collection
+
+    Returns:
+        dict: documents found, responses moved, expired responses dropped, and their sizes in bytes
+    """
+    stats = {"documents": 0, "moved": 0, "expired": 0, "raw_bytes": 0, "stored_bytes": 0}
+    batch = []
+    cursor = db[source].find({"llm_response": {"$type": "string"}}, {"llm_response": 1, "user_id": 1, "created_at": 1})
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            await _write_batch(db, source, batch, stats, dry_run)
+            batch = []
+    if batch:
+        await _write_batch(db, source, batch, stats, dry_run)
+    return stats
+
+async def migrate(sources=SOURCES, batch_size: int = 500, dry_run: bool = False, compact: bool = False) -> Dict[str, Dict[str, int]]:
+    db = await Database.connect_db()
+    if not dry_run:
+        await LLMResponseStore.ensure_indexes()
+
+    results = {}
+    for source in sources:
+        results[source] = await migrate_collection(db, source, batch_size, dry_run)
+        if compact and not dry_run and results[source]["documents"]:
+            await db.command({"compact": source})
+    return results
+
+def print_report(results: Dict[str, Dict[str, int]], dry_run: bool):
+    print(f"{'collection':<22}{'documents':>10}{'moved':>8}{'expired':>9}{'inline MB':>11}{'stored MB':>11}{'ratio':>7}")
+    for source, stats in results.items():
+        ratio = stats["raw_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 0
+        print(
+            f"{source:<22}{stats['documents']:>10}{stats['moved']:>8}{stats['expired']:>9}"
+            f"{stats['raw_bytes'] / 1e6:>11.2f}{stats['stored_bytes'] / 1e6:>11.2f}{ratio:>6.1f}x"
+        )
+    if dry_run:
+        print("Dry run: nothing was changed")
+
+def main():
+    parser = argparse.ArgumentParser(description="Move inline llm_response fields to the compressed llm_responses collection")
+    parser.add_argument("--collections", default=",".join(SOURCES), help="Comma separated collections to migrate")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be moved without changing anything")
+    parser.add_argument("--compact", action="store_true", help="Compact each migrated collection afterwards")
+    args = parser.parse_args()
+
+    sources = [source.strip() for source in args.collections.split(",") if source.strip()]
+    results = asyncio.run(migrate(sources, args.batch_size, args.dry_run, args.compact))
+    print_report(results, args.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+# Local Groq-compatible server for load testing without the real API
+#
+#   python -m services.shared.mock_llm_server [--port 8090] [--latency lognormal:1.5,0.5] [--error-rate 0.02]
+#
+# Point the services at it with GROQ_BASE_URL=http://localhost:8090 (any GROQ_API_KEY works).
+# Responses are replayed from recorded fixtures: the sample_*.json files at the repository root
+# by default, or <task>.json files in MOCK_LLM_FIXTURES (one response object, or a list to cycle
+# through). The task is recognised from the response schema name or the system prompt.
+#
+# Configuration (environment variable, command line flag, or PUT /mock/config at runtime):
+#   MOCK_LLM_LATENCY            time to first token: fixed:S, uniform:LOW,HIGH, normal:MEAN,SD,
+#                               lognormal:MEDIAN,SIGMA or exponential:MEAN (seconds)
+#   MOCK_LLM_TOKENS_PER_SECOND  generation speed; 0 returns the whole completion at once
+#   MOCK_LLM_ERROR_RATE         fraction of requests answered with one of MOCK_LLM_ERROR_CODES
+#   MOCK_LLM_TIMEOUT_RATE       fraction of requests that hang for MOCK_LLM_HANG_SECONDS
+#   MOCK_LLM_MALFORMED_RATE     fraction of completions cut off halfway, as with hitting max tokens
+#   MOCK_LLM_SEED               seed for repeatable latency and error sequences
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import itertools
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from services.shared.llm_router import DEFAULT_ROUTES
+from services.shared.server import uvicorn_options
+
+load_dotenv()
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Streamed chunks are flushed at this interval, carrying however many tokens were generated meanwhile
+STREAM_INTERVAL_SECONDS = 0.05
+
+# Response schema names and system prompt phrases identifying each task
+SCHEMA_TASKS = {
+    "DietRequirementLLMOutput": "diet",
+    "FoodRecommendationLLMOutput": "meal_plan",
+    "FeedbackAnalysisLLMOutput": "feedback_analysis",
+}
+PROMPT_TASKS = [
+    ("JSON repair assistant", "repair"),
+    ("weekly nutritional requirements", "diet"),
+    ("daily meal plans", "meal_plan"),
+    ("analyze negative feedback", "feedback_analysis"),
+    ("accommodating special dietary needs", "accommodation"),
+]
+
+ERROR_BODIES = {
+    400: ("invalid_request_error", "json_validate_failed", "Failed to generate JSON. Please adjust your prompt."),
+    429: ("tokens", "rate_limit_exceeded", "Rate limit reached. Please try again later."),
+    500: ("internal_server_error", "internal_server_error", "Internal server error"),
+    503: ("internal_server_error", "service_unavailable", "Service Unavailable"),
+}
+
+class LatencyDistribution:
+    """
+    Samples latencies from a distribution given as "kind:param,param"
+    """
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+
+    def __init__(self, spec: str, rng: random.Random):
+        kind, _, params = spec.partition(":")
+        self.spec = spec
+        self.kind = kind.strip().lower()
+        self.params = [float(param) for param in params.split(",") if param.strip()]
+        self.rng = rng
+        if self.KINDS.get(self.kind) != len(self.params):
+            raise ValueError(f"Invalid latency distribution {spec}, expected e.g. lognormal:1.5,0.5")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            latency = self.params[0]
+        elif self.kind == "uniform":
+            latency = self.rng.uniform(*self.params)
+        elif self.kind == "normal":
+            latency = self.rng.gauss(*self.params)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            latency = median * self.rng.lognormvariate(0, sigma)
+        else:
+            latency = self.rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0
+        return max(0.0, latency)
+
+class MockLLMConfig:
+    """
+    Behaviour of the mock server, read from the environment and adjustable at runtime
+    """
+
+    def __init__(self):
+        self.rng = random.Random(os.getenv("MOCK_LLM_SEED"))
+        self.latency = LatencyDistribution(os.getenv("MOCK_LLM_LATENCY", "lognormal:1.5,0.5"), self.rng)
+        self.tokens_per_second = float(os.getenv("MOCK_LLM_TOKENS_PER_SECOND", "500"))
+        self.error_rate = float(os.getenv("MOCK_LLM_ERROR_RATE", "0"))
+        self.error_codes = [int(code) for code in os.getenv("MOCK_LLM_ERROR_CODES", "429,500,503").split(",") if code.strip()]
+        self.timeout_rate = float(os.getenv("MOCK_LLM_TIMEOUT_RATE", "0"))
+        self.hang_seconds = float(os.getenv("MOCK_LLM_HANG_SECONDS", "600"))
+        self.malformed_rate = float(os.getenv("MOCK_LLM_MALFORMED_RATE", "0"))
+        self.fixtures_dir = os.getenv("MOCK_LLM_FIXTURES")
+
+    def update(self, settings: Dict[str, Any]):
+        """Apply new settings; keys are the attribute names, latency given as a spec string"""
+        for key, value in settings.items():
+            if value is None:
+                continue
+            if key == "latency":
+                self.latency = LatencyDistribution(value, self.rng)
+            elif key == "seed":
+                self.rng.seed(value)
+            elif key == "error_codes":
+                self.error_codes = [int(code) for code in value]
+            elif key in ("tokens_per_second", "error_rate", "timeout_rate", "hang_seconds", "malformed_rate"):
+                setattr(self, key, float(value))
+            else:
+                raise ValueError(f"Unknown mock setting {key}")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency.spec,
+            "tokens_per_second": self.tokens_per_second,
+            "error_rate": self.error_rate,
+            "error_codes": self.error_codes,
+            "timeout_rate": self.timeout_rate,
+            "hang_seconds": self.hang_seconds,
+            "malformed_rate": self.malformed_rate,
+        }
+
+def _load_sample(name: str) -> Dict[str, Any]:
+    with open(os.path.join(REPO_ROOT, name)) as file:
+        return json.load(file)
+
+def _split_quantity(item: str):
+    """Split "1/2 cup mixed berries" into ("1/2 cup", "mixed berries")"""
+    match = re.match(r"^([\d/.\s]+(?:cups?|tbsp|tsp|oz|slices?|pieces?|medium|large|small)?)\s+(.+)$", item)
+    if not match:
+        return "1 serving", item
+    return match.group(1).strip(), match.group(2).strip()
+
+def _meal(meal_type: str, description: str, items: List[str], preparation: Optional[str], target: Dict[str, float]) -> Dict[str, Any]:
+    """Spread a meal's share of the day's nutrition evenly over its items"""
+    nutrients = ("calories", "protein", "carbohydrates", "fat", "fiber")
+    per_item = {nutrient: round(target.get(nutrient, 0) / len(items), 1) for nutrient in nutrients}
+    food_items = []
+    for index, item in enumerate(items):
+        quantity, name = _split_quantity(item)
+        food_items.append({"name": name, "quantity": quantity, **per_item, "preparation_notes": preparation if index == 0 else None})
+    meal = {"meal_type": meal_type, "food_items": food_items, "notes": description}
+    for nutrient in nutrients:
+        meal[f"total_{nutrient}"] = round(per_item[nutrient] * len(items), 1)
+    return meal
+
+def sample_meal_plan() -> Dict[str, Any]:
+    """
+    The recorded meal plan sample in the shape FoodRecommendationLLMOutput expects.
+    The sample lists items without nutrition, so each meal gets its usual share of the daily target.
+    """
+    sample = _load_sample("sample_food_recommendations.json")
+    daily = _load_sample("sample_diet_requirements.json")["daily_requirements"]
+    shares = {"breakfast": 0.25, "lunch": 0.35, "dinner": 0.3, "snack": 0.1}
+
+    meal_plans = {}
+    for day, plan in sample["meal_plans"].items():
+        target = daily.get(day, {})
+        meals = []
+        for meal_type in ("breakfast", "lunch", "dinner"):
+            if meal_type in plan:
+                share = {nutrient: value * shares[meal_type] for nutrient, value in target.items() if isinstance(value, (int, float))}
+                meals.append(_meal(meal_type, plan[meal_type]["description"], plan[meal_type]["items"], plan[meal_type].get("preparation"), share))
+        if plan.get("snacks"):
+            share = {nutrient: value * shares["snack"] for nutrient, value in target.items() if isinstance(value, (int, float))}
+            meals.append(_meal("snack", "Snacks", plan["snacks"], None, share))
+
+        day_plan = {"day": day, "meals": meals}
+        for nutrient in ("calories", "protein", "carbohydrates", "fat", "fiber"):
+            day_plan[f"total_{nutrient}"] = round(sum(meal[f"total_{nutrient}"] for meal in meals), 1)
+        meal_plans[day] = day_plan
+
+    return {"meal_plans": meal_plans, "additional_notes": "Replayed from sample_food_recommendations.json"}
+
+def default_fixtures() -> Dict[str, List[Any]]:
+    """Responses replayed for each task when no fixture directory is configured"""
+    diet = _load_sample("sample_diet_requirements.json")
+    return {
+        "diet": [{"daily_requirements": diet["daily_requirements"], "weekly_average": diet["weekly_average"]}],
+        "meal_plan": [sample_meal_plan()],
+        "feedback_analysis": [{
+            "identified_concerns": ["Possible lactose intolerance"],
+            "suggested_restrictions": ["lactose"],
+            "suggested_alternatives": {"milk": ["almond milk", "oat milk"], "yogurt": ["coconut yogurt"]},
+            "recommendation": "Replace dairy products with lactose-free alternatives and monitor symptoms."
+        }],
+        "accommodation": [{
+            "adjustments": [{
+                "original_meal": "Greek yogurt with honey",
+                "adjusted_meal": "Coconut yogurt with honey",
+                "explanation": "Dairy replaced to accommodate lactose intolerance."
+            }]
+        }],
+        "repair": [{}],
+        "default": [{}],
+    }
+
+class FixtureStore:
+    """Cycles through the recorded responses of each task"""
+
+    def __init__(self, fixtures_dir: Optional[str] = None):
+        fixtures = default_fixtures()
+        if fixtures_dir:
+            for file_name in os.listdir(fixtures_dir):
+                task, extension = os.path.splitext(file_name)
+                if extension == ".json":
+                    with open(os.path.join(fixtures_dir, file_name)) as file:
+                        responses = json.load(file)
+                    fixtures[task] = responses if isinstance(responses, list) else [responses]
+        self._cycles = {task: itertools.cycle(responses) for task, responses in fixtures.items() if responses}
+
+    def next_response(self, task: str) -> str:
+        response = next(self._cycles.get(task) or self._cycles["default"])
+        return response if isinstance(response, str) else json.dumps(response)
+
+def detect_task(request: Dict[str, Any]) -> str:
+    """Task a chat completion request belongs to"""
+    response_format = request.get("response_format") or {}
+    schema_name = (response_format.get("json_schema") or {}).get("name")
+    if schema_name in SCHEMA_TASKS:
+        return SCHEMA_TASKS[schema_name]
+
+    system_prompt = " ".join(
+        message.get("content") or "" for message in request.get("messages", []) if message.get("role") == "system"
+    )
+    for phrase, task in PROMPT_TASKS:
+        if phrase in system_prompt:
+            return task
+    return "default"
+
+def count_tokens(text: str) -> int:
+    """Rough token count, about four characters per token"""
+    return max(1, len(text) // 4)
+
+config = MockLLMConfig()
+fixtures = FixtureStore(config.fixtures_dir)
+
+app = FastAPI(title="Mock LLM", description="Groq-compatible chat completions replaying recorded responses")
+
+def _error_response(status_code: int) -> JSONResponse:
+    error_type, code, message = ERROR_BODIES.get(status_code, ERROR_BODIES[500])
+    headers = {"retry-after": "1"} if status_code == 429 else None
+    return JSONResponse({"error": {"message": message, "type": error_type, "code": code}}, status_code=status_code, headers=headers)
+
+def _usage(prompt_tokens: int, completion_tokens: int, first_token: float, generation: float) -> Dict[str, Any]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_time": first_token,
+        "completion_time": generation,
+        "total_time": first_token + generation,
+    }
+
+@app.get("/openai/v1/models")
+async def list_models():
+    models = sorted({model for route in DEFAULT_ROUTES.values() for model in route["models"]})
+    return {"object": "list", "data": [{"id": model, "object": "model", "created": 0, "owned_by": "mock"} for model in models]}
+
+@app.get("/mock/config")
+async def get_config():
+    return config.as_dict()
+
+@app.put("/mock/config")
+async def update_config(settings: Dict[str, Any]):
+    try:
+        config.update(settings)
+    except ValueError as e:
+        return JSONResponse({"detail": str(e)}, status_code=400)
+    return config.as_dict()
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    roll = config.rng.random()
+    if roll < config.error_rate:
+        await asyncio.sleep(config.latency.sample() / 10)
+        return _error_response(config.rng.choice(config.error_codes or [500]))
+    if roll < config.error_rate + config.timeout_rate:
+        await asyncio.sleep(config.hang_seconds)
+        return _error_response(503)
+
+    task = detect_task(body)
+    content = fixtures.next_response(task)
+    if config.rng.random() < config.malformed_rate:
+        content = content[:len(content) // 2]
+
+    model = body.get("model", "mock")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    prompt_tokens = sum(count_tokens(message.get("content") or "") for message in body.get("messages", []))
+    completion_tokens = count_tokens(content)
+    first_token = config.latency.sample()
+    generation = completion_tokens / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+    usage = _usage(prompt_tokens, completion_tokens, first_token, generation)
+
+    if not body.get("stream"):
+        await asyncio.sleep(first_token + generation)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "system_fingerprint": "mock",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop", "logprobs": None}],
+            "usage": usage,
+            "x_groq": {"id": completion_id, "task": task},
+        }
+
+    async def stream():
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "system_fingerprint": "mock",
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}],
+                **extra,
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        await asyncio.sleep(first_token)
+        yield chunk({"role": "assistant", "content": ""})
+
+        # Characters per flush at the configured token rate (about four characters per token)
+        step = max(1, int(config.tokens_per_second * STREAM_INTERVAL_SECONDS * 4)) if config.tokens_per_second > 0 else len(content)
+        for start in range(0, len(content), step):
+            yield chunk({"content": content[start:start + step]})
+            if config.tokens_per_second > 0:
+                await asyncio.sleep(STREAM_INTERVAL_SECONDS)
+
+        yield chunk({}, "stop", x_groq={"id": completion_id, "usage": usage})
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Groq-compatible mock LLM server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("MOCK_LLM_PORT", "8090")))
+    parser.add_argument("--latency", help="time to first token distribution, e.g. lognormal:1.5,0.5")
+    parser.add_argument("--tokens-per-second", type=float)
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--timeout-rate", type=float)
+    parser.add_argument("--malformed-rate", type=float)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--fixtures", help="directory of <task>.json response fixtures")
+    args = parser.parse_args()
+
+    global fixtures
+    config.update({
+        "latency": args.latency,
+        "tokens_per_second": args.tokens_per_second,
+        "error_rate": args.error_rate,
+        "timeout_rate": args.timeout_rate,
+        "malformed_rate": args.malformed_rate,
+        "seed": args.seed,
+    })
+    if args.fixtures:
+        fixtures = FixtureStore(args.fixtures)
+
+    uvicorn.run(app, host=args.host, port=args.port, **uvicorn_options())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# On-demand profiling of individual requests
+#
+# Send a request with the header "X-Profile: <PROFILING_TOKEN>" and it runs under a sampling
+# profiler. The token is only accepted as a header, since query strings end up in access logs.
+# The response carries an X-Profile-Id header; fetch the profile from /debug/profiles/<id> with
+# the same header. Profiles are folded stacks, loadable in speedscope or flamegraph.pl. Every
+# stack starts with one of:
+#   request     the profiled request's task was running
+#   other-task  another request or background task held the loop
+#   idle        the loop was waiting for I/O (the request was awaiting the LLM or MongoDB)
+# Profiling is disabled unless PROFILING_TOKEN is set, and at most PROFILING_MAX_PER_MINUTE
+# requests per process are profiled so it can stay enabled in production.
+import os
+import sys
+import hmac
+import time
+import uuid
+import asyncio
+import threading
+from collections import Counter, deque
+from typing import Deque, Optional
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from dotenv import load_dotenv
+from services.shared.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILING_MAX_PER_MINUTE = int(os.getenv("PROFILING_MAX_PER_MINUTE", "6"))
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.005"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", "profiles")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))
+
+PROFILE_HEADER = "x-profile"
+
+class SamplingProfiler:
+    """
+    Periodically sample the stack of the event loop thread from a background thread
+    """
+
+    def __init__(self, task: asyncio.Task, interval: float = PROFILING_INTERVAL):
+        self.task = task
+        self.loop = task.get_loop()
+        self.thread_id = threading.get_ident()
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.started = 0.0
+        self.duration = 0.0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        current = asyncio.current_task(self.loop)
+        if current is self.task:
+            root = "request"
+        elif current is None:
+            root = "idle"
+        else:
+            root = "other-task"
+
+        stack = []
+        while frame is not None:
+            stack.append(self._frame_name(frame))
+            frame = frame.f_back
+        stack.append(root)
+        self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def folded(self) -> str:
+        """The samples in folded stack format, one "frame;frame;frame count" line per stack"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+class ProfileRateLimiter:
+    """Allow at most `limit` profiles in any 60 second window"""
+
+    def __init__(self, limit: int = PROFILING_MAX_PER_MINUTE):
+        self.limit = limit
+        self._started: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._started and now - self._started[0] > 60:
+                self._started.popleft()
+            if len(self._started) >= self.limit:
+                return False
+            self._started.append(now)
+            return True
+
+def is_authorised(token: Optional[str]) -> bool:
+    return bool(PROFILING_TOKEN) and token is not None and hmac.compare_digest(token, PROFILING_TOKEN)
+
+def _requested_token(scope) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == PROFILE_HEADER.encode():
+            return value.decode("latin-1")
+    return None
+
+def _profile_path(profile_id: str) -> str:
+    return os.path.join(PROFILING_DIR, f"{profile_id}.folded")
+
+def _save_profile(profile_id: str, profiler: SamplingProfiler):
+    os.makedirs(PROFILING_DIR, exist_ok=True)
+    with open(_profile_path(profile_id), "w") as file:
+        file.write(profiler.folded())
+
+    # Keep the most recent profiles only
+    profiles = sorted(
+        (entry for entry in os.scandir(PROFILING_DIR) if entry.name.endswith(".folded")),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in profiles[:-PROFILING_MAX_FILES]:
+        os.remove(entry.path)
+
+class ProfilingMiddleware:
+    """
+    Profile requests that carry the profiling token, within the rate limit
+    """
+
+    def __init__(self, app, limiter: Optional[ProfileRateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or ProfileRateLimiter()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not is_authorised(_requested_token(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        if not self.limiter.acquire():
+            async def send_skipped(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-skipped", b"rate-limited")]
+                await send(message)
+            await self.app(scope, receive, send_skipped)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        profiler = SamplingProfiler(asyncio.current_task())
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            route = getattr(scope.get("route"), "path", scope["path"])
+            await asyncio.to_thread(_save_profile, profile_id, profiler)
+            logger.info("Profiled request", extra={
+                "profile_id": profile_id, "method": scope["method"], "route": route,
+                "samples": sum(profiler.samples.values()), "duration": round(profiler.duration, 3)
+            })
+
+def setup_profiling(app: FastAPI, path: str = "/debug/profiles", max_per_minute: int = PROFILING_MAX_PER_MINUTE):
+    """
+    Add on-demand request profiling and the endpoint serving the profiles; no-op without PROFILING_TOKEN
+    """
+    if not PROFILING_TOKEN:
+        return
+    app.add_middleware(ProfilingMiddleware, limiter=ProfileRateLimiter(max_per_minute))
+
+    @app.get(f"{path}/{{profile_id}}", include_in_schema=False)
+    async def get_profile(profile_id: str, x_profile: Optional[str] = Header(None)):
+        if not is_authorised(x_profile):
+            raise HTTPException(status_code=403, detail="Profiling token required")
+        if not profile_id.replace("-", "").isalnum() or not os.path.exists(_profile_path(profile_id)):
+            raise HTTPException(status_code=404, detail="Profile not found")
+        with open(_profile_path(profile_id)) as file:
+            return PlainTextResponse(file.read())
@@ -0,0 +1,86 @@
+# Server-side lookup of documents that requests reference by id
+import os
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from dotenv import load_dotenv
+from services.shared.cache import TTLCache
+from services.shared.database import get_user_collection, get_diet_plan_collection, get_food_recommendation_collection
+
+load_dotenv()
+
+# Generated documents are never modified after they are saved, so they can be cached for a long time
+DOCUMENT_CACHE_TTL_SECONDS = float(os.getenv("DOCUMENT_CACHE_TTL_SECONDS", "600"))
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "1024"))
+
+# Fields that are never needed to serve a request
+EXCLUDED_FIELDS = {"llm_response": 0}
+
+class DocumentRepository:
+    """
+    Resolve users, diet requirements and food recommendations by id so clients can
+    send ids instead of full documents.
+
+    Diet requirements and food recommendations are cached in-process. Users are read
+    on every call because their profile can change at any time. Returned documents
+    are shared with the cache and must be treated as read-only.
+    """
+    diet_requirements = TTLCache(maxsize=DOCUMENT_CACHE_SIZE, ttl=DOCUMENT_CACHE_TTL_SECONDS)
+    food_recommendations = TTLCache(maxsize=DOCUMENT_CACHE_SIZE, ttl=DOCUMENT_CACHE_TTL_SECONDS)
+
+    @staticmethod
+    def _object_id(document_id: str) -> Optional[ObjectId]:
+        try:
+            return ObjectId(document_id)
+        except (InvalidId, TypeError):
+            return None
+
+    @classmethod
+    async def _find_cached(cls, cache: TTLCache, get_collection, document_id: str) -> Optional[Dict[str, Any]]:
+        document = cache.get(document_id)
+        if document is not None:
+            return document
+
+        object_id = cls._object_id(document_id)
+        if object_id is None:
+            return None
+
+        collection = await get_collection()
+        document = await collection.find_one({"_id": object_id}, EXCLUDED_FIELDS)
+        if document is None:
+            return None
+
+        document["id"] = str(document.pop("_id"))
+        cache.set(document_id, document)
+        return document
+
+    @classmethod
+    async def get_user(cls, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a user and their profile by id, without the password hash
+        """
+        object_id = cls._object_id(user_id)
+        if object_id is None:
+            return None
+
+        user_collection = await get_user_collection()
+        user = await user_collection.find_one({"_id": object_id}, {"password": 0})
+        if user is None:
+            return None
+
+        user["id"] = str(user.pop("_id"))
+        return user
+
+    @classmethod
+    async def get_diet_requirement(cls, requirement_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a diet requirement by id
+        """
+        return await cls._find_cached(cls.diet_requirements, get_diet_plan_collection, requirement_id)
+
+    @classmethod
+    async def get_food_recommendation(cls, recommendation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a food recommendation by id
+        """
+        return await cls._find_cached(cls.food_recommendations, get_food_recommendation_collection, recommendation_id)
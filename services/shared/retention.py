@@ -0,0 +1,291 @@
+# Retention of generated documents: expiry of failures and archival of superseded versions
+#
+#   python -m services.shared.retention [--dry-run] [--target collection|jsonl] [--compact]
+#
+# The routers only ever read a user's latest diet plan, food recommendation and special needs
+# plan, so older versions only take up cache and index space. Run this job daily. Each run:
+#
+#   - keeps TTL indexes that delete FAILED documents FAILED_RETENTION_DAYS (7) after they were
+#     created; 0 keeps them forever
+#   - moves superseded versions older than ARCHIVE_AFTER_DAYS (30) out of the hot collections,
+#     in bulk, into <collection>_archive (ARCHIVE_TARGET=collection, the default) or into
+#     gzipped JSONL files under ARCHIVE_DIR (ARCHIVE_TARGET=jsonl)
+#   - reports the documents and bytes archived, and each collection's size before and after
+#
+# A user's latest document is never archived, nor is their latest successful one, which is
+# served again once a failed latest one expires, nor a diet plan that a kept food
+# recommendation was generated from. Documents are written to the archive before they are
+# deleted, so an interrupted run can simply be run again.
+import sys
+import os
+import gzip
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+from bson import BSON, json_util
+from pymongo import ReplaceOne
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from services.shared.database import Database
+from services.shared.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+FAILED_RETENTION_DAYS = float(os.getenv("FAILED_RETENTION_DAYS", "7"))
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_TARGET = os.getenv("ARCHIVE_TARGET", "collection").lower()
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+# Status FAILED documents are saved with in each collection
+FAILED_STATUS = {
+    "diet_plans": "failed",
+    "food_recommendations": "failed",
+    "feedback": "failed",
+    "special_needs": "FAILED",
+}
+
+# Collections holding one version per generation. Food recommendations come first, so the
+# diet plans they reference are known before diet plans are archived.
+VERSIONED = ("food_recommendations", "diet_plans", "special_needs")
+
+FAILED_TTL_INDEX = "failed_ttl"
+USER_LATEST_INDEX = "user_latest"
+
+async def ensure_indexes(db):
+    """
+    Create or update the TTL indexes on FAILED documents, and the per-user index the
+    archival scan (and the latest document lookups) walk
+    """
+    expire_after = int(FAILED_RETENTION_DAYS * 86400)
+    for name, failed in FAILED_STATUS.items():
+        collection = db[name]
+        existing = (await collection.index_information()).get(FAILED_TTL_INDEX)
+        if expire_after <= 0:
+            if existing:
+                await collection.drop_index(FAILED_TTL_INDEX)
+        elif existing is None:
+            await collection.create_index(
+                "created_at",
+                expireAfterSeconds=expire_after,
+                partialFilterExpression={"status": failed},
+                name=FAILED_TTL_INDEX
+            )
+        elif existing.get("expireAfterSeconds") != expire_after:
+            # A TTL can be changed in place; create_index would fail on the changed option
+            await db.command({"collMod": name, "index": {"name": FAILED_TTL_INDEX, "expireAfterSeconds": expire_after}})
+
+    for name in VERSIONED:
+        await db[name].create_index([("user_id", 1), ("created_at", -1)], name=USER_LATEST_INDEX)
+
+class CollectionArchive:
+    """Archive into <collection>_archive in the same database"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def describe(self, name: str) -> str:
+        return f"{name}_archive"
+
+    async def write(self, name: str, documents: List[Dict[str, Any]]):
+        # Upserts keep a re-run after an interrupted batch from failing on duplicate ids
+        await self.db[f"{name}_archive"].bulk_write(
+            [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents],
+            ordered=False
+        )
+
+    async def close(self):
+        pass
+
+class JSONLArchive:
+    """Archive into one gzipped JSONL file per collection and run, in MongoDB extended JSON"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.started = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        self.files: Dict[str, Any] = {}
+
+    def describe(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}-{self.started}.jsonl.gz")
+
+    def _write(self, name: str, documents: List[Dict[str, Any]]):
+        if name not in self.files:
+            os.makedirs(self.directory, exist_ok=True)
+            self.files[name] = gzip.open(self.describe(name), "at", encoding="utf-8")
+        archive = self.files[name]
+        for document in documents:
+            archive.write(json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS) + "\n")
+        # On disk before the documents are deleted
+        archive.flush()
+        os.fsync(archive.fileno())
+
+    async def write(self, name: str, documents: List[Dict[str, Any]]):
+        await asyncio.to_thread(self._write, name, documents)
+
+    async def close(self):
+        for archive in self.files.values():
+            archive.close()
+        self.files = {}
+
+async def collection_size(db, name: str) -> Dict[str, int]:
+    stats = await db.command({"collStats": name})
+    return {field: int(stats.get(field, 0)) for field in ("count", "size", "storageSize", "totalIndexSize")}
+
+async def _archive_batch(db, name: str, ids: List[Any], archive, stats: Dict[str, int], dry_run: bool):
+    collection = db[name]
+    documents = await collection.find({"_id": {"$in": ids}}).to_list(length=None)
+    stats["archived"] += len(documents)
+    stats["archived_bytes"] += sum(len(BSON.encode(document)) for document in documents)
+    if dry_run or not documents:
+        return
+    await archive.write(name, documents)
+    await collection.delete_many({"_id": {"$in": [document["_id"] for document in documents]}})
+
+async def archive_collection(
+    db,
+    name: str,
+    archive,
+    cutoff: datetime,
+    protected: Optional[Set[str]] = None,
+    referenced: Optional[Set[str]] = None,
+    batch_size: int = 500,
+    dry_run: bool = False
+) -> Dict[str, int]:
+    """
+    Archive the superseded versions of one collection
+
+    Args:
+        db: Database holding the collection
+        name: Collection to archive
+        archive: CollectionArchive or JSONLArchive
+        cutoff: Only documents created before this are archived
+        protected: Ids (as strings) that must be kept
+        referenced: Collects the diet_requirement_id of every kept document
+        batch_size: Documents archived per bulk write
+        dry_run: Count what would be archived without changing anything
+
+    Returns:
+        dict: Documents scanned and archived, and the BSON size of the archived documents
+    """
+    failed = FAILED_STATUS[name]
+    protected = protected or set()
+    stats = {"scanned": 0, "archived": 0, "archived_bytes": 0}
+    batch = []
+    user_id, success_kept = object(), False
+
+    # Newest first within each user, served by the user_latest index
+    cursor = db[name].find({}, {"user_id": 1, "created_at": 1, "status": 1, "diet_requirement_id": 1}).sort([("user_id", 1), ("created_at", -1)])
+    async for document in cursor:
+        stats["scanned"] += 1
+        successful = document.get("status") != failed
+        latest = document.get("user_id") != user_id
+        if latest:
+            user_id, success_kept = document.get("user_id"), False
+
+        keep = latest or (successful and not success_kept)
+        success_kept = success_kept or successful
+        if keep:
+            if referenced is not None and document.get("diet_requirement_id"):
+                referenced.add(document["diet_requirement_id"])
+            continue
+
+        # Failures are left to the TTL index
+        created_at = document.get("created_at")
+        if not successful or not isinstance(created_at, datetime) or created_at >= cutoff or str(document["_id"]) in protected:
+            continue
+
+        batch.append(document["_id"])
+        if len(batch) >= batch_size:
+            await _archive_batch(db, name, batch, archive, stats, dry_run)
+            batch = []
+
+    if batch:
+        await _archive_batch(db, name, batch, archive, stats, dry_run)
+    return stats
+
+async def run_retention(
+    target: str = ARCHIVE_TARGET,
+    archive_dir: str = ARCHIVE_DIR,
+    archive_after_days: float = ARCHIVE_AFTER_DAYS,
+    batch_size: int = 500,
+    dry_run: bool = False,
+    compact: bool = False
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run one retention pass over every generated collection
+
+    Returns:
+        dict: Per collection, the archival stats, where documents went, and the collection's
+        size before and after
+    """
+    if target not in ("collection", "jsonl"):
+        raise ValueError(f"Unknown archive target {target}, expected collection or jsonl")
+
+    db = await Database.connect_db()
+    if not dry_run:
+        await ensure_indexes(db)
+
+    archive = CollectionArchive(db) if target == "collection" else JSONLArchive(archive_dir)
+    cutoff = datetime.utcnow() - timedelta(days=archive_after_days)
+    referenced: Set[str] = set()
+    results = {}
+    try:
+        for name in VERSIONED:
+            before = await collection_size(db, name)
+            stats = await archive_collection(
+                db, name, archive, cutoff,
+                protected=referenced if name == "diet_plans" else None,
+                referenced=referenced if name == "food_recommendations" else None,
+                batch_size=batch_size,
+                dry_run=dry_run
+            )
+            if compact and not dry_run and stats["archived"]:
+                await db.command({"compact": name})
+            after = await collection_size(db, name)
+            results[name] = {**stats, "destination": archive.describe(name), "before": before, "after": after}
+            logger.info("Archived superseded documents", extra={"collection": name, "dry_run": dry_run, **stats})
+    finally:
+        await archive.close()
+    return results
+
+def _mb(size: int) -> str:
+    return f"{size / 1e6:.2f}"
+
+def print_report(results: Dict[str, Dict[str, Any]], dry_run: bool):
+    print(f"{'collection':<22}{'scanned':>9}{'archived':>10}{'archived MB':>13}{'data MB':>17}{'storage MB':>17}{'index MB':>17}")
+    for name, result in results.items():
+        before, after = result["before"], result["after"]
+        print(
+            f"{name:<22}{result['scanned']:>9}{result['archived']:>10}{_mb(result['archived_bytes']):>13}"
+            f"{_mb(before['size']) + ' > ' + _mb(after['size']):>17}"
+            f"{_mb(before['storageSize']) + ' > ' + _mb(after['storageSize']):>17}"
+            f"{_mb(before['totalIndexSize']) + ' > ' + _mb(after['totalIndexSize']):>17}"
+        )
+    reclaimed = sum(result["before"]["size"] - result["after"]["size"] for result in results.values())
+    if dry_run:
+        print(f"Dry run: nothing was changed; {_mb(sum(result['archived_bytes'] for result in results.values()))} MB would be archived")
+    else:
+        print(f"Reclaimed {_mb(reclaimed)} MB of data in the hot collections")
+        for name, result in results.items():
+            if result["archived"]:
+                print(f"  {name} -> {result['destination']}")
+        print("Storage is returned to the operating system only after a compact (--compact)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Expire failed documents and archive superseded versions")
+    parser.add_argument("--target", choices=["collection", "jsonl"], default=ARCHIVE_TARGET)
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR, help="Directory for --target jsonl")
+    parser.add_argument("--after-days", type=float, default=ARCHIVE_AFTER_DAYS, help="Archive superseded versions older than this")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be archived without changing anything")
+    parser.add_argument("--compact", action="store_true", help="Compact each collection documents were archived from")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_retention(args.target, args.archive_dir, args.after_days, args.batch_size, args.dry_run, args.compact))
+    print_report(results, args.dry_run)
+
+if __name__ == "__main__":
+    main()
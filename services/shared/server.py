@@ -0,0 +1,177 @@
+# Production launcher for the services
+#
+#   python -m services.shared.server <service> [--port PORT]
+#
+# Runs the service under gunicorn with uvicorn workers: one worker per available CPU,
+# uvloop and httptools, keep-alive and shutdown timeouts sized for long LLM calls, and
+# the app preloaded in the master so workers share its memory copy-on-write.
+# Falls back to uvicorn's own process manager (without preloading) when gunicorn is not installed.
+import os
+import sys
+import argparse
+import tempfile
+import importlib.util
+from typing import Any, Dict, Optional
+import uvicorn
+from uvicorn.importer import import_from_string
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from services.shared.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+SERVICES = {
+    "user_management": 8000,
+    "diet_requirements_generator": 8001,
+    "food_plate_recommendation": 8002,
+    "special_needs_accommodation": 8003,
+    "monolith": 8080,
+}
+
+# Idle keep-alive must outlast the load balancer's, or it may reuse a connection the worker just closed
+KEEPALIVE_SECONDS = int(os.getenv("SERVER_KEEPALIVE", "75"))
+# In-flight requests (LLM calls can take up to two minutes) are given this long to finish on shutdown
+GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "120"))
+# Workers that stop heartbeating for this long are restarted; async workers heartbeat while awaiting I/O
+WORKER_TIMEOUT_SECONDS = int(os.getenv("SERVER_WORKER_TIMEOUT", "180"))
+PRELOAD_APP = os.getenv("SERVER_PRELOAD", "true").lower() == "true"
+
+def available_cpus() -> int:
+    """
+    Number of CPUs this process may use, honouring affinity and cgroup CPU quotas
+    (containers usually see every host CPU in os.cpu_count())
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as file:
+            quota, period = file.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return max(1, cpus)
+
+def worker_count() -> int:
+    """
+    Workers to run; WEB_CONCURRENCY overrides the default of one per available CPU.
+    Requests spend most of their time awaiting the LLM and MongoDB, so one event loop
+    per core is enough to keep every core busy.
+    """
+    workers = os.getenv("WEB_CONCURRENCY")
+    return int(workers) if workers else available_cpus()
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def uvicorn_options() -> Dict[str, Any]:
+    """Event loop and HTTP parser, using the fast implementations when installed"""
+    return {
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+    }
+
+def gunicorn_options(host: str, port: int, workers: int) -> Dict[str, Any]:
+    return {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "services.shared.server.ProductionUvicornWorker",
+        "preload_app": PRELOAD_APP,
+        "keepalive": KEEPALIVE_SECONDS,
+        "graceful_timeout": GRACEFUL_TIMEOUT_SECONDS,
+        "timeout": WORKER_TIMEOUT_SECONDS,
+        "accesslog": "-",
+        "errorlog": "-",
+        # Keep worker heartbeat files off slow container filesystems
+        "worker_tmp_dir": "/dev/shm" if os.path.isdir("/dev/shm") else None,
+        "child_exit": _child_exit,
+    }
+
+def _child_exit(server, worker):
+    from services.shared.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
+
+def _enable_multiprocess_metrics():
+    """
+    Let /metrics aggregate every worker. Must run before prometheus_client is imported,
+    which is why the app is only imported after this.
+    """
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+
+if _installed("gunicorn"):
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+
+    class ProductionUvicornWorker(UvicornWorker):
+        CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, **uvicorn_options()}
+
+    class ServiceApplication(BaseApplication):
+        """Gunicorn application configured in code instead of a config file"""
+
+        def __init__(self, app_path: str, options: Dict[str, Any]):
+            self.app_path = app_path
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if value is not None and key in self.cfg.settings:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return import_from_string(self.app_path)
+
+def run(service: str, host: str = "0.0.0.0", port: Optional[int] = None, workers: Optional[int] = None):
+    """
+    Serve a service with the production settings
+
+    Args:
+        service: Package name under services/, e.g. food_plate_recommendation
+        host: Interface to bind
+        port: Port to listen on; defaults to $PORT, then the service's usual port
+        workers: Number of worker processes; defaults to worker_count()
+    """
+    if service not in SERVICES:
+        raise ValueError(f"Unknown service {service}, expected one of: {', '.join(SERVICES)}")
+
+    app_path = f"services.{service}.main:app"
+    port = port or int(os.getenv("PORT", SERVICES[service]))
+    workers = workers or worker_count()
+    logger.info("Starting %s on %s:%s with %d worker(s)", service, host, port, workers, extra=uvicorn_options())
+    if workers > 1:
+        _enable_multiprocess_metrics()
+
+    if _installed("gunicorn"):
+        ServiceApplication(app_path, gunicorn_options(host, port, workers)).run()
+    else:
+        uvicorn.run(
+            app_path,
+            host=host,
+            port=port,
+            workers=workers,
+            timeout_keep_alive=KEEPALIVE_SECONDS,
+            proxy_headers=True,
+            # uvicorn's loggers propagate to the root logger and its non-blocking writer (see logger.py)
+            log_config=None,
+            **uvicorn_options()
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a service with production server settings")
+    parser.add_argument("service", choices=sorted(SERVICES))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+    run(args.service, args.host, args.port, args.workers)
+
+if __name__ == "__main__":
+    main()
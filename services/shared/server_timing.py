@@ -0,0 +1,144 @@
+# Server-Timing breakdown of where a request spent its time
+#
+# Every HTTP response carries a Server-Timing header (shown per request in the browser's
+# network panel) with the time spent in each stage:
+#   auth       verifying the bearer token and loading the user
+#   lookup     resolving referenced documents (user, diet requirement) by id
+#   prompt     building the prompts
+#   llm_queue  time the request waited in the provider's queue, as reported by the provider
+#   llm_ttft   LLM time to first token: the call's latency minus the provider's generation time
+#   llm        LLM total, all attempts and fallbacks included
+#   parse      extracting JSON from the LLM output
+#   validate   converting it to models, including any repair request
+#   db_write   saving the result
+#   total      the whole request
+# Stages are filled in from the traced spans (see tracing.span), so they may overlap: a repair
+# request made while validating counts towards both validate and llm.
+# Generation endpoints also return the breakdown in their body when called with ?debug=true.
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
+# Stage name and its description in the header, in reporting order
+STAGES = {
+    "auth": "Auth",
+    "lookup": "Document lookup",
+    "prompt": "Prompt build",
+    "llm_queue": "LLM queue wait",
+    "llm_ttft": "LLM time to first token",
+    "llm": "LLM total",
+    "parse": "Parse",
+    "validate": "Validate",
+    "db_write": "DB write",
+}
+
+# Span names, or the last part of a span name, that are timed as a stage
+SPAN_STAGES = {
+    "auth.verify": "auth",
+    "llm.generate": "llm",
+    "lookup": "lookup",
+    "prompt_build": "prompt",
+    "parse": "parse",
+    "validate": "validate",
+    "save": "db_write",
+}
+
+class ServerTiming:
+    """
+    Stage durations collected while handling one request
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        """
+        Stage durations in milliseconds, in reporting order, with the total so far
+        """
+        timings = {stage: round(self.durations[stage] * 1000, 1) for stage in STAGES if stage in self.durations}
+        timings["total"] = round((time.perf_counter() - self.started) * 1000, 1)
+        return timings
+
+    def header(self) -> str:
+        """The Server-Timing header value"""
+        return ", ".join(
+            f'{stage};dur={duration};desc="{STAGES.get(stage, "Total")}"'
+            for stage, duration in self.as_dict().items()
+        )
+
+_current: ContextVar[Optional[ServerTiming]] = ContextVar("server_timing", default=None)
+
+def current_timing() -> Optional[ServerTiming]:
+    """The timing of the request being handled, or None outside a request"""
+    return _current.get()
+
+def record(stage: str, seconds: Optional[float]):
+    """Add time to a stage of the current request, if any"""
+    timing = _current.get()
+    if timing is not None and seconds is not None:
+        timing.add(stage, seconds)
+
+def record_span(name: str, seconds: float):
+    """Add a finished span to the stage it belongs to, if any"""
+    timing = _current.get()
+    if timing is None:
+        return
+    stage = SPAN_STAGES.get(name) or SPAN_STAGES.get(name.rsplit(".", 1)[-1])
+    if stage is not None:
+        timing.add(stage, seconds)
+
+@contextmanager
+def collect_timing():
+    """
+    Collect stage timings for the code run inside the block
+    """
+    timing = ServerTiming()
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
+
+def debug_timings() -> Optional[Dict[str, Any]]:
+    """The debug field for a response body: the current request's stage timings"""
+    timing = _current.get()
+    return {"timings": timing.as_dict()} if timing is not None else None
+
+class ServerTimingMiddleware:
+    """
+    Collect stage timings for every HTTP request and report them in a Server-Timing header
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_timing() as timing:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.header().encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+def setup_server_timing(app: Any):
+    """
+    Report per-stage timings in a Server-Timing header on every response
+    """
+    if SERVER_TIMING_ENABLED:
+        app.add_middleware(ServerTimingMiddleware)
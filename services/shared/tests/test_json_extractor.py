@@ -0,0 +1,63 @@
+import json
+import os
+import sys
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from services.shared.json_extractor import extract_json, JSONStreamExtractor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+FIXTURES = ["sample_diet_requirements.json", "sample_food_recommendations.json"]
+
+def load_fixture(name):
+    with open(os.path.join(REPO_ROOT, name)) as file:
+        return file.read()
+
+@pytest.mark.parametrize("response, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('```\n[1, 2]\n```', [1, 2]),
+    ('Here is your {personalised} plan:\n```json\n{"a": 1}\n```\nEnjoy!', {"a": 1}),
+    ('{"a": [1, 2,], "b": {"c": 3,},}', {"a": [1, 2], "b": {"c": 3}}),
+    ('{"a": "braces } and , commas ] in strings"}', {"a": "braces } and , commas ] in strings"}),
+    ('{"a": "escaped \\" quote", "b": 2}', {"a": 'escaped " quote', "b": 2}),
+])
+def test_extract_json(response, expected):
+    assert extract_json(response) == expected
+
+@pytest.mark.parametrize("response, expected", [
+    ('{"a": {"b": [1, 2, 3]}, "c": "cut of', {"a": {"b": [1, 2, 3]}}),
+    ('```json\n{"a": 1, "b": [{"x": 1}, {"y":', {"a": 1, "b": [{"x": 1}]}),
+    ('[{"a": 1}, {"b": 2}, {"c"', [{"a": 1}, {"b": 2}]),
+])
+def test_extract_json_truncated(response, expected):
+    assert extract_json(response) == expected
+
+@pytest.mark.parametrize("response", ["", "no json here", "```\n```"])
+def test_extract_json_without_value(response):
+    with pytest.raises(json.JSONDecodeError):
+        extract_json(response)
+
+@pytest.mark.parametrize("fixture", FIXTURES)
+def test_fixture_with_fences_and_prose(fixture):
+    text = load_fixture(fixture)
+    response = f"Sure, here is the plan.\n```json\n{text}\n```\nLet me know if you need changes."
+    assert extract_json(response) == json.loads(text)
+
+@pytest.mark.parametrize("fixture", FIXTURES)
+@pytest.mark.parametrize("chunk_size", [1, 7, 64])
+def test_stream_extractor_chunks(fixture, chunk_size):
+    text = load_fixture(fixture)
+    extractor = JSONStreamExtractor()
+    for index in range(0, len(text), chunk_size):
+        extractor.feed(text[index:index + chunk_size])
+    assert extractor.complete
+    assert extractor.value() == json.loads(text)
+
+@pytest.mark.parametrize("fixture", FIXTURES)
+def test_stream_extractor_truncated_fixture(fixture):
+    text = load_fixture(fixture)
+    for cut in range(1, len(text), len(text) // 50):
+        extractor = JSONStreamExtractor()
+        extractor.feed(text[:cut])
+        assert not extractor.complete
+        assert isinstance(extractor.value(), dict)
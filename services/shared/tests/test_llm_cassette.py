@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import asyncio
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+import httpx
+from services.shared import mock_llm_server
+from services.shared.llm_client import LLMClient
+from services.shared.llm_cassette import LLMCassette, CassetteMissError
+from services.diet_requirements_generator.models import DietRequirementLLMOutput
+
+@pytest.fixture
+def mock_config():
+    original = mock_llm_server.config.as_dict()
+    mock_llm_server.config.update({"latency": "fixed:0.05", "tokens_per_second": 0, "error_rate": 0, "malformed_rate": 0})
+    yield mock_llm_server.config
+    mock_llm_server.config.update(original)
+
+def client_for(cassette, app=None):
+    transport = httpx.ASGITransport(app=app) if app is not None else httpx.MockTransport(lambda request: httpx.Response(500))
+    llm = LLMClient(http_client=httpx.AsyncClient(transport=transport, base_url="http://mock-llm"), cassette=cassette)
+    llm.client = llm.client.with_options(base_url="http://mock-llm", max_retries=0)
+    return llm
+
+def test_recorded_responses_replay_without_provider(tmp_path, mock_config):
+    path = str(tmp_path / "cassette.jsonl")
+
+    async def scenario():
+        recorder = client_for(LLMCassette(path, "record"), mock_llm_server.app)
+        recorded = await recorder.generate_response("system", "profile", response_model=DietRequirementLLMOutput, task="diet")
+
+        # The provider now fails every call, so any response must come from the cassette
+        replayer = client_for(LLMCassette(path, "replay", time_scale=0.5))
+        started = time.perf_counter()
+        replayed = await replayer.generate_response("system", "profile", response_model=DietRequirementLLMOutput, task="diet")
+        assert replayed == recorded
+        assert time.perf_counter() - started >= 0.02
+
+        with pytest.raises(CassetteMissError):
+            await replayer.generate_response("system", "another profile", response_model=DietRequirementLLMOutput, task="diet")
+
+    asyncio.run(scenario())
+
+def test_cassette_entries_keep_latency_and_tokens(tmp_path, mock_config):
+    path = str(tmp_path / "cassette.jsonl")
+
+    async def scenario():
+        await client_for(LLMCassette(path, "auto"), mock_llm_server.app).generate_response("system", "profile", task="diet")
+
+    asyncio.run(scenario())
+    (entry,) = [entries[0] for entries in LLMCassette(path).entries.values()]
+    assert entry["latency"] >= 0.05
+    assert entry["completion_tokens"] > 0 and entry["model"]
@@ -0,0 +1,67 @@
+import os
+import sys
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from services.shared import llm_responses
+from services.shared.database import Database
+from services.shared.llm_responses import LLMResponseStore
+from services.shared.memory_db import MemoryClient
+from services.shared.migrate_llm_responses import migrate
+
+RESPONSE = '{"daily_requirements": [' + ", ".join(['{"calories": 2000, "protein": 150}'] * 7) + "]}"
+
+@pytest.fixture
+def db(monkeypatch):
+    database = MemoryClient()["virtual_dietician"]
+    monkeypatch.setattr(Database, "db", database)
+    monkeypatch.setattr(LLMResponseStore, "_indexes_ready", False)
+    return database
+
+@pytest.mark.parametrize("codec", ["zlib", "none"])
+def test_compress_round_trip(codec):
+    used, data = llm_responses.compress(RESPONSE, codec)
+    assert used == codec
+    assert llm_responses.decompress(used, data) == RESPONSE
+    if codec == "zlib":
+        assert len(data) < len(RESPONSE)
+
+def test_insert_offloads_the_response(db, monkeypatch):
+    monkeypatch.setattr(llm_responses, "LLM_RESPONSE_COMPRESSION", "zlib")
+
+    async def scenario():
+        document = {"user_id": "user", "llm_response": RESPONSE, "created_at": datetime.utcnow()}
+        result = await LLMResponseStore.insert(db.diet_plans, document, "diet_plans")
+        saved = await db.diet_plans.find_one({"_id": result.inserted_id})
+        return saved, await LLMResponseStore.get(saved["llm_response_id"]), await db.llm_responses.find_one({"_id": result.inserted_id})
+
+    saved, response, stored = asyncio.run(scenario())
+    assert "llm_response" not in saved
+    assert response == RESPONSE
+    assert stored["source"] == "diet_plans" and stored["codec"] == "zlib"
+    assert stored["expires_at"] - stored["created_at"] == timedelta(days=llm_responses.LLM_RESPONSE_RETENTION_DAYS)
+    assert "expires_at_ttl" in asyncio.run(db.llm_responses.index_information())
+
+def test_migration_moves_inline_responses(db, monkeypatch):
+    monkeypatch.setattr(llm_responses, "LLM_RESPONSE_COMPRESSION", "zlib")
+    monkeypatch.setattr(llm_responses, "LLM_RESPONSE_RETENTION_DAYS", 30)
+    recent, expired, migrated = ObjectId(), ObjectId(), ObjectId()
+    db.food_recommendations.documents[recent] = {"_id": recent, "user_id": "user", "llm_response": RESPONSE, "created_at": datetime.utcnow()}
+    db.food_recommendations.documents[expired] = {"_id": expired, "user_id": "user", "llm_response": RESPONSE, "created_at": datetime.utcnow() - timedelta(days=60)}
+    db.food_recommendations.documents[migrated] = {"_id": migrated, "user_id": "user", "llm_response_id": str(migrated)}
+
+    results = asyncio.run(migrate(["food_recommendations"], batch_size=1))
+    stats = results["food_recommendations"]
+    assert (stats["documents"], stats["moved"], stats["expired"]) == (2, 1, 1)
+    assert stats["stored_bytes"] < stats["raw_bytes"]
+    assert all("llm_response" not in document for document in db.food_recommendations.documents.values())
+    assert db.food_recommendations.documents[recent]["llm_response_id"] == str(recent)
+    assert "llm_response_id" not in db.food_recommendations.documents[expired]
+    assert list(db.llm_responses.documents) == [recent]
+    assert asyncio.run(LLMResponseStore.get(str(recent))) == RESPONSE
+
+    # A second run finds nothing left to move
+    assert asyncio.run(migrate(["food_recommendations"]))["food_recommendations"]["documents"] == 0
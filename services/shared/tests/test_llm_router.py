@@ -0,0 +1,43 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from services.shared import llm_router
+from services.shared.llm_router import ModelRouter
+
+ROUTES = {
+    "default": {"models": ["primary"], "timeout": 10},
+    "diet": {"models": ["primary", "fallback", "last"], "timeout": 10},
+}
+
+def test_fresh_router_uses_the_configured_primary():
+    router = ModelRouter(ROUTES)
+    assert router.models_for("diet") == ["primary", "fallback", "last"]
+
+    # A measured primary is not displaced by unmeasured fallbacks
+    router.record_success("diet", "primary", 5.0)
+    assert router.models_for("diet") == ["primary", "fallback", "last"]
+
+def test_measured_models_are_reordered_among_themselves():
+    router = ModelRouter(ROUTES)
+    router.record_success("diet", "primary", 5.0)
+    router.record_success("diet", "last", 1.0)
+    assert router.models_for("diet") == ["last", "fallback", "primary"]
+
+def test_unhealthy_primary_falls_back_until_measurements_expire(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_router.time, "monotonic", lambda: clock[0])
+    router = ModelRouter(ROUTES)
+    router.record_success("diet", "primary", 5.0)
+    for _ in range(router.failure_threshold):
+        router.record_failure("diet", "primary")
+    assert router.models_for("diet") == ["fallback", "last", "primary"]
+
+    router.record_success("diet", "fallback", 1.0)
+    clock[0] += router.cooldown + 1
+    # Healthy again, but slower than the measured fallback
+    assert router.models_for("diet") == ["fallback", "primary", "last"]
+
+    # Once the measurements are stale the configured order is back
+    clock[0] += router.latency_ttl + 1
+    assert router.models_for("diet") == ["primary", "fallback", "last"]
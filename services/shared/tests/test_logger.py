@@ -0,0 +1,72 @@
+import io
+import os
+import sys
+import json
+import time
+import logging
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from services.shared.logger import configure_logging, flush_logs, get_logger
+
+class SlowStream(io.StringIO):
+    def write(self, text):
+        time.sleep(0.02)
+        return super().write(text)
+
+@pytest.fixture
+def configure():
+    yield configure_logging
+    configure_logging()
+
+def records(stream):
+    flush_logs()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_records_are_json_with_redacted_and_truncated_fields(configure):
+    stream = io.StringIO()
+    configure(service="diet", stream=stream, max_field_length=30)
+
+    get_logger("test").info("Login for %s", "ada@example.com", extra={
+        "hashed_password": "$2b$12$secret",
+        "prompt_tokens": 512,
+        "headers": {"Authorization": "Bearer abc", "accept": "*/*"},
+        "response": "x" * 50,
+        "note": "sent Bearer eyJhbGciOi.eyJzdWIi.c2lnbmF0dXJl",
+        "mongo_uri": "mongodb://app:pw@db:27017",
+    })
+
+    (record,) = records(stream)
+    assert record["severity"] == "INFO" and record["logger"] == "test" and record["service"] == "diet"
+    assert record["message"] == "Login for ada@example.com"
+    assert record["hashed_password"] == "[REDACTED]" and record["headers"] == {"Authorization": "[REDACTED]", "accept": "*/*"}
+    assert record["prompt_tokens"] == 512
+    assert record["response"] == "x" * 30 + "... [20 more chars]"
+    assert record["note"] == "sent [REDACTED]"
+    assert record["mongo_uri"] == "mongodb://[REDACTED]@db:27017"
+
+def test_levels_are_sampled(configure):
+    stream = io.StringIO()
+    configure(stream=stream, level="DEBUG", sample_rates={logging.DEBUG: 0.0})
+
+    logger = get_logger("test")
+    for _ in range(10):
+        logger.debug("Parsed response")
+    logger.info("Saved")
+
+    assert [record["message"] for record in records(stream)] == ["Saved"]
+
+def test_slow_output_never_blocks_the_caller(configure):
+    stream = SlowStream()
+    configure(stream=stream, queue_size=5)
+
+    logger = get_logger("test")
+    started = time.perf_counter()
+    for i in range(50):
+        logger.info("Record %d", i)
+    assert time.perf_counter() - started < 0.1
+
+    flush_logs()
+    logger.info("Caught up")
+    messages = [record["message"] for record in records(stream)]
+    assert "Record 0" in messages and messages[-1] == "Caught up"
+    assert any(message.startswith("Dropped") for message in messages)
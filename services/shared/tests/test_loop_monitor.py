@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+import asyncio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from services.shared.loop_monitor import LoopMonitor
+
+def blocking_hash():
+    time.sleep(0.3)
+
+def test_blocking_call_is_reported_with_its_stack(caplog):
+    async def scenario():
+        monitor = LoopMonitor(interval=0.01, stall_threshold=0.05, debug=True)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_hash()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    assert monitor.stalls == 1
+    assert monitor.max_lag >= 0.25
+    (record,) = [record for record in caplog.records if record.name == "services.shared.loop_monitor"]
+    assert "in blocking_hash" in "\n".join(record.stack)
+
+def test_idle_loop_has_no_stalls():
+    async def scenario():
+        monitor = LoopMonitor(interval=0.01, stall_threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.2)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    assert monitor.stalls == 0
+    assert monitor.max_lag < 0.05
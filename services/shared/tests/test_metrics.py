@@ -0,0 +1,64 @@
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from services.shared.metrics import setup_metrics, MongoCommandListener
+from services.shared.llm_client import LLMClient
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_routes_are_labelled_by_template():
+    app = FastAPI()
+    setup_metrics(app)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id}
+
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    before = sample("http_request_duration_seconds_count", **labels)
+    client = TestClient(app)
+    for item_id in ("a", "b", "c"):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    client.get("/missing")
+
+    assert sample("http_request_duration_seconds_count", **labels) == before + 3
+    assert sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+    assert "http_request_duration_seconds_bucket" in client.get("/metrics").text
+
+def test_mongo_commands_are_timed_per_collection():
+    listener = MongoCommandListener()
+    labels = {"collection": "feedback", "command": "insert", "outcome": "success"}
+    before = sample("mongo_operation_duration_seconds_count", **labels)
+
+    started = SimpleNamespace(command={"insert": "feedback", "documents": []}, command_name="insert", connection_id=("localhost", 27017), request_id=1)
+    listener.started(started)
+    assert sample("mongo_operations_in_flight") == 1
+    listener.succeeded(SimpleNamespace(command_name="insert", connection_id=("localhost", 27017), request_id=1, duration_micros=1500))
+
+    assert sample("mongo_operations_in_flight") == 0
+    assert sample("mongo_operation_duration_seconds_count", **labels) == before + 1
+
+def test_llm_calls_record_latency_and_tokens():
+    client = LLMClient()
+    model = client.router.models_for("feedback_analysis")[0]
+
+    async def create(**request):
+        message = SimpleNamespace(content='{"identified_concerns": []}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30))
+
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    tokens_in = sample("llm_tokens_total", task="feedback_analysis", model=model, direction="in")
+    calls = sample("llm_request_duration_seconds_count", task="feedback_analysis", model=model, outcome="success")
+
+    assert asyncio.run(client.generate_response("system", "user", task="feedback_analysis")) == '{"identified_concerns": []}'
+    assert sample("llm_tokens_total", task="feedback_analysis", model=model, direction="in") == tokens_in + 120
+    assert sample("llm_tokens_total", task="feedback_analysis", model=model, direction="out") >= 30
+    assert sample("llm_request_duration_seconds_count", task="feedback_analysis", model=model, outcome="success") == calls + 1
+    assert sample("llm_requests_in_flight", task="feedback_analysis") == 0
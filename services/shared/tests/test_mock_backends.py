@@ -0,0 +1,86 @@
+import os
+import sys
+import json
+import asyncio
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+import groq
+import httpx
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from services.shared import mock_llm_server
+from services.shared.memory_db import MemoryClient
+from services.shared.llm_client import LLMClient
+from services.diet_requirements_generator.models import DietRequirementLLMOutput
+from services.food_plate_recommendation.models import FoodRecommendationLLMOutput
+
+@pytest.fixture
+def mock_config():
+    original = mock_llm_server.config.as_dict()
+    mock_llm_server.config.update({"latency": "fixed:0", "tokens_per_second": 0, "error_rate": 0, "malformed_rate": 0})
+    yield mock_llm_server.config
+    mock_llm_server.config.update(original)
+
+def mock_http_client():
+    return httpx.AsyncClient(app=mock_llm_server.app, base_url="http://mock-llm")
+
+def test_memory_backend_queries():
+    async def scenario():
+        users = MemoryClient()["test"].users
+        await users.create_index("email", unique=True)
+        first = await users.insert_one({"email": "a@example.com", "created_at": 1, "profile": {"age": 30}})
+        await users.insert_one({"email": "b@example.com", "created_at": 2, "profile": None})
+        with pytest.raises(DuplicateKeyError):
+            await users.insert_one({"email": "a@example.com"})
+
+        latest = await users.find({}, {"profile": 0}).sort("created_at", -1).limit(1).to_list(length=1)
+        assert [user["email"] for user in latest] == ["b@example.com"]
+        assert "profile" not in latest[0]
+
+        updated = await users.find_one_and_update(
+            {"_id": first.inserted_id, "profile": {"$type": "object"}},
+            {"$set": {"profile.age": 31}, "$inc": {"profile_version": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        assert updated["profile"] == {"age": 31} and updated["profile_version"] == 1
+        assert await users.find_one_and_update({"email": "b@example.com", "profile": {"$type": "object"}}, {"$set": {"x": 1}}) is None
+        assert await users.count_documents({"created_at": {"$gte": 2}}) == 1
+
+    asyncio.run(scenario())
+
+def test_mock_server_replays_schema_valid_responses(mock_config):
+    async def scenario():
+        llm = LLMClient(http_client=mock_http_client())
+        llm.client = llm.client.with_options(base_url="http://mock-llm")
+        content = await llm.generate_response("any", "profile", response_model=DietRequirementLLMOutput, task="diet")
+        DietRequirementLLMOutput(**json.loads(content))
+
+        stream = await llm.client.chat.completions.create(
+            model="mock",
+            messages=[{"role": "system", "content": "Your task is to generate daily meal plans"}],
+            stream=True
+        )
+        streamed = ""
+        async for chunk in stream:
+            streamed += chunk.choices[0].delta.content or ""
+        FoodRecommendationLLMOutput(**json.loads(streamed))
+
+    asyncio.run(scenario())
+
+def test_mock_server_injects_errors(mock_config):
+    mock_config.update({"error_rate": 1, "error_codes": [429]})
+
+    async def scenario():
+        client = groq.AsyncClient(api_key="test", base_url="http://mock-llm", http_client=mock_http_client(), max_retries=0)
+        with pytest.raises(groq.RateLimitError):
+            await client.chat.completions.create(model="mock", messages=[{"role": "user", "content": "hi"}])
+
+    asyncio.run(scenario())
+
+def test_latency_distribution_specs():
+    rng = mock_llm_server.random.Random(1)
+    assert mock_llm_server.LatencyDistribution("fixed:0.5", rng).sample() == 0.5
+    assert 1 <= mock_llm_server.LatencyDistribution("uniform:1,2", rng).sample() <= 2
+    with pytest.raises(ValueError):
+        mock_llm_server.LatencyDistribution("lognormal:1", rng)
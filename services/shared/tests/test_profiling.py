@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from services.shared import profiling
+from services.shared.profiling import setup_profiling
+
+def busy_prompt_build():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+
+def make_app(monkeypatch, tmp_path, limit=6):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILING_DIR", str(tmp_path))
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        busy_prompt_build()
+        return {"ok": True}
+
+    setup_profiling(app, max_per_minute=limit)
+    return TestClient(app)
+
+def test_profile_is_recorded_and_served(monkeypatch, tmp_path):
+    client = make_app(monkeypatch, tmp_path)
+    response = client.get("/work", headers={"X-Profile": "secret"})
+    profile_id = response.headers["x-profile-id"]
+
+    profile = client.get(f"/debug/profiles/{profile_id}", headers={"X-Profile": "secret"})
+    assert profile.status_code == 200
+    assert any(line.startswith("request;") and "busy_prompt_build" in line for line in profile.text.splitlines())
+    assert client.get(f"/debug/profiles/{profile_id}").status_code == 403
+
+def test_requests_without_token_or_over_limit_are_not_profiled(monkeypatch, tmp_path):
+    client = make_app(monkeypatch, tmp_path, limit=1)
+    assert "x-profile-id" not in client.get("/work", headers={"X-Profile": "wrong"}).headers
+    # The token is not accepted in the query string, where it would be logged
+    assert "x-profile-id" not in client.get("/work?profile=secret").headers
+    assert "x-profile-id" in client.get("/work", headers={"X-Profile": "secret"}).headers
+    assert client.get("/work", headers={"X-Profile": "secret"}).headers["x-profile-skipped"] == "rate-limited"
@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import asyncio
+import pytest
+from bson import ObjectId
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from fastapi.testclient import TestClient
+from services.shared import repository, llm_responses, user_summary
+from services.shared.repository import DocumentRepository
+from services.shared.memory_db import MemoryClient
+from services.conftest import CountingCollection, FakeLLM, PROFILE
+from services.food_plate_recommendation import handler as food_handler, router as food_router
+from services.food_plate_recommendation.main import app as food_app
+
+@pytest.fixture
+def collections(monkeypatch):
+    collections = {"users": CountingCollection(), "diet_plans": CountingCollection(), "food_recommendations": CountingCollection(), "llm_responses": CountingCollection(), "user_summaries": MemoryClient()["virtual_dietician"].user_summaries}
+
+    def getter(name):
+        async def get_collection():
+            return collections[name]
+        return get_collection
+
+    monkeypatch.setattr(repository, "get_user_collection", getter("users"))
+    monkeypatch.setattr(repository, "get_diet_plan_collection", getter("diet_plans"))
+    monkeypatch.setattr(repository, "get_food_recommendation_collection", getter("food_recommendations"))
+    monkeypatch.setattr(food_handler, "get_food_recommendation_collection", getter("food_recommendations"))
+    monkeypatch.setattr(llm_responses, "get_llm_response_collection", getter("llm_responses"))
+    monkeypatch.setattr(llm_responses.LLMResponseStore, "_indexes_ready", True)
+    monkeypatch.setattr(user_summary, "get_user_summary_collection", getter("user_summaries"))
+    DocumentRepository.diet_requirements.clear()
+    DocumentRepository.food_recommendations.clear()
+    return collections
+
+def add(collection, **fields):
+    document_id = ObjectId()
+    collection.documents[document_id] = {"_id": document_id, **fields}
+    return str(document_id)
+
+def test_generated_documents_are_cached(collections):
+    requirement_id = add(collections["diet_plans"], user_id="user", llm_response="raw output")
+
+    first = asyncio.run(DocumentRepository.get_diet_requirement(requirement_id))
+    second = asyncio.run(DocumentRepository.get_diet_requirement(requirement_id))
+
+    assert first == second == {"id": requirement_id, "user_id": "user"}
+    assert collections["diet_plans"].round_trips == 1
+
+def test_users_are_read_every_time_without_password(collections):
+    user_id = add(collections["users"], name="User", password="hash")
+
+    for _ in range(2):
+        assert asyncio.run(DocumentRepository.get_user(user_id)) == {"id": user_id, "name": "User"}
+    assert collections["users"].round_trips == 2
+
+def test_unknown_and_invalid_ids(collections):
+    assert asyncio.run(DocumentRepository.get_food_recommendation(str(ObjectId()))) is None
+    assert asyncio.run(DocumentRepository.get_food_recommendation("not-an-id")) is None
+    assert collections["food_recommendations"].round_trips == 1
+
+def test_food_recommendation_from_ids(collections, monkeypatch):
+    user_id = add(collections["users"], name="User", password="hash", profile=PROFILE)
+    requirement_id = add(collections["diet_plans"], user_id=user_id, daily_requirements={"monday": {"calories": 300}})
+    meal = {
+        "meal_type": "breakfast",
+        "food_items": [{"name": "Oats", "quantity": "1 cup", "calories": 300, "protein": 10, "carbohydrates": 50, "fat": 5, "fiber": 8}]
+    }
+    monkeypatch.setattr(food_router.handler, "llm_client", FakeLLM(json.dumps({"meal_plans": {"monday": {"day": "monday", "meals": [meal]}}})))
+
+    client = TestClient(food_app)
+    response = client.post("/api/v1/food-recommendation", json={"user_id": user_id, "diet_requirement_id": requirement_id})
+    assert response.status_code == 201
+    assert response.json()["status"] == "completed"
+    assert response.json()["user_id"] == user_id
+    assert response.json()["diet_requirement_id"] == requirement_id
+    # The diet requirement was resolved from its id: the plan covers its days
+    assert list(response.json()["meal_plans"]) == ["monday"]
+
+    response = client.post("/api/v1/food-recommendation", json={"user_id": user_id, "diet_requirement_id": str(ObjectId())})
+    assert response.status_code == 404
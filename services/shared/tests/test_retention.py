@@ -0,0 +1,70 @@
+import os
+import sys
+import gzip
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId, json_util
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from services.shared import retention
+from services.shared.database import Database
+from services.shared.memory_db import MemoryClient
+from services.shared.retention import run_retention
+
+@pytest.fixture
+def db(monkeypatch):
+    database = MemoryClient()["virtual_dietician"]
+    monkeypatch.setattr(Database, "db", database)
+    return database
+
+def add(collection, days_old, **fields):
+    document_id = ObjectId()
+    collection.documents[document_id] = {"_id": document_id, "created_at": datetime.utcnow() - timedelta(days=days_old), **fields}
+    return document_id
+
+def test_superseded_versions_are_archived(db):
+    plans = db.diet_plans
+    referenced = add(plans, 90, user_id="a", status="completed")
+    superseded = add(plans, 60, user_id="a", status="completed")
+    recent = add(plans, 5, user_id="a", status="completed")
+    latest = add(plans, 1, user_id="a", status="completed")
+    only = add(plans, 90, user_id="b", status="completed")
+    last_success = add(plans, 60, user_id="c", status="completed")
+    failed_latest = add(plans, 40, user_id="c", status="failed")
+    add(db.food_recommendations, 1, user_id="a", status="completed", diet_requirement_id=str(referenced))
+
+    results = asyncio.run(run_retention(target="collection"))
+
+    assert set(plans.documents) == {referenced, recent, latest, only, last_success, failed_latest}
+    assert list(db.diet_plans_archive.documents) == [superseded]
+    assert results["diet_plans"]["archived"] == 1
+    assert results["diet_plans"]["after"]["size"] < results["diet_plans"]["before"]["size"]
+
+    indexes = asyncio.run(plans.index_information())
+    assert indexes["failed_ttl"]["partialFilterExpression"] == {"status": "failed"}
+    assert indexes["failed_ttl"]["expireAfterSeconds"] == 7 * 86400
+    assert asyncio.run(db.special_needs.index_information())["failed_ttl"]["partialFilterExpression"] == {"status": "FAILED"}
+
+def test_archive_to_jsonl(db, tmp_path):
+    superseded = add(db.special_needs, 60, user_id="a", status="COMPLETED", plan={"notes": "old"})
+    add(db.special_needs, 1, user_id="a", status="COMPLETED")
+
+    dry_run = asyncio.run(run_retention(target="jsonl", archive_dir=str(tmp_path), dry_run=True))
+    assert dry_run["special_needs"]["archived"] == 1 and len(db.special_needs.documents) == 2
+
+    results = asyncio.run(run_retention(target="jsonl", archive_dir=str(tmp_path)))
+    with gzip.open(results["special_needs"]["destination"], "rt") as archive:
+        archived = [json_util.loads(line) for line in archive]
+    assert archived[0]["_id"] == superseded and archived[0]["plan"] == {"notes": "old"}
+    assert superseded not in db.special_needs.documents
+
+def test_retention_change_updates_the_ttl(db, monkeypatch):
+    asyncio.run(retention.ensure_indexes(db))
+    monkeypatch.setattr(retention, "FAILED_RETENTION_DAYS", 1)
+    asyncio.run(retention.ensure_indexes(db))
+    assert asyncio.run(db.feedback.index_information())["failed_ttl"]["expireAfterSeconds"] == 86400
+
+    monkeypatch.setattr(retention, "FAILED_RETENTION_DAYS", 0)
+    asyncio.run(retention.ensure_indexes(db))
+    assert "failed_ttl" not in asyncio.run(db.feedback.index_information())
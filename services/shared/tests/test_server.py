@@ -0,0 +1,22 @@
+import os
+import sys
+import subprocess
+import pytest
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+SERVICES = ["diet_requirements_generator", "food_plate_recommendation", "special_needs_accommodation", "monolith"]
+
+@pytest.mark.parametrize("service", SERVICES)
+def test_importing_a_service_creates_no_llm_clients(service):
+    # The launcher preloads the app in the gunicorn master; nothing created there may cross the fork
+    code = (
+        f"import services.{service}.main\n"
+        "from services.shared.llm_client import LLMClientRegistry\n"
+        "assert LLMClientRegistry.clients == {}, LLMClientRegistry.clients\n"
+        "assert LLMClientRegistry.http_client is None\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+        env={**os.environ, "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "test")}
+    )
+    assert result.returncode == 0, result.stderr
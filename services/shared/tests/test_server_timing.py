@@ -0,0 +1,72 @@
+import os
+import sys
+import asyncio
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+import httpx
+from services.shared import mock_llm_server
+from services.shared.database import Database
+from services.shared.memory_db import MemoryClient
+from services.shared.llm_client import LLMClient
+from services.shared.server_timing import ServerTiming
+from services.diet_requirements_generator import router as diet_router
+from services.diet_requirements_generator.main import app as diet_app
+
+PROFILE = {
+    "age": 34,
+    "gender": "female",
+    "height": 168.0,
+    "weight": 64.0,
+    "diet_type": "vegetarian",
+    "activity_level": "moderate",
+    "health_goal": "maintenance"
+}
+
+def parse_header(header):
+    return {entry.split(";")[0].strip(): float(entry.split("dur=")[1].split(";")[0]) for entry in header.split(",")}
+
+@pytest.fixture
+def diet_service(monkeypatch):
+    original = mock_llm_server.config.as_dict()
+    mock_llm_server.config.update({"latency": "fixed:0.05", "tokens_per_second": 20000, "error_rate": 0, "malformed_rate": 0})
+    llm = LLMClient(http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_llm_server.app), base_url="http://mock-llm"))
+    llm.client = llm.client.with_options(base_url="http://mock-llm", max_retries=0)
+    monkeypatch.setattr(diet_router.handler, "llm_client", llm)
+    monkeypatch.setattr(Database, "db", MemoryClient()["test"])
+    yield diet_app
+    mock_llm_server.config.update(original)
+
+def test_generation_reports_each_stage(diet_service):
+    async def scenario():
+        async with httpx.AsyncClient(app=diet_service, base_url="http://diet") as client:
+            return await client.post("/api/v1/diet-requirements", params={"debug": "true"}, json={"user_data": {"id": "user", "profile": PROFILE}})
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 201
+
+    timings = parse_header(response.headers["server-timing"])
+    for stage in ("prompt", "llm_ttft", "llm", "parse", "validate", "db_write", "total"):
+        assert stage in timings
+    assert 50 <= timings["llm_ttft"] <= timings["llm"] <= timings["total"]
+
+    debug = response.json()["debug"]["timings"]
+    assert list(debug)[:-1] == list(timings)[:-1]
+    assert debug["llm"] == timings["llm"]
+
+def test_timings_are_only_in_the_body_on_request(diet_service):
+    async def scenario():
+        async with httpx.AsyncClient(app=diet_service, base_url="http://diet") as client:
+            return await client.post("/api/v1/diet-requirements", json={"user_data": {"id": "user", "profile": PROFILE}})
+
+    response = asyncio.run(scenario())
+    assert response.json()["debug"] is None
+    assert "total" in parse_header(response.headers["server-timing"])
+
+def test_header_lists_stages_in_order():
+    timing = ServerTiming()
+    timing.add("db_write", 0.002)
+    timing.add("prompt", 0.0011)
+    timing.add("prompt", 0.0004)
+    header = timing.header()
+    assert header.startswith('prompt;dur=1.5;desc="Prompt build", db_write;dur=2.0;desc="DB write", total;dur=')
@@ -0,0 +1,45 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from services.shared.tracing import TracingMiddleware, inject_headers, span, traced
+
+exporter = InMemorySpanExporter()
+provider = TracerProvider()
+provider.add_span_processor(SimpleSpanProcessor(exporter))
+trace.set_tracer_provider(provider)
+
+TRACE_ID = "0af7651916cd43dd8448eb211c80319c"
+PARENT_ID = "b7ad6b7169203331"
+
+@traced("stage.prompt_build")
+def build_prompt():
+    return inject_headers()
+
+def test_request_spans_continue_the_callers_trace():
+    exporter.clear()
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        with span("stage.save", item_id=item_id):
+            return build_prompt()
+
+    response = TestClient(app).get("/items/1", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+    spans = {finished.name: finished for finished in exporter.get_finished_spans()}
+
+    assert set(spans) == {"GET /items/{item_id}", "stage.save", "stage.prompt_build"}
+    assert all(format(finished.context.trace_id, "032x") == TRACE_ID for finished in spans.values())
+    server_span = spans["GET /items/{item_id}"]
+    assert format(server_span.parent.span_id, "016x") == PARENT_ID
+    assert spans["stage.save"].parent.span_id == server_span.context.span_id
+    assert spans["stage.prompt_build"].parent.span_id == spans["stage.save"].context.span_id
+    assert server_span.attributes["http.status_code"] == 200
+    # Outbound calls made inside the handler carry the trace on
+    assert response.json()["traceparent"].split("-")[1] == TRACE_ID
@@ -0,0 +1,86 @@
+import os
+import sys
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from services.shared import user_summary
+from services.shared.database import Database
+from services.shared.memory_db import MemoryClient
+from services.shared.repository import DocumentRepository
+from services.diet_requirements_generator.handler import DietRequirementsHandler
+from services.diet_requirements_generator.models import DietRequirement, DietRequirementStatus, NutritionalValue
+from services.special_needs_accommodation.handler import SpecialNeedsHandler
+
+@pytest.fixture
+def db(monkeypatch):
+    database = MemoryClient()["virtual_dietician"]
+    monkeypatch.setattr(Database, "db", database)
+    DocumentRepository.diet_requirements.clear()
+    return database
+
+def diet_requirement(days_old, calories):
+    return DietRequirement(
+        user_id="user",
+        created_at=datetime.utcnow() - timedelta(days=days_old),
+        status=DietRequirementStatus.COMPLETED,
+        daily_requirements={day: NutritionalValue(calories=calories) for day in ("monday", "tuesday")},
+        llm_response="{}"
+    )
+
+def test_saves_keep_the_newest_pointer(db):
+    handler = DietRequirementsHandler()
+
+    async def scenario():
+        newer = await handler.save_diet_requirements(diet_requirement(1, 2000))
+        # A slower save of an older document does not move the pointer back
+        await handler.save_diet_requirements(diet_requirement(2, 1500))
+        return newer, await handler.get_latest_diet_requirement_for_user("user")
+
+    newer, latest = asyncio.run(scenario())
+    summary = db.user_summaries.documents["user"]["diet_requirement"]
+    assert summary["id"] == newer and summary["status"] == "completed" and summary["weekly_calories"] == 4000
+    assert latest["id"] == newer and latest["status_code"] == 200
+
+def test_missing_summaries_fall_back_and_are_repaired(db):
+    handler = SpecialNeedsHandler()
+    older, newer = ObjectId(), ObjectId()
+    db.special_needs.documents[older] = {"_id": older, "user_id": "user", "status": "COMPLETED", "created_at": datetime.utcnow() - timedelta(days=2)}
+    db.special_needs.documents[newer] = {"_id": newer, "user_id": "user", "status": "FAILED", "created_at": datetime.utcnow() - timedelta(days=1)}
+
+    # Saved before summaries existed
+    plan = asyncio.run(handler.get_latest_plan_for_user("user"))
+    assert plan["id"] == str(newer)
+    assert db.user_summaries.documents["user"]["special_needs_plan"]["id"] == str(newer)
+
+    # The failed plan expires; the summary moves back to the one before it
+    del db.special_needs.documents[newer]
+    assert asyncio.run(handler.get_latest_plan_for_user("user"))["id"] == str(older)
+    assert db.user_summaries.documents["user"]["special_needs_plan"]["status"] == "COMPLETED"
+
+    del db.special_needs.documents[older]
+    assert asyncio.run(handler.get_latest_plan_for_user("user")) is None
+    assert db.user_summaries.documents["user"]["special_needs_plan"]["id"] is None
+
+def test_users_without_documents_stop_at_the_summary_until_it_expires(db, monkeypatch):
+    handler = DietRequirementsHandler()
+    assert asyncio.run(handler.get_latest_diet_requirement_for_user("user")) is None
+    assert db.user_summaries.documents["user"]["diet_requirement"]["id"] is None
+
+    # Written without the summary, e.g. by an older deployment or restored from an archive
+    stray = ObjectId()
+    db.diet_plans.documents[stray] = {"_id": stray, "user_id": "user", "created_at": datetime.utcnow() - timedelta(days=1)}
+    assert asyncio.run(handler.get_latest_diet_requirement_for_user("user")) is None
+
+    # Once the empty entry expires the sorted query finds it and repairs the summary
+    monkeypatch.setattr(user_summary, "USER_SUMMARY_EMPTY_TTL", 0)
+    assert asyncio.run(handler.get_latest_diet_requirement_for_user("user"))["id"] == str(stray)
+    assert db.user_summaries.documents["user"]["diet_requirement"]["id"] == str(stray)
+
+    # A save replaces an empty entry straight away
+    asyncio.run(user_summary.UserSummary._replace("diet_requirement", "user", str(stray), None))
+    requirement_id = asyncio.run(handler.save_diet_requirements(diet_requirement(0, 1800)))
+    assert db.user_summaries.documents["user"]["diet_requirement"]["id"] == requirement_id
+    assert asyncio.run(handler.get_latest_diet_requirement_for_user("user"))["id"] == requirement_id
@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from fastapi.testclient import TestClient
+from services.food_plate_recommendation import handler as food_handler, router as food_router
+from services.food_plate_recommendation.main import app as food_app
+from services.special_needs_accommodation import handler as special_needs_handler, router as special_needs_router
+from services.special_needs_accommodation.main import app as special_needs_app
+from services.shared import llm_responses as llm_response_store, user_summary
+from services.shared.memory_db import MemoryClient
+from services.conftest import CountingCollection, FakeLLM, PROFILE
+
+@pytest.fixture(autouse=True)
+def llm_responses(monkeypatch):
+    collection = CountingCollection()
+
+    async def get_collection():
+        return collection
+
+    monkeypatch.setattr(llm_response_store, "get_llm_response_collection", get_collection)
+    monkeypatch.setattr(llm_response_store.LLMResponseStore, "_indexes_ready", True)
+    return collection
+
+@pytest.fixture(autouse=True)
+def user_summaries(monkeypatch):
+    collection = MemoryClient()["virtual_dietician"].user_summaries
+
+    async def get_collection():
+        return collection
+
+    monkeypatch.setattr(user_summary, "get_user_summary_collection", get_collection)
+    return collection
+
+def test_create_food_recommendation_round_trips(monkeypatch, llm_responses, user_summaries):
+    collection = CountingCollection()
+
+    async def get_collection():
+        return collection
+
+    meal = {
+        "meal_type": "breakfast",
+        "food_items": [{"name": "Oats", "quantity": "1 cup", "calories": 300, "protein": 10, "carbohydrates": 50, "fat": 5, "fiber": 8}]
+    }
+    monkeypatch.setattr(food_handler, "get_food_recommendation_collection", get_collection)
+    monkeypatch.setattr(food_router.handler, "llm_client", FakeLLM(json.dumps({"meal_plans": {"monday": {"day": "monday", "meals": [meal]}}})))
+
+    client = TestClient(food_app)
+    response = client.post("/api/v1/food-recommendation", json={
+        "user_data": {"id": "user", "profile": PROFILE},
+        "diet_requirement": {"id": "requirement", "daily_requirements": {"monday": {"calories": 300}}}
+    })
+    assert response.status_code == 201
+    assert response.json()["status"] == "completed"
+    # Insert only, no read back; the raw response is stored alongside, concurrently
+    assert collection.round_trips == 1
+    (saved,) = collection.documents.values()
+    assert "llm_response" not in saved and saved["llm_response_id"] == response.json()["id"]
+    assert llm_responses.round_trips == 1
+    # The user's summary now points at it
+    assert user_summaries.documents["user"]["food_recommendation"]["id"] == response.json()["id"]
+
+@pytest.mark.parametrize("feedback_type, expected_round_trips", [
+    ("positive", 1),  # insert feedback
+    ("negative", 3),  # insert feedback, insert analysis, link analysis to feedback
+])
+def test_create_feedback_round_trips(monkeypatch, feedback_type, expected_round_trips):
+    collection = CountingCollection()
+
+    async def get_collection():
+        return collection
+
+    monkeypatch.setattr(special_needs_handler, "get_feedback_collection", get_collection)
+    monkeypatch.setattr(special_needs_router.handler, "llm_client", FakeLLM(json.dumps({"identified_concerns": ["bloating"]})))
+
+    client = TestClient(special_needs_app)
+    response = client.post("/api/v1/feedback", json={
+        "user_data": {"id": "user", "profile": PROFILE},
+        "food_recommendation_id": "recommendation",
+        "feedback_text": "Felt bloated after lunch",
+        "feedback_type": feedback_type
+    })
+    assert response.status_code == 200
+    assert (response.json()["analysis"] is not None) == (feedback_type == "negative")
+    if feedback_type == "negative":
+        # The raw LLM response is referenced, not returned
+        analysis = response.json()["analysis"]
+        assert "llm_response" not in analysis and analysis["llm_response_id"] == analysis["id"]
+    assert collection.round_trips == expected_round_trips
+
+def test_create_special_needs_plan_round_trips(monkeypatch):
+    collection = CountingCollection()
+
+    async def get_collection():
+        return collection
+
+    monkeypatch.setattr(special_needs_handler, "get_special_needs_collection", get_collection)
+
+    client = TestClient(special_needs_app)
+    response = client.post("/api/v1/special-needs-plan", json={
+        "user_data": {"id": "user"},
+        "user_profile": PROFILE,
+        "food_recommendation": {"weekly_plan": {}}
+    })
+    assert response.status_code == 201
+    assert response.json()["status"] == "COMPLETED"
+    assert collection.round_trips == 1
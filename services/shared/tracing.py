@@ -0,0 +1,158 @@
+# OpenTelemetry tracing shared by the services and the frontend
+#
+# OTEL_TRACES_EXPORTER selects where spans go:
+#   none     tracing disabled (default); spans are no-ops
+#   console  print finished spans to stdout
+#   file     append finished spans as JSON to OTEL_TRACES_FILE (default traces.jsonl)
+#   otlp     send to an OTLP collector (requires opentelemetry-exporter-otlp)
+import os
+import json
+import time
+import asyncio
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from opentelemetry import context, propagate, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from services.shared.server_timing import record_span
+
+load_dotenv()
+
+TRACES_EXPORTER = os.getenv("OTEL_TRACES_EXPORTER", "none").lower()
+TRACES_FILE = os.getenv("OTEL_TRACES_FILE", "traces.jsonl")
+
+tracer = trace.get_tracer("virtual_dietician")
+
+_configured = False
+_configure_lock = threading.Lock()
+
+def _create_exporter():
+    if TRACES_EXPORTER == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        return ConsoleSpanExporter()
+    if TRACES_EXPORTER == "file":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        trace_file = open(TRACES_FILE, "a")
+        return ConsoleSpanExporter(out=trace_file, formatter=lambda span: json.dumps(json.loads(span.to_json())) + "\n")
+    if TRACES_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    return None
+
+def configure_tracing(service_name: str) -> bool:
+    """
+    Install the tracer provider for this process, once
+
+    Args:
+        service_name: Reported as service.name on every span
+
+    Returns:
+        bool: Whether spans are being exported
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return TRACES_EXPORTER != "none"
+        _configured = True
+
+        exporter = _create_exporter()
+        if exporter is None:
+            return False
+
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", service_name)}))
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        return True
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Trace a block of code as a child of the current span, counting its duration towards
+    the request's Server-Timing stage when it is one (see server_timing.SPAN_STAGES)
+    """
+    started = time.perf_counter()
+    try:
+        with tracer.start_as_current_span(name, attributes={k: v for k, v in attributes.items() if v is not None}) as current:
+            yield current
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+def traced(name: str):
+    """
+    Decorator that traces every call of a function or coroutine function
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def inject_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Add the current trace context (traceparent) to outbound request headers
+    """
+    headers = dict(headers or {})
+    propagate.inject(headers)
+    return headers
+
+class TracingMiddleware:
+    """
+    Start a server span for every HTTP request, continuing the caller's trace when the
+    request carries a traceparent header. Spans are named after the route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        token = context.attach(propagate.extract(carrier))
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            with tracer.start_as_current_span(f"{scope['method']} {scope['path']}", kind=SpanKind.SERVER) as server_span:
+                try:
+                    await self.app(scope, receive, send_with_status)
+                finally:
+                    route = getattr(scope.get("route"), "path", None)
+                    if route:
+                        server_span.update_name(f"{scope['method']} {route}")
+                        server_span.set_attribute("http.route", route)
+                    server_span.set_attribute("http.method", scope["method"])
+                    server_span.set_attribute("http.status_code", status_code)
+                    if status_code >= 500:
+                        server_span.set_status(Status(StatusCode.ERROR))
+        finally:
+            context.detach(token)
+
+def setup_tracing(app: Any, service_name: str):
+    """
+    Configure tracing for a service and trace its incoming requests
+    """
+    if configure_tracing(service_name):
+        app.add_middleware(TracingMiddleware)
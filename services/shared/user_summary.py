@@ -0,0 +1,165 @@
+# Per-user summary of the latest generated documents
+#
+# Every save also points the user's document in user_summaries (keyed by user id) at what was
+# just saved, with a few headline fields:
+#
+#   {"_id": user_id,
+#    "diet_requirement": {"id", "created_at", "status", "weekly_calories"},
+#    "food_recommendation": {"id", "created_at", "status", "diet_requirement_id", "days"},
+#    "special_needs_plan": {"id", "created_at", "status"},
+#    "updated_at"}
+#
+# so the latest lookups are point reads by _id instead of sorted queries over a user's whole
+# history. Each save is a single conditional update, so it is atomic and a slow save of an
+# older document never replaces a newer one. Users with no summary yet, and summaries pointing
+# at documents since expired or archived (see services.shared.retention), fall back to the
+# sorted query once and are repaired from its result. A user with no documents of a kind gets
+# an entry {"id": None, "checked_at"}, so lookups for them stop at the summary as well until
+# USER_SUMMARY_EMPTY_TTL has passed. After that the sorted query runs again, which picks up
+# documents not saved through record(), such as those written by older deployments or restored
+# from an archive.
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from pymongo.errors import DuplicateKeyError
+from dotenv import load_dotenv
+from services.shared.database import get_user_summary_collection
+
+load_dotenv()
+
+USER_SUMMARY_EMPTY_TTL = float(os.getenv("USER_SUMMARY_EMPTY_TTL", "300"))
+
+def _status(document: Dict[str, Any]) -> Optional[str]:
+    status = document.get("status")
+    return getattr(status, "value", status)
+
+def _weekly_calories(document: Dict[str, Any]) -> Optional[float]:
+    daily_requirements = document.get("daily_requirements") or {}
+    if not daily_requirements:
+        return None
+    return round(sum((day or {}).get("calories") or 0 for day in daily_requirements.values()), 1)
+
+def _without_document(section: str) -> List[Dict[str, Any]]:
+    """Clauses matching summaries with no document recorded in the section"""
+    return [{section: {"$exists": False}}, {f"{section}.id": None}]
+
+# Headline fields kept for each kind of document, besides its id, created_at and status
+HEADLINES: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "diet_requirement": lambda document: {"weekly_calories": _weekly_calories(document)},
+    "food_recommendation": lambda document: {
+        "diet_requirement_id": document.get("diet_requirement_id"),
+        "days": len(document.get("meal_plans") or {}),
+    },
+    "special_needs_plan": lambda document: {},
+}
+
+class UserSummary:
+    """
+    Pointers from each user to their latest diet requirement, food recommendation and
+    special needs plan
+    """
+
+    @staticmethod
+    def entry(section: str, document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The summary of one document
+
+        Args:
+            section: Key in HEADLINES
+            document: The document, with its _id (or id) set
+        """
+        document_id = document.get("_id", document.get("id"))
+        return {
+            "id": str(document_id),
+            "created_at": document.get("created_at"),
+            "status": _status(document),
+            **HEADLINES[section](document),
+        }
+
+    @classmethod
+    async def record(cls, section: str, document: Dict[str, Any]):
+        """
+        Point the owner's summary at a newly saved document, unless it already points at a
+        newer one. The document's _id must be set before it is inserted.
+        """
+        user_id = document.get("user_id")
+        if not user_id:
+            return
+        entry = cls.entry(section, document)
+        collection = await get_user_summary_collection()
+        query = {"_id": user_id, "$or": [
+            *_without_document(section),
+            {f"{section}.created_at": {"$lt": entry["created_at"]}}
+        ]}
+        update = {"$set": {section: entry, "updated_at": datetime.utcnow()}}
+        try:
+            await collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # Either the summary points at a newer document, or another save created the
+            # summary first; without the upsert only the latter still matches
+            await collection.update_one(query, update)
+
+    @staticmethod
+    async def _replace(section: str, user_id: str, stale_id: Optional[str], entry: Optional[Dict[str, Any]]):
+        collection = await get_user_summary_collection()
+        now = datetime.utcnow()
+        if entry is None:
+            entry = {"id": None, "checked_at": now}
+        update = {"$set": {section: entry, "updated_at": now}}
+        if stale_id:
+            # Only if no save has moved the pointer on in the meantime
+            await collection.update_one({"_id": user_id, f"{section}.id": stale_id}, update)
+            return
+        # Recording that the user has none; a save that got there first wins
+        try:
+            await collection.update_one({"_id": user_id, "$or": _without_document(section)}, update, upsert=True)
+        except DuplicateKeyError:
+            pass
+
+    @classmethod
+    async def find_latest(
+        cls,
+        section: str,
+        user_id: str,
+        collection,
+        get_by_id: Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The latest document of a kind for a user
+
+        Args:
+            section: Key in HEADLINES
+            user_id: Owner of the document
+            collection: Collection holding the documents, queried when the summary cannot answer
+            get_by_id: Reads a document by id, returning it with "id" in place of "_id"
+
+        Returns:
+            dict: The document with "id" in place of "_id", or None if the user has none
+        """
+        summaries = await get_user_summary_collection()
+        summary = await summaries.find_one({"_id": user_id}, {section: 1})
+        entry = (summary or {}).get(section) or {}
+        checked_at = entry.get("checked_at")
+        if checked_at and datetime.utcnow() - checked_at < timedelta(seconds=USER_SUMMARY_EMPTY_TTL):
+            # Recently found to have none
+            return None
+        latest_id = entry.get("id")
+        if latest_id:
+            document = await get_by_id(latest_id)
+            if document is not None:
+                return document
+
+        # No summary yet, its document has since been deleted, or the user had none when last checked
+        documents = await collection.find({"user_id": user_id}).sort("created_at", -1).limit(1).to_list(length=1)
+        document = documents[0] if documents else None
+        if document is None:
+            await cls._replace(section, user_id, latest_id, None)
+        elif latest_id:
+            await cls._replace(section, user_id, latest_id, cls.entry(section, document))
+        else:
+            await cls.record(section, document)
+
+        if document is None:
+            return None
+        document["id"] = str(document.pop("_id"))
+        return document
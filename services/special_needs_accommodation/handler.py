@@ -1,18 +1,59 @@
 import sys
 import os
 import json
+import asyncio
 from datetime import datetime
 from typing import Dict, Any, Optional
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from services.shared.llm_client import LLMClient
+from services.shared.llm_client import LLMClient, get_llm_client
 from services.shared.database import get_feedback_collection, get_special_needs_collection
+from services.shared.llm_repair import repair_fragments
+from services.shared.json_extractor import extract_json
+from services.shared.metrics import record_parse_failure
+from services.shared.tracing import span, traced
+from services.shared.llm_responses import LLMResponseStore
+from services.shared.user_summary import UserSummary
 from bson import ObjectId
-from .models import UserFeedback, FeedbackAnalysis, AnalysisStatus
+from pydantic import TypeAdapter
+from .models import UserFeedback, FeedbackAnalysis, AnalysisStatus, FeedbackAnalysisLLMOutput
+
+# Fields produced by the LLM, with the value used when the model omits them
+ANALYSIS_FIELD_DEFAULTS = {
+    "identified_concerns": [],
+    "suggested_restrictions": [],
+    "suggested_alternatives": {},
+    "recommendation": ""
+}
+
+# Validators for each analysis field, built once since building one costs far more than using it
+ANALYSIS_FIELD_ADAPTERS = {
+    field: TypeAdapter(FeedbackAnalysis.model_fields[field].annotation)
+    for field in ANALYSIS_FIELD_DEFAULTS
+}
+
+ANALYSIS_FIELD_FORMAT = """
+"identified_concerns": ["string", ...]
+"suggested_restrictions": ["string", ...]
+"suggested_alternatives": {"food_item": ["alternative1", "alternative2", ...], ...}
+"recommendation": "string"
+"""
 
 class SpecialNeedsHandler:
     def __init__(self):
-        self.llm_client = LLMClient()
+        self._llm_client = None
+
+    @property
+    def llm_client(self) -> LLMClient:
+        # Looked up on first use, so importing the service opens no connections before a fork
+        if self._llm_client is None:
+            return get_llm_client()
+        return self._llm_client
+
+    @llm_client.setter
+    def llm_client(self, llm_client: LLMClient):
+        self._llm_client = llm_client
     
+    @traced("feedback.save")
     async def save_feedback(self, feedback: UserFeedback):
         """
         Save user feedback to database
@@ -28,14 +69,77 @@ class SpecialNeedsHandler:
         # Return the ID of the inserted document
         return str(result.inserted_id)
     
-    async def analyze_feedback(self, feedback_id: str, food_recommendation: Dict = None, user_profile: Dict = None) -> FeedbackAnalysis:
+    @traced("feedback_analysis.prompt_build")
+    def _create_feedback_prompt(self, feedback: Dict[str, Any], food_recommendation: Dict = None, user_profile: Dict = None) -> tuple:
+        """
+        Create the system and user prompts for feedback analysis
+        """
+        # If food_recommendation wasn't passed, we'll use a placeholder
+        if not food_recommendation:
+            food_recommendation = {
+                "meal_plans": {}
+            }
+        
+        # If user_profile wasn't passed, we'll use a placeholder
+        if not user_profile:
+            user_profile = {}
+        
+        # Create system prompt; the output format comes from FeedbackAnalysisLLMOutput
+        system_prompt = """
+You are a professional nutritionist and dietician who specializes in identifying potential dietary restrictions, food allergies, and intolerances based on user feedback about meal plans.
+Your task is to analyze negative feedback about a food recommendation and identify potential concerns, suggest dietary restrictions, and recommend alternatives.
+Consider common food allergies, intolerances, and sensitivities such as gluten, lactose, nuts, seafood, etc.
+Suggested alternatives map a food item to its alternatives, e.g. "milk": ["almond milk", "soy milk", "oat milk"].
+The recommendation is a brief summary of your analysis and recommendations.
+Be specific and practical in your analysis. Avoid making extreme recommendations unless clearly warranted.
+Only respond with the JSON object, no additional text.
+"""
+        
+        # Create user prompt with feedback and meal information
+        user_prompt = f"""
+User Feedback: "{feedback['feedback_text']}"
+
+The feedback is about the following food recommendation:
+"""
+        
+        # Add some meal plan details to the prompt if available
+        if "meal_plans" in food_recommendation and food_recommendation["meal_plans"]:
+            days = list(food_recommendation["meal_plans"].keys())
+            if days:
+                first_day = days[0]  # Just include the first day to keep the prompt shorter
+                
+                user_prompt += f"Sample meals from {first_day.capitalize()} in the meal plan:\n"
+                
+                for meal in food_recommendation["meal_plans"][first_day].get("meals", []):
+                    user_prompt += f"\n{meal['meal_type'].upper()}:\n"
+                    for item in meal.get("food_items", []):
+                        user_prompt += f"- {item['name']} ({item['quantity']})\n"
+        
+        # Add user profile information if available
+        if user_profile:
+            user_prompt += "\nUser profile information:\n"
+            
+            if "allergies" in user_profile and user_profile["allergies"]:
+                user_prompt += f"- Known allergies: {', '.join(user_profile['allergies'])}\n"
+            
+            if "dietary_restrictions" in user_profile and user_profile["dietary_restrictions"]:
+                user_prompt += f"- Known dietary restrictions: {', '.join(user_profile['dietary_restrictions'])}\n"
+            
+            if "medical_conditions" in user_profile and user_profile["medical_conditions"]:
+                user_prompt += f"- Medical conditions: {', '.join(user_profile['medical_conditions'])}\n"
+        
+        return system_prompt, user_prompt
+    
+    async def analyze_feedback(self, feedback_id: str, food_recommendation: Dict = None, user_profile: Dict = None, feedback: Dict = None) -> FeedbackAnalysis:
         """
         Analyze user feedback to identify potential dietary restrictions or health concerns
+        The feedback document is fetched by ID unless the caller already has it
         """
         try:
             # Get the feedback
-            feedback_collection = await get_feedback_collection()
-            feedback = await feedback_collection.find_one({"_id": ObjectId(feedback_id)})
+            if feedback is None:
+                feedback_collection = await get_feedback_collection()
+                feedback = await feedback_collection.find_one({"_id": ObjectId(feedback_id)})
             
             if not feedback:
                 return FeedbackAnalysis(
@@ -57,81 +161,16 @@ class SpecialNeedsHandler:
                     recommendation="No concerns identified as feedback was positive."
                 )
             
-            # If food_recommendation wasn't passed, we'll use a placeholder
-            if not food_recommendation:
-                food_recommendation = {
-                    "meal_plans": {}
-                }
-            
-            # If user_profile wasn't passed, we'll use a placeholder
-            if not user_profile:
-                user_profile = {}
-            
-            # Create system prompt
-            system_prompt = """
-You are a professional nutritionist and dietician who specializes in identifying potential dietary restrictions, food allergies, and intolerances based on user feedback about meal plans.
-Your task is to analyze negative feedback about a food recommendation and identify potential concerns, suggest dietary restrictions, and recommend alternatives.
-Consider common food allergies, intolerances, and sensitivities such as gluten, lactose, nuts, seafood, etc.
-The response should be structured as a JSON object with the following format:
-
-{
-  "identified_concerns": [
-    "string", // e.g., "Bloating after consuming dairy products"
-    ...
-  ],
-  "suggested_restrictions": [
-    "string", // e.g., "Avoid dairy products"
-    ...
-  ],
-  "suggested_alternatives": {
-    "food_item": ["alternative1", "alternative2", ...], // e.g., "milk": ["almond milk", "soy milk", "oat milk"]
-    ...
-  },
-  "recommendation": "string" // A brief summary of your analysis and recommendations
-}
-
-Be specific and practical in your analysis. Avoid making extreme recommendations unless clearly warranted.
-Only respond with the JSON object, no additional text.
-"""
-            
-            # Create user prompt with feedback and meal information
-            user_prompt = f"""
-User Feedback: "{feedback['feedback_text']}"
-
-The feedback is about the following food recommendation:
-"""
-            
-            # Add some meal plan details to the prompt if available
-            if "meal_plans" in food_recommendation and food_recommendation["meal_plans"]:
-                days = list(food_recommendation["meal_plans"].keys())
-                if days:
-                    first_day = days[0]  # Just include the first day to keep the prompt shorter
-                    
-                    user_prompt += f"Sample meals from {first_day.capitalize()} in the meal plan:\n"
-                    
-                    for meal in food_recommendation["meal_plans"][first_day].get("meals", []):
-                        user_prompt += f"\n{meal['meal_type'].upper()}:\n"
-                        for item in meal.get("food_items", []):
-                            user_prompt += f"- {item['name']} ({item['quantity']})\n"
-            
-            # Add user profile information if available
-            if user_profile:
-                user_prompt += "\nUser profile information:\n"
-                
-                if "allergies" in user_profile and user_profile["allergies"]:
-                    user_prompt += f"- Known allergies: {', '.join(user_profile['allergies'])}\n"
-                
-                if "dietary_restrictions" in user_profile and user_profile["dietary_restrictions"]:
-                    user_prompt += f"- Known dietary restrictions: {', '.join(user_profile['dietary_restrictions'])}\n"
-                
-                if "medical_conditions" in user_profile and user_profile["medical_conditions"]:
-                    user_prompt += f"- Medical conditions: {', '.join(user_profile['medical_conditions'])}\n"
+            # Create prompts
+            system_prompt, user_prompt = self._create_feedback_prompt(feedback, food_recommendation, user_profile)
             
             # Call LLM API to analyze feedback
             llm_response = await self.llm_client.generate_response(
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
-                temperature=0.3  # Lower temperature for more consistent results
+                temperature=0.3,  # Lower temperature for more consistent results
+                response_model=FeedbackAnalysisLLMOutput,
+                task="feedback_analysis"
             )
             
             if not llm_response:
@@ -144,37 +183,24 @@ The feedback is about the following food recommendation:
             
             # Parse the JSON response
             try:
-                # Clean the LLM response to remove Markdown code block formatting
-                cleaned_response = llm_response
-                
-                # Remove opening code block markers (```json, ```, etc.)
-                if "```" in cleaned_response:
-                    # Find the first occurrence of an actual JSON character after the opening ```
-                    start_index = cleaned_response.find("{")
-                    if start_index != -1:
-                        cleaned_response = cleaned_response[start_index:]
-                
-                # Remove closing code block markers (```)
-                if "```" in cleaned_response:
-                    end_index = cleaned_response.rfind("```")
-                    if end_index != -1:
-                        cleaned_response = cleaned_response[:end_index].strip()
+                # Extract the JSON value, tolerating code fences, prose and truncation
+                with span("feedback_analysis.parse"):
+                    analysis_data = extract_json(llm_response)
                 
-                # Parse the cleaned JSON
-                analysis_data = json.loads(cleaned_response)
+                # Validate each field on its own so one bad field does not discard the analysis
+                analysis_fields, unrepaired_fields = await self._salvage_analysis_fields(analysis_data)
                 
                 # Create and return the feedback analysis object
                 return FeedbackAnalysis(
                     feedback_id=feedback_id,
                     created_at=datetime.utcnow(),
                     status=AnalysisStatus.COMPLETED,
-                    identified_concerns=analysis_data.get("identified_concerns", []),
-                    suggested_restrictions=analysis_data.get("suggested_restrictions", []),
-                    suggested_alternatives=analysis_data.get("suggested_alternatives", {}),
-                    recommendation=analysis_data.get("recommendation", ""),
-                    llm_response=llm_response
+                    llm_response=llm_response,
+                    error_message=f"Could not repair: {', '.join(unrepaired_fields)}" if unrepaired_fields else None,
+                    **analysis_fields
                 )
             except json.JSONDecodeError as e:
+                record_parse_failure("feedback_analysis", "json")
                 return FeedbackAnalysis(
                     feedback_id=feedback_id,
                     created_at=datetime.utcnow(),
@@ -199,6 +225,38 @@ The feedback is about the following food recommendation:
                 error_message=f"Error analyzing feedback: {str(e)}"
             )
     
+    @traced("feedback_analysis.validate")
+    async def _salvage_analysis_fields(self, analysis_data: Dict[str, Any]) -> tuple:
+        """
+        Validate each analysis field separately, keeping the valid ones and sending
+        only the invalid ones to the LLM in a single targeted repair request
+        
+        Returns:
+            tuple: (analysis_fields, unrepaired_fields)
+        """
+        analysis_fields = {}
+        invalid_fragments = {}
+        for field, default in ANALYSIS_FIELD_DEFAULTS.items():
+            value = analysis_data.get(field, default)
+            try:
+                analysis_fields[field] = ANALYSIS_FIELD_ADAPTERS[field].validate_python(value)
+            except Exception as e:
+                invalid_fragments[field] = {"value": value, "error": str(e)}
+        
+        unrepaired_fields = []
+        if invalid_fragments:
+            repaired = await repair_fragments(self.llm_client, invalid_fragments, ANALYSIS_FIELD_FORMAT, task="feedback_analysis")
+            for field in invalid_fragments:
+                try:
+                    analysis_fields[field] = ANALYSIS_FIELD_ADAPTERS[field].validate_python(repaired[field])
+                except Exception:
+                    analysis_fields[field] = ANALYSIS_FIELD_DEFAULTS[field]
+                    unrepaired_fields.append(field)
+            record_parse_failure("feedback_analysis", "unrepaired", len(unrepaired_fields))
+        
+        return analysis_fields, unrepaired_fields
+    
+    @traced("feedback_analysis.save")
     async def save_analysis(self, analysis: FeedbackAnalysis):
         """
         Save feedback analysis to database
@@ -208,8 +266,8 @@ The feedback is about the following food recommendation:
         # Convert Pydantic model to dict
         analysis_dict = analysis.dict()
         
-        # Insert into database
-        result = await feedback_collection.insert_one(analysis_dict)
+        # Insert into database, with the raw LLM response stored separately
+        result = await LLMResponseStore.insert(feedback_collection, analysis_dict, "feedback")
         
         # Update the feedback document with the analysis ID
         await feedback_collection.update_one(
@@ -349,7 +407,9 @@ For each meal that needs to be adjusted, provide:
             llm_response = await self.llm_client.generate_response(
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
-                temperature=0.3
+                temperature=0.3,
+                json_mode=True,
+                task="accommodation"
             )
             
             if not llm_response:
@@ -362,24 +422,9 @@ For each meal that needs to be adjusted, provide:
             
             # Parse the JSON response
             try:
-                # Clean the LLM response to remove Markdown code block formatting
-                cleaned_response = llm_response
-                
-                # Remove opening code block markers (```json, ```, etc.)
-                if "```" in cleaned_response:
-                    # Find the first occurrence of an actual JSON character after the opening ```
-                    start_index = cleaned_response.find("{")
-                    if start_index != -1:
-                        cleaned_response = cleaned_response[start_index:]
-                
-                # Remove closing code block markers (```)
-                if "```" in cleaned_response:
-                    end_index = cleaned_response.rfind("```")
-                    if end_index != -1:
-                        cleaned_response = cleaned_response[:end_index].strip()
-                
-                # Parse the cleaned JSON 
-                special_needs_data = json.loads(cleaned_response)
+                # Extract the JSON value, tolerating code fences, prose and truncation
+                with span("accommodation.parse"):
+                    special_needs_data = extract_json(llm_response)
                 
                 # Create and return the special needs plan object
                 return {
@@ -396,6 +441,7 @@ For each meal that needs to be adjusted, provide:
                     "llm_response": llm_response
                 }
             except json.JSONDecodeError as e:
+                record_parse_failure("accommodation", "json")
                 return {
                     "user_id": user_id,
                     "created_at": datetime.utcnow(),
@@ -420,14 +466,20 @@ For each meal that needs to be adjusted, provide:
                 "error_message": f"Error generating special needs accommodation: {str(e)}"
             }
     
+    @traced("accommodation.save")
     async def save_plan(self, plan):
         """
         Save special needs plan to database
         """
         collection = await get_special_needs_collection()
+        plan["_id"] = ObjectId()
         
-        # Insert into database
-        result = await collection.insert_one(plan)
+        # Insert into database, with the raw LLM response stored separately, and point the
+        # user's summary at it concurrently
+        result, _ = await asyncio.gather(
+            LLMResponseStore.insert(collection, plan, "special_needs"),
+            UserSummary.record("special_needs_plan", plan)
+        )
         
         # Return the ID of the inserted document
         return str(result.inserted_id)
@@ -447,16 +499,7 @@ For each meal that needs to be adjusted, provide:
     
     async def get_latest_plan_for_user(self, user_id: str):
         """
-        Get the latest special needs plan for a user
+        Get the latest special needs plan for a user, by id from the user's summary
         """
         collection = await get_special_needs_collection()
-        plans = await collection.find(
-            {"user_id": user_id}
-        ).sort("created_at", -1).limit(1).to_list(length=1)
-        
-        if plans:
-            plan = plans[0]
-            plan["id"] = str(plan.pop("_id"))
-            return plan
-        
-        return None
\ No newline at end of file
+        return await UserSummary.find_latest("special_needs_plan", user_id, collection, self.get_plan_by_id)
\ No newline at end of file
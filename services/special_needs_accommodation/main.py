@@ -5,6 +5,12 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from services.shared.database import Database
+from services.shared.metrics import setup_metrics
+from services.shared.tracing import setup_tracing
+from services.shared.loop_monitor import setup_loop_monitor
+from services.shared.profiling import setup_profiling
+from services.shared.server_timing import setup_server_timing
+from services.shared.llm_client import LLMClientRegistry
 from .router import router
 
 app = FastAPI(title="Special Needs Accommodation Service", description="Analyzes user feedback to identify potential dietary restrictions and health concerns")
@@ -18,6 +24,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Prometheus metrics at /metrics
+setup_metrics(app)
+
+# OpenTelemetry tracing, exported according to OTEL_TRACES_EXPORTER
+setup_tracing(app, "special_needs_accommodation")
+
+# Event loop lag and stall detection, with stack traces when LOOP_STALL_DEBUG=true
+setup_loop_monitor(app)
+
+# Per-request profiling for requests carrying PROFILING_TOKEN
+setup_profiling(app)
+
+# Per-stage durations in a Server-Timing header on every response
+setup_server_timing(app)
+
 # Include routers
 app.include_router(router, prefix="/api/v1")
 
@@ -25,9 +46,17 @@ app.include_router(router, prefix="/api/v1")
 async def startup_db_client():
     await Database.connect_db()
 
+@app.on_event("startup")
+async def startup_llm_client():
+    await LLMClientRegistry.warm_up()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     await Database.close_db_connection()
 
+@app.on_event("shutdown")
+async def shutdown_llm_client():
+    await LLMClientRegistry.close_clients()
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8003, reload=True)
\ No newline at end of file
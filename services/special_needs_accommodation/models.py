@@ -20,6 +20,12 @@ class UserFeedback(BaseModel):
     feedback_type: FeedbackType
     created_at: datetime
 
+class FeedbackAnalysisLLMOutput(BaseModel):
+    identified_concerns: List[str] = []
+    suggested_restrictions: List[str] = []
+    suggested_alternatives: Dict[str, List[str]] = {}  # food item -> alternatives
+    recommendation: str = ""
+
 class FeedbackAnalysis(BaseModel):
     feedback_id: str
     created_at: datetime
@@ -4,6 +4,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from .models import FeedbackCreate, FeedbackResponse, FeedbackAnalysisResponse, UserFeedback, FeedbackType
 from .handler import SpecialNeedsHandler
+from services.shared.repository import DocumentRepository
 from datetime import datetime
 from typing import List, Dict, Any
 
@@ -14,8 +15,18 @@ handler = SpecialNeedsHandler()
 async def create_feedback(feedback_data: Dict[str, Any]):
     """
     Submit feedback about a food recommendation
+
+    user_data and food_recommendation can be sent inline, or user_id alone and the
+    documents are looked up by id
     """
-    user_id = feedback_data["user_data"]["id"]
+    user_data = feedback_data.get("user_data")
+    user_id = user_data["id"] if user_data else feedback_data.get("user_id")
+    
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User ID not provided"
+        )
     
     # Create feedback object
     feedback = UserFeedback(
@@ -29,21 +40,32 @@ async def create_feedback(feedback_data: Dict[str, Any]):
     # Save feedback to database
     feedback_id = await handler.save_feedback(feedback)
     
+    # Build the response from the saved models instead of reading them back
+    saved_feedback = {**feedback.dict(), "id": feedback_id}
+    
     # If feedback is negative, analyze it
     if feedback.feedback_type == FeedbackType.NEGATIVE:
-        # Extract data passed from frontend
-        food_recommendation = feedback_data.get("food_recommendation", {})
-        user_profile = feedback_data.get("user_data", {}).get("profile", {})
+        # Use data passed from the frontend, or look it up when only ids were sent
+        food_recommendation = feedback_data.get("food_recommendation")
+        if food_recommendation is None:
+            food_recommendation = await DocumentRepository.get_food_recommendation(feedback.food_recommendation_id) or {}
+        
+        if user_data is None:
+            user_data = await DocumentRepository.get_user(user_id) or {}
+        user_profile = user_data.get("profile") or {}
         
         analysis = await handler.analyze_feedback(
             feedback_id=feedback_id,
             food_recommendation=food_recommendation,
-            user_profile=user_profile
+            user_profile=user_profile,
+            feedback=feedback.dict()
         )
         analysis_id = await handler.save_analysis(analysis)
-    
-    # Get the saved feedback
-    saved_feedback = await handler.get_feedback_by_id(feedback_id)
+        saved_feedback["analysis_id"] = analysis_id
+        # Shaped like the stored analysis, with the raw response referenced by id
+        saved_feedback["analysis"] = {**analysis.dict(exclude={"llm_response"}), "id": analysis_id}
+        if analysis.llm_response:
+            saved_feedback["analysis"]["llm_response_id"] = analysis_id
     
     return saved_feedback
 
@@ -108,10 +130,11 @@ async def create_special_needs_plan(plan_data: Dict[str, Any]):
     # Save plan to database
     plan_id = await handler.save_plan(plan)
     
-    # Get the saved plan
-    saved_plan = await handler.get_plan_by_id(plan_id)
+    # Build the response from the saved plan instead of reading it back
+    plan.pop("_id", None)
+    plan["id"] = plan_id
     
-    return saved_plan
+    return plan
 
 @router.get("/special-needs-plan/{plan_id}")
 async def get_special_needs_plan(plan_id: str):
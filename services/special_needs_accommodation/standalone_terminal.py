@@ -4,11 +4,12 @@ import os
 import json
 from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from services.shared.llm_client import LLMClient
+from services.shared.llm_client import get_llm_client, LLMClientRegistry
+from services.shared.json_extractor import extract_json
 
 class StandaloneSpecialNeedsTerminal:
     def __init__(self):
-        self.llm_client = LLMClient()
+        self.llm_client = get_llm_client()
     
     async def load_food_recommendations_from_file(self, file_path):
         """Load food recommendations from a JSON file"""
@@ -32,7 +33,8 @@ class StandaloneSpecialNeedsTerminal:
         except Exception as e:
             print(f"Error loading file: {str(e)}")
             return None
-      def collect_special_needs_info(self):
+    
+    def collect_special_needs_info(self):
         """Collect symptom information directly from the terminal"""
         print("\n===== SYMPTOM AND DIETARY ISSUE REPORTING =====")
         print("Please share any symptoms or discomfort you experience after eating certain foods.")
@@ -89,7 +91,8 @@ class StandaloneSpecialNeedsTerminal:
             "food_aversions": food_aversions,
             "additional_info": additional_info if additional_info else None
         }
-      async def generate_special_needs_plan(self, food_recommendations, symptom_info):
+    
+    async def generate_special_needs_plan(self, food_recommendations, symptom_info):
         """Generate special needs accommodation plan based on reported symptoms"""
         print("\n===== ANALYZING SYMPTOMS AND GENERATING DIETARY ACCOMMODATIONS =====")
         print("Analyzing your reported symptoms and adjusting meal plans accordingly...")
@@ -147,7 +150,8 @@ educational information about these conditions, and a modified meal plan that ac
             llm_response = await self.llm_client.generate_response(
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
-                temperature=0.3
+                temperature=0.3,
+                task="accommodation"
             )
             
             if not llm_response:
@@ -155,7 +159,7 @@ educational information about these conditions, and a modified meal plan that ac
                 return None
             
             # Parse the JSON response
-            special_needs_data = json.loads(llm_response)
+            special_needs_data = extract_json(llm_response)
             
             # Create the result
             result = {
@@ -296,7 +300,10 @@ educational information about these conditions, and a modified meal plan that ac
 
 async def main():
     terminal = StandaloneSpecialNeedsTerminal()
-    await terminal.run()
+    try:
+        await terminal.run()
+    finally:
+        await LLMClientRegistry.close_clients()
 
 if __name__ == "__main__":
     asyncio.run(main())
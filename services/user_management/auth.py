@@ -1,5 +1,9 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+import copy
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -8,6 +12,8 @@ import os
 import sys
 sys.path.append("../..")
 from services.shared.database import get_user_collection
+from services.shared.cache import TTLCache
+from services.shared.tracing import traced
 from bson import ObjectId
 import dotenv
 
@@ -18,17 +24,73 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key_here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Authentication caches. Users are cached briefly and invalidated on profile changes in this
+# process; the "pv" (profile version) claim lets tokens issued after a change in another process
+# bypass an older cached copy. A profile changed in another worker can still be served from this
+# worker's cache until it expires, so endpoints returning the profile use get_current_user_profile,
+# which always reads the user. Decoded tokens are cached until they expire.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+TOKEN_PROFILE_VERSION_CLAIM = os.getenv("TOKEN_PROFILE_VERSION_CLAIM", "true").lower() == "true"
+user_cache = TTLCache(maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")), ttl=USER_CACHE_TTL_SECONDS)
+token_cache = TTLCache(maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "10000")))
+
+# Password hashing settings. Hashes made with a different work factor are upgraded on login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # "thread" or "process"
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# bcrypt is CPU bound; run it in a bounded pool so it never blocks the event loop
+_password_executor = None
+
+def get_password_executor():
+    global _password_executor
+    if _password_executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            _password_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        else:
+            _password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    return _password_executor
+
+def shutdown_password_executor():
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False)
+        _password_executor = None
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+def _verify_and_update(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password off the event loop.
+    Returns (verified, new_hash) where new_hash is set when the stored hash uses outdated parameters.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_executor(), _verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    """
+    Hash a password off the event loop
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_executor(), get_password_hash, password)
+
+def invalidate_cached_user(user_id: str):
+    user_cache.delete(user_id)
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, profile_version: Optional[int] = None):
     to_encode = data.copy()
+    if TOKEN_PROFILE_VERSION_CLAIM and profile_version is not None:
+        to_encode["pv"] = profile_version
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -37,27 +99,54 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+async def _authenticate(token: str, use_cache: bool):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
+    # Tokens are immutable, so a verified payload can be reused until the token expires
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
             raise credentials_exception
-    except JWTError:
+        token_cache.set(token, payload, ttl=payload.get("exp", 0) - time.time())
+    elif payload.get("exp", 0) <= time.time():
+        token_cache.delete(token)
         raise credentials_exception
     
-    user_collection = await get_user_collection()
-    user = await user_collection.find_one({"_id": ObjectId(user_id)})
-    
-    if user is None:
+    user_id: str = payload.get("sub")
+    if user_id is None:
         raise credentials_exception
     
-    # Convert MongoDB _id to string id for Pydantic model
-    user["id"] = str(user.pop("_id"))
+    user = user_cache.get(user_id) if use_cache else None
+    if user is None or user.get("profile_version", 0) < payload.get("pv", 0):
+        user_collection = await get_user_collection()
+        user = await user_collection.find_one({"_id": ObjectId(user_id)})
+        
+        if user is None:
+            raise credentials_exception
+        
+        # Convert MongoDB _id to string id for Pydantic model
+        user["id"] = str(user.pop("_id"))
+        user_cache.set(user_id, user)
     
-    return user
\ No newline at end of file
+    # Callers get their own copy, including the nested profile, so the cached user cannot be modified
+    return copy.deepcopy(user)
+
+@traced("auth.verify")
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    """
+    The user a token belongs to, possibly from a cached copy up to USER_CACHE_TTL_SECONDS old
+    """
+    return await _authenticate(token, use_cache=True)
+
+@traced("auth.verify")
+async def get_current_user_profile(token: str = Depends(oauth2_scheme)):
+    """
+    The user a token belongs to, always read from the database, for endpoints that return or
+    act on the profile. The cached copy is refreshed on the way.
+    """
+    return await _authenticate(token, use_cache=False)
\ No newline at end of file
@@ -0,0 +1,119 @@
+# Backend-for-frontend aggregation of the data shown on the dashboard
+import os
+import asyncio
+import httpx
+from typing import Any, Awaitable, Callable, Dict, Optional
+from dotenv import load_dotenv
+from services.shared.tracing import inject_headers
+from services.shared.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+DIET_REQUIREMENTS_URL = os.getenv("DIET_REQUIREMENTS_URL", "http://diet-requirements:8001/api/v1")
+FOOD_RECOMMENDATION_URL = os.getenv("FOOD_RECOMMENDATION_URL", "http://food-recommendation:8002/api/v1")
+SPECIAL_NEEDS_URL = os.getenv("SPECIAL_NEEDS_URL", "http://special-needs:8003/api/v1")
+
+DASHBOARD_TIMEOUT = float(os.getenv("DASHBOARD_TIMEOUT", "5"))
+# The Feedback & Analysis page lists these, so the default matches the 10 the feedback endpoint returns
+DASHBOARD_FEEDBACK_LIMIT = int(os.getenv("DASHBOARD_FEEDBACK_LIMIT", "10"))
+
+class DashboardAggregator:
+    """
+    Fetch everything the frontend needs for a user from the other services concurrently,
+    so a page load costs the slowest call instead of the sum of all of them.
+
+    A section that fails or times out is left empty and reported in errors; it never
+    fails the whole dashboard.
+    """
+    http_client: Optional[httpx.AsyncClient] = None
+    # In-process replacements for the HTTP calls, keyed by section name
+    local_sources: Dict[str, Callable[[str], Awaitable[Any]]] = {}
+
+    @classmethod
+    def use_local_source(cls, section: str, fetch: Callable[[str], Awaitable[Any]]):
+        """
+        Fetch a section by calling fetch(user_id) in-process instead of over HTTP,
+        for when the owning service runs in the same process
+        """
+        cls.local_sources[section] = fetch
+
+    @classmethod
+    def get_http_client(cls) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use"""
+        if cls.http_client is None or cls.http_client.is_closed:
+            cls.http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(DASHBOARD_TIMEOUT),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+            )
+        return cls.http_client
+
+    @classmethod
+    async def close(cls):
+        """Close the shared HTTP client"""
+        if cls.http_client is not None:
+            await cls.http_client.aclose()
+            cls.http_client = None
+
+    @classmethod
+    async def _get(cls, url: str, headers: Dict[str, str]) -> Any:
+        """
+        GET a JSON document, returning None when it does not exist
+        """
+        response = await cls.get_http_client().get(url, headers=inject_headers(headers))
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    @classmethod
+    async def get_latest_diet_requirement(cls, user_id: str, headers: Dict[str, str]):
+        if "diet_requirement" in cls.local_sources:
+            return await cls.local_sources["diet_requirement"](user_id)
+        return await cls._get(f"{DIET_REQUIREMENTS_URL}/diet-requirements/user/{user_id}/latest", headers)
+
+    @classmethod
+    async def get_latest_food_recommendation(cls, user_id: str, headers: Dict[str, str]):
+        if "food_recommendation" in cls.local_sources:
+            return await cls.local_sources["food_recommendation"](user_id)
+        return await cls._get(f"{FOOD_RECOMMENDATION_URL}/food-recommendation/user/{user_id}/latest", headers)
+
+    @classmethod
+    async def get_recent_feedbacks(cls, user_id: str, headers: Dict[str, str]):
+        if "feedbacks" in cls.local_sources:
+            feedbacks = await cls.local_sources["feedbacks"](user_id)
+        else:
+            feedbacks = await cls._get(f"{SPECIAL_NEEDS_URL}/feedback/user/{user_id}", headers)
+        return (feedbacks or [])[:DASHBOARD_FEEDBACK_LIMIT]
+
+    @classmethod
+    async def build(cls, user: Dict[str, Any], authorization: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Build the dashboard document for an authenticated user
+
+        Args:
+            user: The current user, including the profile
+            authorization: Authorization header to forward to the other services
+
+        Returns:
+            Dict: user, diet_requirement, food_recommendation, feedbacks and per-section errors
+        """
+        headers = {"Authorization": authorization} if authorization else {}
+        sections = {
+            "diet_requirement": cls.get_latest_diet_requirement(user["id"], headers),
+            "food_recommendation": cls.get_latest_food_recommendation(user["id"], headers),
+            "feedbacks": cls.get_recent_feedbacks(user["id"], headers),
+        }
+
+        results = await asyncio.gather(*sections.values(), return_exceptions=True)
+
+        dashboard = {"user": user, "feedbacks": [], "errors": {}}
+        for name, result in zip(sections, results):
+            if isinstance(result, Exception):
+                logger.warning("Failed to fetch dashboard section", extra={"section": name, "error": str(result)})
+                dashboard["errors"][name] = str(result) or type(result).__name__
+            elif result is not None:
+                dashboard[name] = result
+
+        return dashboard
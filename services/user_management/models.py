@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from enum import Enum
 from datetime import datetime
 
@@ -73,4 +73,11 @@ class User(UserBase):
     updated_at: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class Dashboard(BaseModel):
+    user: User
+    diet_requirement: Optional[Dict[str, Any]] = None
+    food_recommendation: Optional[Dict[str, Any]] = None
+    feedbacks: List[Dict[str, Any]] = []
+    errors: Dict[str, str] = {}
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 import sys
 sys.path.append("../..")
 from services.shared.database import get_user_collection
-from .models import UserCreate, UserLogin, UserProfile, UserProfileUpdate, User
-from .auth import create_access_token, get_password_hash, verify_password, get_current_user
+from .models import UserCreate, UserLogin, UserProfile, UserProfileUpdate, User, Dashboard
+from .auth import create_access_token, get_password_hash_async, verify_and_update_password, get_current_user, get_current_user_profile, invalidate_cached_user
+from .dashboard import DashboardAggregator
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
 from typing import List
 
 router = APIRouter()
@@ -18,14 +20,22 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     user_collection = await get_user_collection()
     user = await user_collection.find_one({"email": form_data.username})
     
-    if not user or not verify_password(form_data.password, user["password"]):
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await verify_and_update_password(form_data.password, user["password"])
+    
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(data={"sub": str(user["_id"])})
+    # Transparently upgrade hashes made with outdated parameters
+    if new_hash:
+        await user_collection.update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
+    
+    access_token = create_access_token(data={"sub": str(user["_id"])}, profile_version=user.get("profile_version", 0))
     return {"access_token": access_token, "token_type": "bearer"}
 
 # User endpoints
@@ -42,7 +52,7 @@ async def register_user(user_data: UserCreate):
         )
     
     # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     
     now = datetime.utcnow()
     user_dict = {
@@ -55,10 +65,11 @@ async def register_user(user_data: UserCreate):
     
     result = await user_collection.insert_one(user_dict)
     
-    created_user = await user_collection.find_one({"_id": result.inserted_id})
-    created_user["id"] = str(created_user.pop("_id"))
+    # Build the response from the inserted document instead of reading it back
+    user_dict.pop("_id", None)
+    user_dict["id"] = str(result.inserted_id)
     
-    return created_user
+    return user_dict
 
 @router.post("/users/profile", response_model=User)
 async def create_user_profile(
@@ -70,17 +81,19 @@ async def create_user_profile(
     
     profile_dict = profile_data.dict()
     
-    await user_collection.update_one(
+    updated_user = await user_collection.find_one_and_update(
         {"_id": user_id},
         {
             "$set": {
                 "profile": profile_dict,
                 "updated_at": datetime.utcnow()
-            }
-        }
+            },
+            "$inc": {"profile_version": 1}
+        },
+        return_document=ReturnDocument.AFTER
     )
+    invalidate_cached_user(current_user["id"])
     
-    updated_user = await user_collection.find_one({"_id": user_id})
     updated_user["id"] = str(updated_user.pop("_id"))
     
     return updated_user
@@ -93,14 +106,6 @@ async def update_user_profile(
     user_collection = await get_user_collection()
     user_id = ObjectId(current_user["id"])
     
-    # Get existing profile
-    user = await user_collection.find_one({"_id": user_id})
-    if not user.get("profile"):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Profile not found. Create a profile first."
-        )
-    
     # Update only provided fields
     update_dict = {}
     for field, value in profile_update.dict(exclude_unset=True).items():
@@ -109,16 +114,31 @@ async def update_user_profile(
     
     update_dict["updated_at"] = datetime.utcnow()
     
-    await user_collection.update_one(
-        {"_id": user_id},
-        {"$set": update_dict}
+    # Only users that already have a profile match, so the update is a single round trip
+    updated_user = await user_collection.find_one_and_update(
+        {"_id": user_id, "profile": {"$type": "object"}},
+        {"$set": update_dict, "$inc": {"profile_version": 1}},
+        return_document=ReturnDocument.AFTER
     )
+    if updated_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Profile not found. Create a profile first."
+        )
+    invalidate_cached_user(current_user["id"])
     
-    updated_user = await user_collection.find_one({"_id": user_id})
     updated_user["id"] = str(updated_user.pop("_id"))
     
     return updated_user
 
 @router.get("/users/me", response_model=User)
-async def get_user_profile(current_user: User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+async def get_user_profile(current_user: User = Depends(get_current_user_profile)):
+    return current_user
+
+@router.get("/users/me/dashboard", response_model=Dashboard)
+async def get_user_dashboard(request: Request, current_user: User = Depends(get_current_user_profile)):
+    """
+    Get the user with their latest diet requirement, latest food recommendation
+    and recent feedback in a single call
+    """
+    return await DashboardAggregator.build(current_user, request.headers.get("Authorization"))
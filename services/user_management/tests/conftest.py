@@ -0,0 +1,32 @@
+import os
+import sys
+from datetime import datetime
+import pytest
+from bson import ObjectId
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from services.conftest import CountingCollection
+from services.user_management import router as user_router, auth
+
+@pytest.fixture
+def users(monkeypatch):
+    collection = CountingCollection()
+
+    async def get_collection():
+        return collection
+
+    monkeypatch.setattr(user_router, "get_user_collection", get_collection)
+    monkeypatch.setattr(auth, "get_user_collection", get_collection)
+    auth.user_cache.clear()
+    auth.token_cache.clear()
+    return collection
+
+@pytest.fixture
+def create_user(users):
+    """Add a user to the users collection; returns its id and authorization headers"""
+    def create(**fields):
+        user_id = ObjectId()
+        now = datetime.utcnow()
+        users.documents[user_id] = {"_id": user_id, "email": "user@example.com", "name": "User", "password": "x", "created_at": now, "updated_at": now, **fields}
+        return str(user_id), {"Authorization": f"Bearer {auth.create_access_token(data={'sub': str(user_id)})}"}
+    return create
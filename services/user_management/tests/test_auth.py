@@ -0,0 +1,29 @@
+import os
+import sys
+import asyncio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from fastapi.testclient import TestClient
+from services.user_management import auth
+from services.user_management.main import app as user_app
+from services.conftest import PROFILE
+
+def test_profile_reads_bypass_a_stale_cached_user(create_user):
+    user_id, headers = create_user(profile=dict(PROFILE))
+
+    # This worker cached the user before another worker updated the profile
+    auth.user_cache.set(user_id, {"id": user_id, "email": "user@example.com", "name": "User", "profile": {**PROFILE, "weight": 70.0}})
+
+    client = TestClient(user_app)
+    response = client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["profile"]["weight"] == PROFILE["weight"]
+    assert auth.user_cache.get(user_id)["profile"]["weight"] == PROFILE["weight"]
+
+def test_callers_cannot_modify_the_cached_profile(create_user):
+    user_id, headers = create_user(profile=dict(PROFILE))
+    token = headers["Authorization"].split()[1]
+
+    user = asyncio.run(auth.get_current_user(token))
+    user["profile"]["weight"] = 1.0
+    assert asyncio.run(auth.get_current_user(token))["profile"]["weight"] == PROFILE["weight"]
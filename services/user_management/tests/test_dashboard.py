@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import asyncio
+import httpx
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from services.user_management.dashboard import DashboardAggregator
+
+DELAY = 0.2
+
+USER = {"id": "user", "email": "user@example.com", "name": "User"}
+
+async def handle(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(DELAY)
+    path = request.url.path
+    if path.endswith("/diet-requirements/user/user/latest"):
+        return httpx.Response(200, json={"id": "requirement"})
+    if path.endswith("/food-recommendation/user/user/latest"):
+        return httpx.Response(404, json={"detail": "No food recommendations found for user"})
+    if path.endswith("/feedback/user/user"):
+        return httpx.Response(200, json=[{"id": str(i)} for i in range(12)])
+    return httpx.Response(500)
+
+@pytest.fixture
+def aggregator(monkeypatch):
+    monkeypatch.setattr(DashboardAggregator, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+    monkeypatch.setattr(DashboardAggregator, "local_sources", {})
+    yield DashboardAggregator
+    DashboardAggregator.http_client = None
+
+def test_dashboard_fetches_sections_concurrently(aggregator):
+    started = time.perf_counter()
+    dashboard = asyncio.run(aggregator.build(USER, "Bearer token"))
+    elapsed = time.perf_counter() - started
+
+    assert dashboard["user"] == USER
+    assert dashboard["diet_requirement"] == {"id": "requirement"}
+    assert "food_recommendation" not in dashboard
+    assert len(dashboard["feedbacks"]) == 10
+    assert dashboard["errors"] == {}
+    # Three calls of DELAY each take about one DELAY when made concurrently
+    assert elapsed < DELAY * 2
+
+def test_dashboard_reports_failed_sections(aggregator, monkeypatch):
+    async def fail(*args):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(DashboardAggregator, "get_recent_feedbacks", fail)
+    dashboard = asyncio.run(aggregator.build(USER))
+
+    assert dashboard["diet_requirement"] == {"id": "requirement"}
+    assert dashboard["feedbacks"] == []
+    assert dashboard["errors"] == {"feedbacks": "connection refused"}
@@ -0,0 +1,39 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from fastapi.testclient import TestClient
+from services.user_management.main import app as user_app
+from services.conftest import PROFILE
+
+def test_register_user_round_trips(users):
+    client = TestClient(user_app)
+    response = client.post("/api/v1/users/register", json={"email": "new@example.com", "name": "New", "password": "secret"})
+    assert response.status_code == 201
+    assert response.json()["email"] == "new@example.com"
+    # Duplicate check and insert, no read back
+    assert users.round_trips == 2
+
+def test_create_profile_round_trips(users, create_user):
+    user_id, headers = create_user()
+    client = TestClient(user_app)
+    response = client.post("/api/v1/users/profile", json=PROFILE, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["profile"]["age"] == 30
+    # Authentication read and a single find_one_and_update
+    assert users.round_trips == 2
+
+def test_update_profile_round_trips(users, create_user):
+    user_id, headers = create_user(profile=dict(PROFILE))
+    client = TestClient(user_app)
+    response = client.put("/api/v1/users/profile", json={"weight": 58.5}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["profile"]["weight"] == 58.5
+    assert users.round_trips == 2
+
+def test_update_missing_profile_is_rejected(users, create_user):
+    user_id, headers = create_user()
+    client = TestClient(user_app)
+    response = client.put("/api/v1/users/profile", json={"weight": 58.5}, headers=headers)
+    assert response.status_code == 400
+    assert users.round_trips == 2